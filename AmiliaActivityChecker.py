@@ -1,11 +1,25 @@
-import pandas as pd
+import time
+STARTUP_STARTED = time.perf_counter()
 import tkinter as tk
-from fuzzywuzzy import fuzz
 from tkinter import *
-from tkcalendar import DateEntry
 from tkinter import ttk, filedialog, Listbox, messagebox
-from tkinterdnd2 import TkinterDnD, DND_FILES
-from datetime import datetime
+import importlib
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+from results_view import VirtualTreeview
+from diagnostics import RunDiagnostics
+
+# The window is shown before the heavy modules are loaded (pandas and everything built on it,
+# fuzzywuzzy, tkcalendar, tkinterdnd2): each one is imported where it is first used, and they are
+# all warmed up in the background right after the first paint.
+WARM_UP_MODULES = (
+    'validation_engine', 'workbook_cache', 'streaming_reader', 'multi_sheet', 'custom_rules', 'results_store',
+    'results_export', 'validation_service', 'watch_folder', 'ledger_index', 'activity_search', 'tkcalendar',
+)
 
 # Initialization of variable to take user input
 entry_sheet_name = None
@@ -15,7 +29,39 @@ entry_min_cost = None
 entry_max_cost = None
 entry_ledger_code = None
 
-def search_treeview(treeview, search_term):
+# Every file dropped or picked at once (file_path holds the first one)
+selected_files = []
+
+# Background validation state
+POLL_INTERVAL_MS = 50
+validation_worker = None
+# Worker messages are tagged with the id of their run; only those of validation_run are shown
+validation_queue = queue.Queue()
+validation_run = 0
+cancel_event = threading.Event()
+validator = None  # IncrementalValidator, created by the first validation
+
+# Stage timings of the last validation run, shown in the status bar and the diagnostics panel
+run_diagnostics = None
+diagnostics_panel = None
+
+# Stored runs shown in the results view, as (run id, sheet label), for "Compare with Last Run" and "Export"
+last_runs = []
+# (future run id, label) of the runs still being written to the results store
+pending_runs = []
+export_worker = None
+
+# Folder watch (see watch_folder.py): its thread and the event that stops it
+watch_thread = None
+watch_stop_event = None
+
+# Search index over the activities of the current results, rebuilt only when the results change
+search_index = None
+search_index_generation = None
+
+def search_treeview(view, search_term):
+    global search_index, search_index_generation
+
     # Clean the search term by splitting and lowercasing
     search_terms = [term.strip().lower() for term in search_term.split()]  
     
@@ -23,215 +69,541 @@ def search_treeview(treeview, search_term):
         messagebox.showinfo("Search", "Please enter a search term.")
         return
     
-    found = False
-    highest_match = None
-    highest_score = 0  # Track the highest fuzzy match score
+    # Remove any previous highlights
+    view.clear_highlight()
     
-    # Loop through the items and remove any previous highlights
-    for item in treeview.get_children():
-        treeview.item(item, tags=())  # Remove any previous highlight tag
+    # Indexes the "Activity" column (the first column) of the stored results once per result set
+    if search_index is None or search_index_generation != view.generation:
+        from activity_search import ActivitySearchIndex
+        search_index = ActivitySearchIndex(values[0] for values in view.rows)
+        search_index_generation = view.generation
     
-    # Loop through the items again to find matches
-    for item in treeview.get_children():
-        item_values = treeview.item(item, "values")
-        
-        # We will now check the similarity score for the "Activity" column only
-        activity = str(item_values[0]).lower()  # Assuming activity is the first column
-        
-        # Use fuzzywuzzy to get the similarity score for each item
-        score = fuzz.partial_ratio(search_term.lower(), activity)  # Partial ratio for fuzzy matching
-        
-        if score > highest_score:
-            highest_match = item
-            highest_score = score
-        
-        # If the score is above a certain threshold, we consider it a match
-        # You can adjust this threshold as per your needs (e.g., 80 out of 100)
-        if score >= 70:  
-            treeview.item(item, tags=('highlight',))
-            found = True
+    # Rows scoring 70 or more are matches, and the most similar activity is always highlighted
+    matches, highest_match, found = search_index.match_rows(search_term)
     
-    if highest_match:
-        treeview.item(highest_match, tags=('highlight',))  # Highlight the most similar activity
+    if highest_match is not None:
+        view.highlight(matches)
+        view.see(highest_match)
     
     if not found:
         messagebox.showinfo("Search", "No similar matches found.")
     else:
         # Apply the highlight tag with a background color change
-        treeview.tag_configure('highlight', background='yellow')
+        view.tree.tag_configure('highlight', background='yellow')
 
 def search_output():
     search_term = search_entry.get()  # Get the search term from the user input
-    search_treeview(tree_output, search_term)  # Perform search in the Treeview
+    search_treeview(results_view, search_term)  # Perform search in the results
 
 
 def validate_dates_and_cost():
+    # Only one validation runs at a time (Return can be pressed while a run is going), and not during an export
+    if validation_worker is not None and validation_worker.is_alive():
+        label_progress.config(text="Waiting for the current run to stop...")
+        return
+    if export_worker is not None and export_worker.is_alive():
+        return
+    from custom_rules import RuleConfigError, load_rules
+    from multi_sheet import parse_sheet_names
+    from validation_engine import CriteriaError, parse_criteria
+    from validation_service import SERVICE_URL, ServiceClient
+
+    # Retreaves all user inputs (Tk widgets can only be read from the main thread)
+    service = ServiceClient(SERVICE_URL) if use_service.get() else None
+    sheet_name = entry_sheet_name.get()
+    start_date_input = entry_start_date.get()
+    end_date_input = entry_end_date.get()
+    min_cost_input = entry_min_cost.get()
+    max_cost_input = entry_max_cost.get()
+    ledger_code_input = entry_ledger_code.get()
+
+    # Checks the criteria before touching the file
     try:
-        # Retreaves all user inputs
-        sheet_name = entry_sheet_name.get()
-        start_date_input = entry_start_date.get()
-        end_date_input = entry_end_date.get()
-        min_cost_input = entry_min_cost.get()
-        max_cost_input = entry_max_cost.get()
-        ledger_code_input = entry_ledger_code.get()
+        criteria = parse_criteria(start_date_input, end_date_input, min_cost_input, max_cost_input, ledger_code_input)
+    except CriteriaError as e:
+        results_view.set_rows([e.row])
+        return
+    except Exception as e:
+        results_view.set_rows([("Error", "Exception", str(e))])
+        return
 
-        try:
-            min_cost = float(min_cost_input) if min_cost_input else 0
-            max_cost = float(max_cost_input) if max_cost_input else float('inf')
-
-            min_cost = round(min_cost, 3)
-            max_cost = round(max_cost, 3)
-        except ValueError:
-            tree_output.delete(*tree_output.get_children())
-            tree_output.insert("", "end", values=("Error", "Invalid Input", "Please enter valid numeric values for minimum and maximum costs."))
+    # Extra checks from the rules file, re-read every run so edits apply without a restart
+    try:
+        rules = load_rules()
+    except RuleConfigError as e:
+        results_view.set_rows([("Error", "Rules File", str(e))])
+        return
+
+    # Checks to see if there is a file/file path selected
+    if not file_path.get():
+        results_view.set_rows([("Error", "Exception", "No file selected. Please drag and drop a file.")])
+        return
+
+    # Several sheets ("Fall, Winter" or * for all) and several dropped files are checked in one run
+    paths = selected_files or [file_path.get()]
+    sheet_names = parse_sheet_names(sheet_name)
+
+    # Loading and checking the sheet happen in the background so the window keeps responding
+    start_validation_worker(paths, sheet_names, criteria, rules, service)
+
+
+def start_validation_worker(paths, sheet_names, criteria, rules=None, service=None):
+    global validation_worker, validation_run, run_diagnostics
+    results_view.clear()
+    cancel_event.clear()
+    progress_bar.config(value=0, maximum=1)
+    label_progress.config(text="Loading file...")
+    button_validate.config(state="disabled")
+    button_cancel.config(state="normal")
+
+    # "Profile next run" only applies to this run
+    sheets_label = "all sheets" if sheet_names is None else ", ".join(sheet_names)
+    run_diagnostics = RunDiagnostics(
+        f"{', '.join(os.path.basename(path) for path in paths)} [{sheets_label}]", profile=profile_next_run.get()
+    )
+    profile_next_run.set(False)
+
+    # A new run id so messages still queued by a cancelled run can't leak into this one
+    validation_run += 1
+    validation_worker = threading.Thread(
+        target=run_validation,
+        args=(paths, sheet_names, criteria, rules, service, validation_run, run_diagnostics),
+        daemon=True,
+    )
+    validation_worker.start()
+    window.after(POLL_INTERVAL_MS, poll_validation_queue, validation_run)
+
+
+# Runs in the worker thread: never touches Tk, everything goes back through the queue
+# With a service (a ServiceClient) the workbooks are checked by the validation service instead,
+# which shares its cached results with everyone using it and applies its own rules file.
+def run_validation(paths, sheet_names, criteria, rules, service, run_id, diagnostics):
+    global validator
+    from multi_sheet import labelled_rows, trailing_sheet_rows, validate_workbooks
+    from streaming_reader import should_stream, validate_workbook_streaming
+    from validation_engine import (
+        IncrementalValidator, MissingColumnsError, ValidationCancelled, find_missing_columns,
+    )
+    from workbook_cache import load_sheet
+
+    send = lambda *message: validation_queue.put((run_id,) + message)
+    report_chunk = lambda done, total, rows: send("rows", done, total, rows)
+    outcome = ("error", "Validation stopped unexpectedly.")
+    diagnostics.start_profiling()
+    try:
+        if service is not None:
+            sheets = service.validate_workbooks(paths, sheet_names, criteria, cancel_event=cancel_event,
+                                                diagnostics=diagnostics)
+            # A single sheet is shown exactly like a local run of it
+            single = len(paths) == 1 and sheet_names is not None and len(sheet_names) == 1
+            runs = store_runs(
+                [(sheet.path, sheet.sheet_name, sheet.result, None if single else sheet.label)
+                 for sheet in sheets if sheet.result],
+                criteria,
+            )
+            if single:
+                if sheets[0].error is not None:
+                    outcome = ("error", sheets[0].error)
+                else:
+                    outcome = ("done", sheets[0].result.output_rows(), runs)
+                return
+            rows = [row for sheet in sheets if sheet.result for row in labelled_rows(sheet, sheet.result.issues)]
+            outcome = ("done", rows + trailing_sheet_rows(sheets, criteria['ledger_code']), runs)
             return
-        
-        # If one date box is filled then both boxes have to be filled (can be the same date if looking for a specific date)
-        if (start_date_input and not end_date_input) or (end_date_input and not start_date_input):
-            tree_output.insert("", "end", values=("Date Validation", "Error", "Both Start Date and End Date must be filled."))
+
+        # Several sheets or workbooks: each workbook is opened once and its sheets are checked side by side
+        if len(paths) > 1 or sheet_names is None or len(sheet_names) > 1:
+            report_sheet = lambda sheet, done, total: send(
+                "sheets", done, total, labelled_rows(sheet, sheet.result.issues) if sheet.result else []
+            )
+            sheets = validate_workbooks(
+                paths, sheet_names, criteria, on_sheet=report_sheet, cancel_event=cancel_event, diagnostics=diagnostics,
+                rules=rules,
+            )
+            runs = store_runs(
+                [(sheet.path, sheet.sheet_name, sheet.result, sheet.label) for sheet in sheets if sheet.result],
+                criteria,
+            )
+            outcome = ("done", trailing_sheet_rows(sheets, criteria['ledger_code']), runs)
             return
 
-        # If one cost box is filled requires both boxes to be filled (can be the same value)
-        if (min_cost_input and not max_cost_input) or (max_cost_input and not min_cost_input):
-            tree_output.insert("", "end", values=("Cost Validation", "Error", "Both Minimum Cost and Maximum Cost must be filled."))
-            return    
-
-        # Checks to see if there is a file/file path selected
-        if not file_path.get():
-            raise ValueError("No file selected. Please drag and drop a file.")
-
-        # Uploads excel sheet to a panda dataframe to be analyzed
-        df = pd.read_excel(file_path.get(), sheet_name=sheet_name)
-        global filtered_df
-        filtered_df = df
-        
-        # Changes user date inputs to 'date' data type in order to be compared to the sheet dates
-        start_date = datetime.strptime(start_date_input, "%m/%d/%y").date() if start_date_input else None
-        end_date = datetime.strptime(end_date_input, "%m/%d/%y").date() if end_date_input else None
-
-        # Defines the columns required of the sheet
-        required_columns = ['Start date', 'End date', 'Cost', 'Activity', 'Ledger code']
-        missing_columns = [col for col in required_columns if col.lower() not in map(str.lower, df.columns)]
-        
-        # Gets rid of the empty columns if there are any
-        if missing_columns:
-            tree_output.delete(*tree_output.get_children())
-            tree_output.insert("", "end", values=("Error", "Missing Columns", f"Required columns: {', '.join(missing_columns)}"))
+        path, sheet_name = paths[0], sheet_names[0]
+
+        # Very large workbooks are read and checked a chunk of rows at a time so they never sit in memory whole
+        if should_stream(path):
+            result = validate_workbook_streaming(
+                path, sheet_name, **criteria, on_chunk=report_chunk, cancel_event=cancel_event, diagnostics=diagnostics,
+                rules=rules,
+            )
+            runs = store_runs([(path, sheet_name, result, None)], criteria)
+            outcome = ("done", result.trailing_rows(), runs)
             return
 
-        # Initializes all variables counters
-        num_of_wrong_start_date = 0
-        num_of_correct_start_date = 0
-        num_of_wrong_end_date = 0
-        num_of_correct_end_date = 0
-        num_of_both_out_of_bounds = 0
-        num_of_invalid_cost = 0
-        num_of_valid_cost = 0
-        num_of_ledger_code_activities = 0
-        total_num_of_activities = len(df)
-
-        df['Start date'] = pd.to_datetime(df['Start date'], format='%m/%d/%y')
-        df['End date'] = pd.to_datetime(df['End date'], format='%m/%d/%y')
-
-        tree_output.delete(*tree_output.get_children())
-        # Checks to see if the user entered a ledger code to be searched for
-        if ledger_code_input:
-            ledger_code_input = ledger_code_input.strip() # Deletes the extra spaces before and after the code to make it easier for the user to copy and paste the code from the sheet
-            df = df[df['Ledger code'].str.contains(ledger_code_input, na=False, case=False)]
-            num_of_ledger_code_activities = len(df)
-            if df.empty:
-                tree_output.insert("", "end", values=("No Match", "Ledger code", f"No entries found for {ledger_code_input}."))
+        # Uploads excel sheet to a panda dataframe to be analyzed (reused from the cache if the file hasn't changed)
+        with diagnostics.stage("load"):
+            df = load_sheet(path, sheet_name)
+        if cancel_event.is_set():
+            raise ValidationCancelled()
+
+        # Checks the sheet has all the columns required for validation
+        missing_columns = find_missing_columns(df)
+        if missing_columns:
+            raise MissingColumnsError(missing_columns)
+
+        # Checks the sheet a chunk at a time, sending each chunk's issues to the UI as it goes.
+        # Only the rules whose criteria (or rules file) changed since the last run on this sheet are re-evaluated.
+        validator = validator or IncrementalValidator()
+        result = validator.validate(
+            df, **criteria, on_chunk=report_chunk, cancel_event=cancel_event, diagnostics=diagnostics, rules=rules,
+        )
+        runs = store_runs([(path, sheet_name, result, None)], criteria)
+        outcome = ("done", result.trailing_rows(), runs)
+
+    except MissingColumnsError as e:
+        outcome = ("done", [("Error", "Missing Columns", str(e))])
+    except ValidationCancelled:
+        outcome = ("cancelled",)
+    except Exception as e:
+        outcome = ("error", str(e))
+    finally:
+        # The profile is saved before the UI hears the run is over
+        try:
+            diagnostics.stop_profiling()
+        finally:
+            send(*outcome)
+
+
+# Hands every validated sheet to the results store's writer thread, so the results are shown
+# without waiting for their issues to be written. Returns (future run id, label) pairs.
+def store_runs(sheets, criteria):
+    from results_store import results_store
+    return [
+        (results_store.save_run_later(path, sheet_name, criteria, result), label)
+        for path, sheet_name, result, label in sheets
+    ]
+
+
+# Once the runs handed to the store are written, they become the runs "Compare with Last Run" and
+# "Export" use. pending is dropped if the results were cleared or replaced in the meantime; a store
+# that can't be written only costs the diff.
+def poll_saved_runs(pending):
+    global pending_runs
+    if pending is not pending_runs:
+        return
+    if not all(future.done() for future, _ in pending):
+        window.after(POLL_INTERVAL_MS, poll_saved_runs, pending)
+        return
+    pending_runs = []
+    runs = []
+    for future, label in pending:
+        try:
+            runs.append((future.result(), label))
+        except (sqlite3.Error, OSError) as e:
+            results_view.extend([("Error", "Results Store", f"Run not saved: {e}")])
+    last_runs[:] = runs
+
+
+def wait_for_saved_runs(pending):
+    global pending_runs
+    last_runs.clear()
+    pending_runs = list(pending)
+    poll_saved_runs(pending_runs)
+
+
+# Moves the worker's results into the results view, a batch at a time. Polling stops once the run
+# is no longer the current one (cleared, or replaced by a new run), and messages of other runs
+# are dropped.
+def poll_validation_queue(run_id):
+    if run_id != validation_run:
+        return
+    try:
+        while True:
+            tagged = validation_queue.get_nowait()
+            if tagged[0] != run_id:
+                continue
+            message = tagged[1:]
+            kind = message[0]
+            if kind == "rows":
+                _, done, total, rows = message
+                with run_diagnostics.stage("render"):
+                    results_view.extend(rows)
+                progress_bar.config(value=done, maximum=max(total, 1))
+                label_progress.config(text=f"Checked {done} / {total} rows")
+            elif kind == "sheets":
+                _, done, total, rows = message
+                with run_diagnostics.stage("render"):
+                    results_view.extend(rows)
+                progress_bar.config(value=done, maximum=max(total, 1))
+                label_progress.config(text=f"Checked {done} / {total} sheets")
+            elif kind == "done":
+                with run_diagnostics.stage("render"):
+                    results_view.extend(message[1])
+                wait_for_saved_runs(message[2] if len(message) > 2 else [])
+                finish_validation("Validation complete.", "ok")
                 return
-        else:
-            num_of_ledger_code_activities = 0
-        # Loop to check every row in the excel sheet
-        for i, row in df.iterrows():
-            row_start_date = row['Start date'].date()
-            row_end_date = row['End date'].date()
-            row_cost = row['Cost']
-
-            # Checks start date and end date to see if its within the time frame
-            if start_date and end_date and row_start_date < start_date and row_end_date > end_date:
-                tree_output.insert("", "end", values=(
-                    df.loc[i, 'Activity'],
-                    "Both Dates Out of Bounds",
-                    f"Start: {row_start_date}, End: {row_end_date}"
-                ))
-                num_of_both_out_of_bounds += 1
-            else:
-                if start_date and row_start_date < start_date:
-                    tree_output.insert("", "end", values=(
-                        df.loc[i, 'Activity'],
-                        "Invalid Start Date",
-                        f"Start: {row_start_date}, starts before the expected start date of: {start_date}"
-                    ))
-                    num_of_wrong_start_date += 1
-                else:
-                    num_of_correct_start_date += 1
-
-                if end_date and row_end_date > end_date:
-                    tree_output.insert("", "end", values=(
-                        df.loc[i, 'Activity'],
-                        "Invalid End Date",
-                        f"End: {row_end_date}, ends after the expected end date of: {end_date}"
-                    ))
-                    num_of_wrong_end_date += 1
-                else:
-                    num_of_correct_end_date += 1
-            # checks all costs with in the sheet to make sure it is in range
-            if min_cost and max_cost and (row_cost < min_cost or row_cost > max_cost):
-                tree_output.insert("", "end", values=(
-                    df.loc[i, 'Activity'],
-                    "Invalid Cost",
-                    f"Cost: {row_cost}, Expected between {min_cost} and {max_cost}"
-                ))
-                num_of_invalid_cost += 1
-            else:
-                num_of_valid_cost += 1
-                
-        # Itterates through the sheet for the ledger codes   
-        if ledger_code_input:
-            for i, row in df.iterrows():
-                tree_output.insert("", "end", values=(
-                    row['Activity'],
-                    "Ledger Code Match",
-                    f"Ledgercode: {row['Ledger code']}"
-                ))
-            
-            
-            # Insert ledger code summary
-            tree_output.insert("", "end", values=(
-                "Summary", 
-                "Ledger Code Matches", 
-                f"{num_of_ledger_code_activities} activities match Ledger Code: {ledger_code_input}"
-            ))
-
-        # Existing summaries for start dates, end dates, and costs (print the tree)
-        tree_output.insert("", "end", values=(
-            "Summary", "Valid Start Dates", f"{max(0, num_of_correct_start_date)} / {total_num_of_activities}"
-        ))
-        tree_output.insert("", "end", values=(
-            "Summary", "Invalid Start Dates", f"{max(0, num_of_wrong_start_date)} / {total_num_of_activities}"
-        ))
-        tree_output.insert("", "end", values=(
-            "Summary", "Valid End Dates", f"{max(0, num_of_correct_end_date)} / {total_num_of_activities}"
-        ))
-        tree_output.insert("", "end", values=(
-            "Summary", "Invalid End Dates", f"{max(0, num_of_wrong_end_date)} / {total_num_of_activities}"
-        ))
-        tree_output.insert("", "end", values=(
-            "Summary", "Valid Costs", f"{max(0, num_of_valid_cost)}"
-        ))
-        tree_output.insert("", "end", values=(
-            "Summary", "Invalid Costs", f"{max(0, num_of_invalid_cost)}"
-        ))
+            elif kind == "error":
+                results_view.set_rows([("Error", "Exception", message[1])])
+                finish_validation("Validation failed.", "error")
+                return
+            elif kind == "cancelled":
+                finish_validation("Validation cancelled.", "cancelled")
+                return
+    except queue.Empty:
+        pass
+    window.after(POLL_INTERVAL_MS, poll_validation_queue, run_id)
+
+
+def finish_validation(status, outcome):
+    label_progress.config(text=status)
+    button_validate.config(state="normal")
+    button_cancel.config(state="disabled")
+
+    # Records where the time went: status bar, diagnostics panel and the rotating run log
+    summary = run_diagnostics.summary()
+    if run_diagnostics.profile_path:
+        summary += f" | profile saved to {run_diagnostics.profile_path}"
+    label_status.config(text=summary)
+    try:
+        run_diagnostics.log(outcome)
+    except OSError as e:
+        label_status.config(text=f"{summary} (run log not written: {e})")
+    update_diagnostics_panel()
+
+
+# Shows how the issues changed since the previous run of the same file and sheet
+def compare_with_last_run():
+    if pending_runs:
+        messagebox.showinfo("Compare", "The results are still being saved, try again in a moment.")
+        return
+    if not last_runs:
+        messagebox.showinfo("Compare", "Validate a file first.")
+        return
+    from results_store import diff_rows, results_store
+    rows = []
+    try:
+        for run_id, label in last_runs:
+            previous_run_id = results_store.previous_run(run_id)
+            if previous_run_id is None:
+                rows.append(("Diff", "No Earlier Run", f"{label or 'This sheet'} has not been validated before."))
+                continue
+            rows.extend(diff_rows(results_store.diff(run_id, previous_run_id), label))
+    except sqlite3.Error as e:
+        rows.append(("Error", "Results Store", str(e)))
+    filter_entry.delete(0, tk.END)
+    results_view.set_filter("")
+    results_view.set_rows(rows)
+    label_progress.config(text="Showing changes since the last run (validate again to see all results).")
+
+
+# Writes every issue and the summaries of the last run to a CSV, XLSX or JSON file. The issues are
+# streamed from the results store in the background, so the window keeps responding.
+def export_results():
+    global export_worker
+    if pending_runs:
+        messagebox.showinfo("Export", "The results are still being saved, try again in a moment.")
+        return
+    if not last_runs:
+        messagebox.showinfo("Export", "Validate a file first.")
+        return
+    if any(worker is not None and worker.is_alive() for worker in (validation_worker, export_worker)):
+        return
+    from results_export import EXPORT_FORMATS
+    path = filedialog.asksaveasfilename(
+        title="Export results",
+        defaultextension=".xlsx",
+        filetypes=[(name, f"*{extension}") for extension, name in EXPORT_FORMATS.items()],
+    )
+    if not path:
+        return
+
+    cancel_event.clear()
+    progress_bar.config(value=0, maximum=1)
+    label_progress.config(text="Exporting...")
+    button_validate.config(state="disabled")
+    button_export.config(state="disabled")
+    button_cancel.config(state="normal")
+
+    messages = queue.Queue()
+    export_worker = threading.Thread(target=run_export, args=(list(last_runs), path, messages), daemon=True)
+    export_worker.start()
+    window.after(POLL_INTERVAL_MS, poll_export_queue, messages)
+
+
+# Starts or stops watching a folder. New or changed workbooks in it are validated with the criteria
+# of the fields (empty fields take the ones saved by the last watch), and only their changed rows
+# are checked again. The latest validated sheet is shown in the results view.
+def toggle_watch():
+    global watch_thread, watch_stop_event
+    if watch_thread is not None and watch_thread.is_alive():
+        watch_stop_event.set()
+        button_watch.config(text="Watch Folder")
+        label_progress.config(text="Stopped watching.")
+        return
+    from validation_engine import CriteriaError
+    from watch_folder import load_settings, save_settings, watcher_from_settings
+
+    settings = load_settings()
+    fields = {
+        'sheet': entry_sheet_name, 'start_date': entry_start_date, 'end_date': entry_end_date,
+        'min_cost': entry_min_cost, 'max_cost': entry_max_cost, 'ledger_code': entry_ledger_code,
+    }
+    for name, entry in fields.items():
+        if not entry.get() and settings[name]:
+            entry.insert(0, settings[name])
+    folder = filedialog.askdirectory(title="Watch folder", initialdir=settings['folder'] or None)
+    if not folder:
+        return
+
+    settings = dict({name: entry.get() for name, entry in fields.items()}, folder=folder)
+    messages = queue.Queue()
+    try:
+        watcher = watcher_from_settings(settings, on_event=messages.put)
+    except CriteriaError as e:
+        results_view.set_rows([e.row])
+        return
+    try:
+        save_settings(settings)
+    except OSError as e:
+        label_status.config(text=f"Watch settings not saved: {e}")
+
+    watch_stop_event = threading.Event()
+    watch_thread = threading.Thread(target=watcher.run, args=(watch_stop_event,), daemon=True)
+    watch_thread.start()
+    button_watch.config(text="Stop Watching")
+    label_progress.config(text=f"Watching {folder}...")
+    window.after(POLL_INTERVAL_MS, poll_watch_queue, messages, watch_stop_event)
+
+
+def poll_watch_queue(messages, stop_event):
+    if stop_event.is_set():
+        return
+    # Events wait while a validation is filling the results view
+    if validation_worker is None or not validation_worker.is_alive():
+        try:
+            while True:
+                show_watch_event(messages.get_nowait())
+        except queue.Empty:
+            pass
+    window.after(POLL_INTERVAL_MS, poll_watch_queue, messages, stop_event)
+
+
+def show_watch_event(event):
+    name = f"{os.path.basename(event.path)} [{event.sheet_name}]"
+    if event.error is not None:
+        results_view.set_rows([("Error", name, event.error)])
+        label_progress.config(text=f"{name} could not be validated (still watching).")
+        return
+    results_view.set_rows(event.result.output_rows())
+    wait_for_saved_runs([(event.saved_run, None)])
+    label_progress.config(
+        text=f"{name}: checked {event.changed_rows} of {event.total_rows} rows in {event.seconds:.2f}s (still watching)."
+    )
 
+
+# Runs in the export thread: like run_validation, it only talks to the UI through the queue
+def run_export(runs, path, messages):
+    from results_export import export_runs
+    from validation_engine import ValidationCancelled
+    outcome = ("error", "Export stopped unexpectedly.")
+    try:
+        written = export_runs(
+            runs, path, on_progress=lambda done, total: messages.put(("progress", done, total)),
+            cancel_event=cancel_event,
+        )
+        outcome = ("done", f"Exported {written} issues to {path}")
+    except ValidationCancelled:
+        outcome = ("cancelled",)
     except Exception as e:
-        tree_output.delete(*tree_output.get_children())
-        tree_output.insert("", "end", values=("Error", "Exception", str(e)))
+        outcome = ("error", str(e))
+    finally:
+        messages.put(outcome)
+
+
+def poll_export_queue(messages):
+    try:
+        while True:
+            message = messages.get_nowait()
+            if message[0] == "progress":
+                _, done, total = message
+                progress_bar.config(value=done, maximum=max(total, 1))
+                label_progress.config(text=f"Exported {done} / {total} issues")
+                continue
+            if message[0] == "done":
+                label_progress.config(text=message[1])
+            elif message[0] == "cancelled":
+                label_progress.config(text="Export cancelled.")
+            else:
+                label_progress.config(text="Export failed.")
+                messagebox.showerror("Export", message[1])
+            button_validate.config(state="normal")
+            button_export.config(state="normal")
+            button_cancel.config(state="disabled")
+            return
+    except queue.Empty:
+        pass
+    window.after(POLL_INTERVAL_MS, poll_export_queue, messages)
+
+
+# Window listing every stage of the last run with its time and memory change
+def show_diagnostics_panel():
+    global diagnostics_panel, diagnostics_tree, label_diagnostics_files
+    if diagnostics_panel is not None and diagnostics_panel.winfo_exists():
+        diagnostics_panel.lift()
+        update_diagnostics_panel()
+        return
+
+    diagnostics_panel = tk.Toplevel(window)
+    diagnostics_panel.title("Run Diagnostics")
+    diagnostics_panel.geometry("520x320")
+    diagnostics_tree = ttk.Treeview(
+        diagnostics_panel, columns=("Stage", "Seconds", "Memory", "Calls"), show="headings", height=10
+    )
+    for column, text, width in (("Stage", "Stage", 180), ("Seconds", "Seconds", 100),
+                                ("Memory", "Memory (MB)", 110), ("Calls", "Calls", 80)):
+        diagnostics_tree.heading(column, text=text)
+        diagnostics_tree.column(column, width=width, anchor="w")
+    diagnostics_tree.pack(fill="both", expand=True, padx=10, pady=10)
+    label_diagnostics_files = ttk.Label(diagnostics_panel, text="", wraplength=480)
+    label_diagnostics_files.pack(fill="x", padx=10, pady=(0, 10))
+    update_diagnostics_panel()
+
+
+def update_diagnostics_panel():
+    if diagnostics_panel is None or not diagnostics_panel.winfo_exists():
+        return
+    diagnostics_tree.delete(*diagnostics_tree.get_children())
+    if run_diagnostics is None:
+        label_diagnostics_files.config(text="No validation has run yet.")
+        return
+    for row in run_diagnostics.rows():
+        diagnostics_tree.insert("", tk.END, values=row)
+    details = [f"{run_diagnostics.label}: total {run_diagnostics.total_seconds:.2f}s"]
+    if run_diagnostics.profile_path:
+        details.append(f"Profile: {run_diagnostics.profile_path}")
+    if run_diagnostics.snapshot_path:
+        details.append(f"Memory snapshot: {run_diagnostics.snapshot_path}")
+    label_diagnostics_files.config(text="\n".join(details))
+
+
+# Re-enables Validate once the worker of a cleared run has stopped
+def wait_for_worker_exit(worker):
+    if worker.is_alive():
+        window.after(POLL_INTERVAL_MS, wait_for_worker_exit, worker)
+        return
+    if worker is validation_worker:
+        button_validate.config(state="normal")
+        label_progress.config(text="Validation cancelled.")
+
+
+# Asks the worker to stop; it checks between chunks so it stops within one chunk
+def cancel_validation():
+    if any(worker is not None and worker.is_alive() for worker in (validation_worker, export_worker)):
+        cancel_event.set()
+        label_progress.config(text="Cancelling...")
 
 def show_calendar_start(event=None):
     global calendar_start
+    from tkcalendar import DateEntry
     calendar_start = DateEntry(window, date_pattern="dd/mm/yyyy")
     calendar_start.place(x=entry_start_date.winfo_x(), y=entry_start_date.winfo_y() + entry_start_date.winfo_height())
     calendar_start.bind("<FocusOut>", lambda e: calendar_start.place_forget())
@@ -239,6 +611,7 @@ def show_calendar_start(event=None):
 
 def show_calendar_end(event=None):
     global calendar_end
+    from tkcalendar import DateEntry
     calendar_end = DateEntry(window, date_pattern = "dd/mm/yyyy")
     calendar_end.place(x=entry_start_date.winfo_x(), y=entry_start_date.winfo_y() + entry_start_date.winfo_height())
     calendar_end.bind("<FocusOut>", lambda e: calendar_start.place_forget())
@@ -251,42 +624,29 @@ def hide_calendar(event):
             if calendar_end.winfo_ismapped():
                 calendar_end.place_forget()
 
-# Function to extract ledger codes after file upload:
+# Function to index the ledger codes after file upload (built once per file for the autocomplete):
 def extract_ledger_codes():
+    from ledger_index import LedgerCodeIndex
+    from workbook_cache import load_sheet
     if not file_path.get():
         label_file_path.config(text="No file selected.")
-        return []
+        return LedgerCodeIndex([])
     try:
-        df = pd.read_excel(file_path.get())
+        df = load_sheet(file_path.get())
         if 'Ledger code' not in df.columns:
             label_file_path.config(text="No 'Ledger code' column found in the file.")
-            return []
-        unique_ledger_codes = df['Ledger code'].dropna().unique()
-        return sorted(map(str, unique_ledger_codes))
+            return LedgerCodeIndex([])
+        return LedgerCodeIndex(df['Ledger code'])
     except Exception as e:
         label_file_path.config(text=f"Error reading file: {e}")
-        return []
+        return LedgerCodeIndex([])
 
 # Autocomplete functionality
 def autocomplete_ledger_code(event):
     if 'suggestion_box' not in globals():
         setup_suggestion_box()
 
-    # Get the current input
-    query = entry_ledger_code.get().lower()
-
-    # Filter ledger codes based on input
-    filtered_codes = [code for code in ledger_codes if query in code.lower()]
-
-    # Update the suggestion box
-    suggestion_box.delete(0, tk.END)
-    for code in filtered_codes:
-        suggestion_box.insert(tk.END, code)
-
-    # Adjust height dynamically based on the filtered results
-    suggestion_box.config(height=min(10, len(filtered_codes)))
-
-    # Show the suggestion box
+    # Show the suggestion box with the codes starting with, then containing, the current input (looked up in the index)
     show_suggestion_box()
 
 
@@ -306,10 +666,10 @@ def select_suggestion(event):
 
 # Setup ledger code suggestion box
 def setup_suggestion_box():
-    global suggestion_box, ledger_codes
+    global suggestion_box, ledger_index
 
     # Extract ledger codes
-    ledger_codes = extract_ledger_codes()
+    ledger_index = extract_ledger_codes()
 
     # Initialize suggestion box if not already created
     if 'suggestion_box' not in globals():
@@ -319,7 +679,7 @@ def setup_suggestion_box():
         suggestion_box.bind("<<ListboxSelect>>", select_suggestion)
 
     # Dynamically adjust suggestion box height to fit the number of ledger codes
-    suggestion_box.config(height=min(10, len(ledger_codes)))  # Show up to 10 items
+    suggestion_box.config(height=min(10, len(ledger_index)))  # Show up to 10 items
 
     # Bind <FocusOut> to the root window to hide the suggestion box
     window.bind("<Button-1>", handle_focus_out)
@@ -338,10 +698,12 @@ def show_suggestion_box(event=None):
     if 'suggestion_box' not in globals():
         setup_suggestion_box()
 
-    # Populate the suggestion box with all ledger codes
-    suggestion_box.delete(0, tk.END)  # Clear any existing items
-    for code in ledger_codes:
-        suggestion_box.insert(tk.END, code)
+    # Populate the suggestion box with the ledger codes matching the input (all codes when it's empty)
+    suggestions = ledger_index.suggestions(entry_ledger_code.get())
+    update_suggestion_box(suggestions)
+
+    # Adjust height dynamically based on the filtered results
+    suggestion_box.config(height=min(10, len(suggestions)))
 
     # Position the suggestion box below the entry field
     x = entry_ledger_code.winfo_rootx() - window.winfo_rootx()
@@ -352,32 +714,57 @@ def show_suggestion_box(event=None):
     entry_ledger_code.focus_set()
 
 
-# Allows user to drag and drop a file to be proccessed
+# Remembers the chosen files; several can be validated in one run
+def select_files(paths):
+    selected_files[:] = paths
+    file_path.set(paths[0])
+    if len(paths) == 1:
+        label_file_path.config(text=f"Selected File: {paths[0]}")
+    else:
+        label_file_path.config(text=f"Selected {len(paths)} Files: {', '.join(os.path.basename(p) for p in paths)}")
+
+# Allows user to drag and drop files to be proccessed (Tk hands them over as a list, braced if they contain spaces)
 def on_file_drop(event):
-    file_path.set(event.data)
-    label_file_path.config(text=f"Selected File: {event.data}")
+    paths = list(window.tk.splitlist(event.data))
+    if paths:
+        select_files(paths)
 
-# Allows user to upload a file from system
+# Allows user to upload files from system
 def upload_file():
     global file_path
-    selected_file = filedialog.askopenfilename(
-        title="Select a file",
+    selected = filedialog.askopenfilenames(
+        title="Select one or more files",
         filetypes=(("Excel Files", ".*xlsx;*.xls"), ("All Files", "*.*"))
     )
-    if selected_file:
-        file_path.set(selected_file)
-        label_file_path.config(text=f"Selected File: {selected_file}")
+    if selected:
+        select_files(list(selected))
     else:
         label_file_path.config(text="No File Selected. Please Try Again.")
 
 
 # Clears all fields in the program
 def clear_fields():
-    tree_output.delete(*tree_output.get_children())
+    global validation_run
+    running = validation_worker is not None and validation_worker.is_alive()
+    cancel_validation()
+    # The cancelled run is dropped at once: nothing it already queued reaches the cleared view. Its
+    # worker may still be loading the sheet, which can't be interrupted, so Validate stays disabled
+    # until the worker has exited.
+    if running:
+        validation_run += 1
+        finish_validation("Validation cancelled.", "cancelled")
+        button_validate.config(state="disabled")
+        label_progress.config(text="Cancelling...")
+        window.after(POLL_INTERVAL_MS, wait_for_worker_exit, validation_worker)
+    results_view.clear()
+    wait_for_saved_runs([])
+    filter_entry.delete(0, tk.END)
+    results_view.set_filter("")
     entry_start_date.delete(0, tk.END)
     entry_end_date.delete(0, tk.END)
     entry_sheet_name.delete(0, tk.END)
     file_path.set("")
+    selected_files.clear()
     label_file_path.config(text="Drag and Drop a file here")
     entry_min_cost.delete(0, tk.END)
     entry_max_cost.delete(0, tk.END)
@@ -388,8 +775,105 @@ def clear_fields():
 def quit_program():
     window.quit()
 
+
+# Records the time taken since the previous startup stage
+def mark_startup(stage):
+    global startup_mark
+    now = time.perf_counter()
+    startup_diagnostics.add(stage, now - startup_mark)
+    startup_mark = now
+
+
+# Loads tkdnd into the already shown window and makes the file label a drop target
+def enable_file_drop():
+    try:
+        from tkinterdnd2 import DND_FILES, TkinterDnD
+        TkinterDnD.require(window)
+    except (ImportError, RuntimeError, tk.TclError):
+        label_file_path.config(text="Drag and drop unavailable, use Upload File")
+        return
+    label_file_path.drop_target_register(DND_FILES)
+    label_file_path.dnd_bind('<<Drop>>', on_file_drop)
+
+
+# Imports the heavy modules in the background so the first validation doesn't wait for them
+def warm_up():
+    for module in WARM_UP_MODULES:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+    warm_up_done.set()
+
+
+# Replaces the plain date fields with calendar pickers, keeping anything already typed
+def build_date_entries():
+    try:
+        from tkcalendar import DateEntry
+    except ImportError:
+        return
+    for var_name, row in (("entry_start_date", 1), ("entry_end_date", 2)):
+        plain_entry = globals()[var_name]
+        text = plain_entry.get()
+        had_focus = window.focus_get() is plain_entry
+        date_entry = DateEntry(frame_inputs, **DATE_ENTRY_STYLE)
+        date_entry.grid(row=row, column=1, sticky="ew", pady=5)
+
+        # Clearing the Calendar fields so it doesnt filter by Calendar of the bat
+        date_entry.delete(0, tk.END)
+        date_entry.insert(0, text)
+        plain_entry.destroy()
+        globals()[var_name] = date_entry
+        if had_focus:
+            date_entry.focus_set()
+
+
+# Runs once Tk has drawn the window: everything after this happens while the user can already type
+def on_first_paint():
+    global window_shown_seconds
+    mark_startup("first paint")
+    window_shown_seconds = startup_diagnostics.total_seconds
+    enable_file_drop()
+    mark_startup("drag and drop")
+    threading.Thread(target=warm_up, daemon=True).start()
+    window.after(POLL_INTERVAL_MS, finish_startup)
+
+
+def finish_startup():
+    if not warm_up_done.is_set():
+        window.after(POLL_INTERVAL_MS, finish_startup)
+        return
+    mark_startup("warm-up")
+    build_date_entries()
+    mark_startup("calendars")
+
+    # Startup times go to the run log so a slower startup shows up next to the validation runs
+    label_status.config(
+        text=f"Window shown in {window_shown_seconds:.2f}s, ready in {startup_diagnostics.total_seconds:.2f}s"
+    )
+    try:
+        startup_diagnostics.log("startup")
+    except OSError:
+        pass
+    if MEASURE_STARTUP:
+        print(json.dumps({
+            'window_shown': window_shown_seconds,
+            'ready': startup_diagnostics.total_seconds,
+            'stages': {name: entry['seconds'] for name, entry in startup_diagnostics.stages.items()},
+        }))
+        window.destroy()
+
+
+# Startup timing (--measure-startup prints it and exits, for benchmarks/run_benchmarks.py)
+MEASURE_STARTUP = '--measure-startup' in sys.argv
+startup_diagnostics = RunDiagnostics("startup")
+startup_mark = STARTUP_STARTED
+window_shown_seconds = None
+warm_up_done = threading.Event()
+mark_startup("imports")
+
 # GUI setup
-window = TkinterDnD.Tk()
+window = tk.Tk()
 window.title("Amilia Date and Cost Checker")
 window.geometry("800x600")
 
@@ -416,8 +900,6 @@ frame_output.grid(row=1, column=0, sticky="nsew", padx=10, pady=10)
 file_path = tk.StringVar()
 label_file_path = ttk.Label(frame_inputs, text="Drag and drop a file here", relief="solid", font=("Arial", 14))
 label_file_path.grid(row=0, column=0, columnspan=2, sticky="ew", pady=5, ipadx=10, ipady=10)
-label_file_path.drop_target_register(DND_FILES)
-label_file_path.dnd_bind('<<Drop>>', on_file_drop)
 
 # Input labels and entry fields
 fields = [
@@ -426,7 +908,7 @@ fields = [
     ("Minimum Cost:", "entry_min_cost"),
     ("Maximum Cost:", "entry_max_cost"),
     ("Ledger Code:", "entry_ledger_code"),
-    ("Sheet Name (Required):", "entry_sheet_name"),
+    ("Sheet Name(s) (Required, * for all):", "entry_sheet_name"),
 ]
 
 for i, (label_text, var_name) in enumerate(fields):
@@ -451,6 +933,31 @@ button_upload.grid(row=0, column=2, padx=5)
 button_quit = ttk.Button(frame_buttons, text="Quit", command=quit_program, style="TButton.quit.TButton")
 button_quit.grid(row=0, column=3, padx=5)
 
+button_cancel = ttk.Button(frame_buttons, text="Cancel", command=cancel_validation, state="disabled")
+button_cancel.grid(row=0, column=4, padx=5)
+
+button_diagnostics = ttk.Button(frame_buttons, text="Diagnostics", command=show_diagnostics_panel)
+button_diagnostics.grid(row=0, column=5, padx=5)
+
+button_compare = ttk.Button(frame_buttons, text="Compare with Last Run", command=compare_with_last_run)
+button_compare.grid(row=0, column=6, padx=5)
+
+button_export = ttk.Button(frame_buttons, text="Export", command=export_results)
+button_export.grid(row=0, column=7, padx=5)
+
+button_watch = ttk.Button(frame_buttons, text="Watch Folder", command=toggle_watch)
+button_watch.grid(row=0, column=8, padx=5)
+
+# Captures the next run with cProfile and tracemalloc (saved next to the run log)
+profile_next_run = tk.BooleanVar(value=False)
+check_profile = ttk.Checkbutton(frame_buttons, text="Profile next run", variable=profile_next_run)
+check_profile.grid(row=1, column=0, columnspan=4, pady=(5, 0))
+
+# Sends the workbooks to the shared validation service (see validation_service.py) instead of checking them here
+use_service = tk.BooleanVar(value=False)
+check_service = ttk.Checkbutton(frame_buttons, text="Use validation service", variable=use_service)
+check_service.grid(row=1, column=4, columnspan=4, pady=(5, 0))
+
 # Treeview for output
 tree_output = ttk.Treeview(frame_output, columns=("Activity", "Issue", "Details"), show="headings", height=15)
 tree_output.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
@@ -466,10 +973,22 @@ tree_output.column("Issue", width=200, anchor="w")
 tree_output.column("Details", width=400, anchor="w")
 
 # Scrollbar for the Treeview
-scrollbar = ttk.Scrollbar(frame_output, orient="vertical", command=tree_output.yview)
-tree_output.configure(yscrollcommand=scrollbar.set)
+scrollbar = ttk.Scrollbar(frame_output, orient="vertical")
 scrollbar.grid(row=0, column=1, sticky="ns")
 
+# Progress of the running validation
+progress_bar = ttk.Progressbar(frame_output, orient="horizontal", mode="determinate")
+progress_bar.grid(row=1, column=0, padx=10, sticky="ew")
+label_progress = ttk.Label(frame_output, text="")
+label_progress.grid(row=2, column=0, padx=10, sticky="w")
+
+# Status bar with the stage timings of the last run
+label_status = ttk.Label(window, text="", relief="sunken", anchor="w")
+label_status.grid(row=2, column=0, sticky="ew")
+
+# Results are kept in a backing store and only the visible rows are drawn (headings sort the results)
+results_view = VirtualTreeview(tree_output, scrollbar)
+
 # Configure grid weights for resizing
 window.columnconfigure(0, weight=1)
 window.rowconfigure(1, weight=1)
@@ -478,6 +997,7 @@ frame_output.rowconfigure(0, weight=1)
 
 # Ledger code drop box
 entry_ledger_code.bind("<FocusIn>", show_suggestion_box)
+entry_ledger_code.bind("<KeyRelease>", autocomplete_ledger_code)
 entry_ledger_code.bind("<FocusOut>", lambda _: suggestion_box.place_forget())
 
 # Add ledger code suggestion setup after file upload
@@ -488,9 +1008,8 @@ window.bind("<Return>", lambda event: validate_dates_and_cost())
 window.bind("<Escape>", lambda event: quit_program())
 window.bind("<Button-1>", hide_calendar) # Handles hiding the calendar if the user clicks elsewhere
 
-# Calendar customization for start and end dates
-entry_start_date = DateEntry(
-    frame_inputs,
+# Calendar customization for start and end dates (the calendars replace the plain fields after the first paint)
+DATE_ENTRY_STYLE = dict(
     width=12,
     background='blue',
     foreground='white',
@@ -508,28 +1027,6 @@ entry_start_date = DateEntry(
     othermonthbackground='lightgray',
     othermonthforeground='blue'
 )
-entry_start_date.grid(row=1, column=1, sticky="ew", pady=5)
-
-entry_end_date = DateEntry(
-    frame_inputs,
-    width=12,
-    background='blue',
-    foreground='white',
-    borderwidth=2,
-    arrowsize=15,
-    font=("Arial", 12),
-    headersbackground='white',
-    headersforeground='black',
-    selectbackground='blue',
-    selectforeground='white',
-    normalbackground='white',
-    normalforeground='blue',
-    weekendbackground='lightblue',
-    weekendforeground='darkblue',
-    othermonthbackground='lightgray',
-    othermonthforeground='blue'
-)
-entry_end_date.grid(row=2, column=1, sticky="ew", pady=5)
 
 # Search functionality
 ttk.Label(frame_inputs, text="Search Activity:").grid(row=8, column=0, sticky="w", pady=5)
@@ -539,9 +1036,14 @@ search_entry.grid(row=8, column=1, pady=5)
 btn_search = ttk.Button(frame_inputs, text="Search", command=search_output)
 btn_search.grid(row=8, column=2, sticky="e", pady=5)
 
-# Clearing the Calendar fields so it doesnt filter by Calendar of the bat
-entry_start_date.delete(0, tk.END)
-entry_end_date.delete(0, tk.END)
-    
-# Start the GUI loop
+# Filters the results as the user types (any column, case-insensitive)
+ttk.Label(frame_inputs, text="Filter Results:").grid(row=9, column=0, sticky="w", pady=5)
+filter_entry = ttk.Entry(frame_inputs, width=40)
+filter_entry.grid(row=9, column=1, pady=5)
+filter_entry.bind("<KeyRelease>", lambda event: results_view.set_filter(filter_entry.get()))
+
+mark_startup("widgets")
+
+# Start the GUI loop (idle callbacks run after Tk has drawn the window)
+window.after_idle(on_first_paint)
 window.mainloop()
\ No newline at end of file
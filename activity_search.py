@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+from fuzzywuzzy import fuzz
+
+# Score (out of 100) from which an activity counts as a match
+MATCH_THRESHOLD = 70
+
+
+# Fuzzy search over the activity column of a result set. Activity names repeat a lot, so the
+# index keeps each distinct (lowercased) name once with the row positions where it appears. The
+# names are ordered by a cheap upper bound on fuzz.partial_ratio (from the characters they have
+# in common with the query) and names that can't reach the threshold, or beat the best score so
+# far, are never scored. Every other name is, so the matches are exactly those of a full scan.
+class ActivitySearchIndex:
+    def __init__(self, activities):
+        # Distinct values are lowercased once; a blank activity reads "nan", as str() shows it
+        row_values, values = pd.factorize(pd.Series(list(activities), dtype=object), use_na_sentinel=False)
+        value_names, names = pd.factorize(pd.Series([str(value).lower() for value in values], dtype=object))
+        codes = value_names[row_values] if len(row_values) else row_values
+        self.names = list(names)  # in order of first appearance
+        self.lengths = np.array([len(name) for name in self.names], dtype=np.int64)
+
+        # Row positions of every name, in row order
+        order = np.argsort(codes, kind='stable')
+        bounds = np.cumsum(np.bincount(codes, minlength=len(self.names)))[:-1]
+        self.positions = np.split(order, bounds)
+
+        # Character counts per name, used for the upper bound
+        characters = np.frombuffer(''.join(self.names).encode('utf-32-le'), dtype=np.uint32)
+        alphabet, char_ids = np.unique(characters, return_inverse=True)
+        self._alphabet = {chr(char): i for i, char in enumerate(alphabet)}
+        self._char_counts = np.zeros((len(self.names), len(alphabet)), dtype=np.uint16)
+        np.add.at(self._char_counts, (np.repeat(np.arange(len(self.names)), self.lengths), char_ids), 1)
+
+    def __len__(self):
+        return len(self.names)
+
+    # Highest partial_ratio each name could possibly reach against the query
+    def upper_bounds(self, query, name_ids):
+        query_counts = np.zeros(len(self._alphabet), dtype=np.uint16)
+        for char in query:
+            if char in self._alphabet:
+                query_counts[self._alphabet[char]] += 1
+        # partial_ratio is 2M / (s + w) for the shorter string (length s) against a window of the
+        # longer one (length w <= s, less at its end) with M <= min(common characters c, w) matching
+        # characters, so it never exceeds 2c / (s + c)
+        common = np.minimum(self._char_counts[name_ids], query_counts).sum(axis=1)
+        shorter = np.minimum(self.lengths[name_ids], len(query))
+        return np.where(common > 0, 200.0 * common / np.maximum(shorter + common, 1), 0.0)
+
+    # Scores the query against the distinct names and returns (score, name id) pairs, best first,
+    # for every name that reaches the threshold plus the best scoring name
+    def search(self, query, threshold=MATCH_THRESHOLD):
+        query = query.lower()
+        name_ids = np.arange(len(self.names))
+        bounds = self.upper_bounds(query, name_ids)
+        order = np.argsort(-bounds, kind='stable')
+
+        scored = []
+        best = 0
+        for k in order:
+            # The highest rounded score this name could get; a score of 0 is never a match
+            reachable = int(bounds[k] + 0.5)
+            if reachable < threshold and (reachable < best or reachable == 0):
+                break
+            name_id = int(name_ids[k])
+            score = fuzz.partial_ratio(query, self.names[name_id])
+            best = max(best, score)
+            scored.append((score, name_id))
+
+        # Ties go to the name that appears first, like the old top-to-bottom scan
+        scored.sort(key=lambda match: (-match[0], match[1]))
+        return scored
+
+    # Row positions to highlight: every row scoring at least the threshold, and the best row
+    # (the first row of the best name) even if it scores lower. Returns (positions, best, found).
+    def match_rows(self, query, threshold=MATCH_THRESHOLD):
+        scored = self.search(query, threshold)
+        if not scored or scored[0][0] == 0:
+            return [], None, False
+
+        matched = [self.positions[name_id] for score, name_id in scored if score >= threshold]
+        best = int(self.positions[scored[0][1]][0])
+        positions = np.concatenate(matched).tolist() if matched else []
+        if not matched:
+            positions.append(best)
+        return positions, best, bool(matched)
@@ -0,0 +1,216 @@
+# Headless batch mode: validates many Amilia workbooks in parallel with the same rules as the GUI.
+#
+#   python batch_validate.py /exports/nightly --sheet Activities \
+#       --start-date 09/01/24 --end-date 06/30/25 --min-cost 10 --max-cost 500 \
+#       --output-dir reports --rules rules.json
+#
+# Writes one JSON report per workbook plus summary.json, and exits with status 1 if any
+# workbook could not be validated. With --export csv|xlsx|json each run is also saved to the
+# results store and its issues exported next to the report, as <report name>.issues.<format>.
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from custom_rules import RuleConfigError, load_rules
+from diagnostics import RunDiagnostics
+from results_export import export_runs
+from results_store import results_store
+from streaming_reader import can_stream, should_stream, validate_workbook_streaming
+from validation_engine import CriteriaError, MissingColumnsError, find_missing_columns, parse_criteria, validate_activities
+from workbook_cache import load_sheet
+
+WORKBOOK_PATTERNS = ('*.xlsx', '*.xlsm', '*.xls')
+
+
+# Expands directories and glob patterns into a sorted list of workbook paths
+def find_workbooks(sources):
+    paths = set()
+    for source in sources:
+        if os.path.isdir(source):
+            for pattern in WORKBOOK_PATTERNS:
+                paths.update(glob.glob(os.path.join(source, pattern)))
+        else:
+            paths.update(glob.glob(source))
+
+    # Excel keeps "~$name.xlsx" lock files next to open workbooks
+    return sorted(p for p in paths if os.path.isfile(p) and not os.path.basename(p).startswith('~$'))
+
+
+# Picks a report file name per workbook, keeping names unique when two folders share a file name
+def report_names(paths, sheet_name):
+    names, used = {}, set()
+    for path in paths:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        name = f"{stem}.{sheet_name}.json"
+        count = 1
+        while name in used:
+            count += 1
+            name = f"{stem}.{sheet_name}.{count}.json"
+        used.add(name)
+        names[path] = name
+    return names
+
+
+def _row_to_json(row):
+    activity, issue, details = row
+    return {'activity': str(activity), 'issue': issue, 'details': details}
+
+
+# Validates one workbook and writes its report. Runs inside a worker process, so it only
+# sends the small summary back to the parent.
+def validate_workbook(path, sheet_name, criteria, report_path, streaming=False, rules=None, export_format=None):
+    started = time.perf_counter()
+    diagnostics = RunDiagnostics(f"{os.path.basename(path)} [{sheet_name}]")
+    report = {'file': os.path.abspath(path), 'sheet': sheet_name}
+    try:
+        # Large (or --streaming) workbooks are checked chunk by chunk without loading them whole
+        if (streaming and can_stream(path)) or should_stream(path):
+            result = validate_workbook_streaming(path, sheet_name, **criteria, diagnostics=diagnostics, rules=rules)
+        else:
+            with diagnostics.stage("load"):
+                df = load_sheet(path, sheet_name)
+            missing_columns = find_missing_columns(df)
+            if missing_columns:
+                raise MissingColumnsError(missing_columns)
+            result = validate_activities(df, **criteria, diagnostics=diagnostics, rules=rules)
+
+        report.update({
+            'status': 'ok',
+            'counters': result.counters,
+            'rules': {counts['label']: {'passed': counts['passed'], 'failed': counts['failed']}
+                      for counts in result.rule_counts.values()},
+            'issues': [_row_to_json(row) for row in result.issues],
+            'ledger_matches': [_row_to_json(row) for row in result.ledger_matches],
+        })
+
+        if export_format:
+            with diagnostics.stage("export"):
+                export_path = f"{os.path.splitext(report_path)[0]}.issues.{export_format}"
+                export_runs([(results_store.save_run(path, sheet_name, criteria, result), sheet_name)], export_path)
+            report['export'] = export_path
+    except Exception as e:
+        report.update({'status': 'error', 'error': str(e)})
+
+    report['seconds'] = round(time.perf_counter() - started, 3)
+    report['stages'] = {name: round(entry['seconds'], 3) for name, entry in diagnostics.stages.items()}
+    with open(report_path, 'w', encoding='utf-8') as report_file:
+        json.dump(report, report_file, indent=2, default=str)
+
+    summary = {key: report[key] for key in ('file', 'sheet', 'status', 'seconds')}
+    summary['report'] = report_path
+    if 'export' in report:
+        summary['export'] = report['export']
+    if report['status'] == 'ok':
+        summary['counters'] = report['counters']
+        summary['issues'] = len(report['issues'])
+    else:
+        summary['error'] = report['error']
+    return summary
+
+
+# Criteria as they appear in the summary (no infinite cost bound, dates as text)
+def criteria_to_json(criteria):
+    return {
+        key: (None if value == float('inf') else str(value) if key.endswith('_date') and value else value)
+        for key, value in criteria.items()
+    }
+
+
+# Adds up the counters of every workbook that validated
+def combine_counters(summaries):
+    totals = {}
+    for summary in summaries:
+        for key, value in summary.get('counters', {}).items():
+            totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Validate Amilia activity exports without the GUI.")
+    parser.add_argument('sources', nargs='+', help="Workbooks, folders or glob patterns")
+    parser.add_argument('--sheet', required=True, help="Name of the sheet to validate in every workbook")
+    parser.add_argument('--start-date', default="", help="Expected start date (MM/DD/YY)")
+    parser.add_argument('--end-date', default="", help="Expected end date (MM/DD/YY)")
+    parser.add_argument('--min-cost', default="", help="Minimum cost")
+    parser.add_argument('--max-cost', default="", help="Maximum cost")
+    parser.add_argument('--ledger-code', default="", help="Only check activities with this ledger code")
+    parser.add_argument('--rules', default=None,
+                        help="Rules file with extra checks (default: rules.json next to the checker, if present)")
+    parser.add_argument('--output-dir', default="reports", help="Folder for the reports (default: reports)")
+    parser.add_argument('--export', choices=('csv', 'xlsx', 'json'), default=None,
+                        help="Also save each run and export its issues in this format")
+    parser.add_argument('--streaming', action='store_true',
+                        help="Read every workbook in chunks of rows to keep memory low")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Number of worker processes")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    try:
+        criteria = parse_criteria(args.start_date, args.end_date, args.min_cost, args.max_cost, args.ledger_code)
+    except CriteriaError as e:
+        print(f"{e.row[0]}: {e}", file=sys.stderr)
+        return 2
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    try:
+        rules = load_rules(args.rules) if args.rules else load_rules()
+    except RuleConfigError as e:
+        print(f"Rules File: {e}", file=sys.stderr)
+        return 2
+    if args.rules and not os.path.exists(args.rules):
+        print(f"Rules File: {args.rules} not found", file=sys.stderr)
+        return 2
+
+    paths = find_workbooks(args.sources)
+    if not paths:
+        print("No workbooks found.", file=sys.stderr)
+        return 2
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    names = report_names(paths, args.sheet)
+    started = time.perf_counter()
+
+    # One workbook per task: files are independent, so throughput grows with the number of cores
+    summaries = []
+    with ProcessPoolExecutor(max_workers=max(1, min(args.workers, len(paths)))) as executor:
+        futures = [
+            executor.submit(
+                validate_workbook, path, args.sheet, criteria, os.path.join(args.output_dir, names[path]),
+                args.streaming, rules, args.export,
+            )
+            for path in paths
+        ]
+        for future in as_completed(futures):
+            summary = future.result()
+            summaries.append(summary)
+            print(f"[{summary['status']}] {summary['file']} ({summary['seconds']}s)")
+
+    summaries.sort(key=lambda summary: summary['file'])
+    failed = [summary for summary in summaries if summary['status'] != 'ok']
+    combined = {
+        'sheet': args.sheet,
+        'criteria': criteria_to_json(criteria),
+        'workbooks': len(summaries),
+        'failed': len(failed),
+        'seconds': round(time.perf_counter() - started, 3),
+        'totals': combine_counters(summaries),
+        'files': summaries,
+    }
+    with open(os.path.join(args.output_dir, 'summary.json'), 'w', encoding='utf-8') as summary_file:
+        json.dump(combined, summary_file, indent=2, default=str)
+
+    print(f"Validated {len(summaries)} workbooks, {len(failed)} failed, in {combined['seconds']}s")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,52 @@
+# Compares a cold .xlsx load with loading the typed sidecar of the same sheet.
+#
+#   python benchmarks/bench_sidecar.py export.xlsx --sheet "Activities"
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from workbook_sidecar import import_sheet, read_sidecar, sidecars_available
+
+
+def timed(function, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare a cold .xlsx load with a sidecar load.")
+    parser.add_argument('workbook')
+    parser.add_argument('--sheet', default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    if not sidecars_available():
+        sys.exit("pyarrow is not installed, sidecars are disabled.")
+
+    with tempfile.TemporaryDirectory() as sidecar_dir:
+        xlsx_time, df = timed(lambda: pd.read_excel(args.workbook, sheet_name=args.sheet), args.repeat)
+        import_time, _ = timed(lambda: import_sheet(args.workbook, args.sheet, df, sidecar_dir), 1)
+        sidecar_time, typed = timed(lambda: read_sidecar(args.workbook, args.sheet, sidecar_dir), args.repeat)
+
+    if typed is None:
+        sys.exit("The sheet could not be typed (missing columns or unreadable dates), no sidecar was written.")
+
+    print(f"rows:              {len(df)}")
+    print(f"cold xlsx load:    {xlsx_time * 1000:10.1f} ms")
+    print(f"import (one-off):  {import_time * 1000:10.1f} ms")
+    print(f"sidecar load:      {sidecar_time * 1000:10.1f} ms")
+    print(f"speed-up:          {xlsx_time / sidecar_time:10.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+# Generates synthetic Amilia-shaped activity exports for benchmarks and manual testing.
+#
+#   python benchmarks/generate_export.py export.xlsx --rows 100000 --ledger-codes 500 --malformed 0.01
+import argparse
+from datetime import date
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+SHEET_NAME = "Activities"
+DATE_FORMAT = "%m/%d/%y"  # how Amilia writes dates in its exports
+DATE_DISTRIBUTIONS = ('uniform', 'sessions', 'skewed')
+
+PROGRAM_WORDS = [
+    "Swim", "Soccer", "Yoga", "Day Camp", "Art", "Dance", "Karate", "Tennis", "Piano", "Chess",
+    "Pottery", "Skating", "Hockey", "Basketball", "Climbing", "Drama", "Coding", "Gymnastics",
+]
+LEVEL_WORDS = ["Beginner", "Intermediate", "Advanced", "Parent & Tot", "Teen", "Adult", "Senior"]
+DAY_WORDS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+LOCATIONS = ["Main Pool", "Gym A", "Gym B", "Studio 1", "Studio 2", "Arena", "Park Field", "Room 101"]
+
+
+# Start days (as offsets from the season start) for each distribution
+def _start_offsets(rng, rows, distribution, season_days):
+    if distribution == 'uniform':
+        # Mostly inside the season, with a margin on both sides so some rows fall outside
+        return rng.integers(-30, season_days + 30, rows)
+    if distribution == 'sessions':
+        # Activities start together at a few session dates, with a little noise
+        sessions = np.linspace(0, season_days, 4, dtype=np.int64)
+        return rng.choice(sessions, rows) + rng.integers(-10, 11, rows)
+    if distribution == 'skewed':
+        # Most activities start early in the season, a long tail starts late
+        return np.minimum(rng.exponential(season_days / 5, rows).astype(np.int64) - 15, season_days + 60)
+    raise ValueError(f"Unknown date distribution {distribution!r}, expected one of {DATE_DISTRIBUTIONS}")
+
+
+# Builds an Amilia-shaped activity sheet as a DataFrame. Dates are written as MM/DD/YY text like
+# the real exports; malformed is the share of rows given a broken cell (blank dates, dates in
+# another format, text or blank costs, blank activities).
+def generate_activities(rows, seed=0, season_start=date(2024, 9, 1), season_days=300, date_distribution='uniform',
+                        min_cost=0.0, max_cost=500.0, ledger_codes=50, activities=2000, malformed=0.0,
+                        extra_columns=True):
+    rng = np.random.default_rng(seed)
+
+    names = np.array([
+        f"{PROGRAM_WORDS[i % len(PROGRAM_WORDS)]} {LEVEL_WORDS[(i // len(PROGRAM_WORDS)) % len(LEVEL_WORDS)]} "
+        f"{DAY_WORDS[i % len(DAY_WORDS)]} #{i}"
+        for i in range(max(1, activities))
+    ], dtype=object)
+    codes = np.array([f"{4000 + i // 26}-{chr(65 + i % 26)}{i % 7}" for i in range(max(1, ledger_codes))], dtype=object)
+
+    # A few codes and activities are much more common than the rest, like real charts of accounts
+    code_weights = 1.0 / np.arange(1, len(codes) + 1)
+    code_weights /= code_weights.sum()
+
+    starts = pd.Timestamp(season_start) + pd.to_timedelta(
+        _start_offsets(rng, rows, date_distribution, season_days), unit='D'
+    )
+    ends = starts + pd.to_timedelta(rng.integers(0, 120, rows), unit='D')
+    costs = np.round(rng.uniform(min_cost, max_cost, rows), 2)
+    round_prices = rng.random(rows) < 0.3
+    costs[round_prices] = np.round(costs[round_prices], -1)
+
+    df = pd.DataFrame({
+        'Activity': names[rng.integers(0, len(names), rows)],
+        'Start date': pd.Series(starts).dt.strftime(DATE_FORMAT).to_numpy(dtype=object),
+        'End date': pd.Series(ends).dt.strftime(DATE_FORMAT).to_numpy(dtype=object),
+        'Cost': costs.astype(object),
+        'Ledger code': codes[rng.choice(len(codes), rows, p=code_weights)],
+    })
+    if extra_columns:
+        df['Location'] = np.array(LOCATIONS, dtype=object)[rng.integers(0, len(LOCATIONS), rows)]
+        df['Capacity'] = rng.integers(4, 40, rows)
+        df['Registered'] = rng.integers(0, 40, rows)
+
+    if malformed:
+        broken = np.flatnonzero(rng.random(rows) < malformed)
+        kinds = rng.integers(0, 5, len(broken))
+        df.loc[broken[kinds == 0], 'Start date'] = None
+        df.loc[broken[kinds == 1], 'End date'] = pd.Series(ends[broken[kinds == 1]]).dt.strftime('%Y-%m-%d').to_numpy()
+        df.loc[broken[kinds == 2], 'Cost'] = "N/A"
+        df.loc[broken[kinds == 3], 'Cost'] = None
+        df.loc[broken[kinds == 4], 'Activity'] = None
+
+    return df
+
+
+# Writes the sheet with openpyxl's write-only mode so million-row exports don't need a full workbook in memory
+def write_export(df, path, sheet_name=SHEET_NAME):
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+    sheet.append(list(df.columns))
+    for row in df.itertuples(index=False, name=None):
+        sheet.append([None if isinstance(value, float) and np.isnan(value) else value for value in row])
+    workbook.save(path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Amilia activity export.")
+    parser.add_argument('path', help="Workbook to write (.xlsx)")
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--sheet', default=SHEET_NAME)
+    parser.add_argument('--dates', choices=DATE_DISTRIBUTIONS, default='uniform', help="Start date distribution")
+    parser.add_argument('--min-cost', type=float, default=0.0)
+    parser.add_argument('--max-cost', type=float, default=500.0)
+    parser.add_argument('--ledger-codes', type=int, default=50, help="Number of distinct ledger codes")
+    parser.add_argument('--activities', type=int, default=2000, help="Number of distinct activity names")
+    parser.add_argument('--malformed', type=float, default=0.0, help="Share of rows with a broken cell (0-1)")
+    args = parser.parse_args()
+
+    df = generate_activities(
+        args.rows, seed=args.seed, date_distribution=args.dates, min_cost=args.min_cost, max_cost=args.max_cost,
+        ledger_codes=args.ledger_codes, activities=args.activities, malformed=args.malformed,
+    )
+    write_export(df, args.path, args.sheet)
+    print(f"Wrote {len(df)} rows to {args.path} (sheet {args.sheet!r})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+# Times each stage of the checker's hot paths on synthetic exports and writes the results to JSON.
+#
+#   python benchmarks/run_benchmarks.py --sizes 1000 10000 100000 --output bench.json
+#   python benchmarks/run_benchmarks.py --sizes 100000 --compare bench.json
+#
+# Stages are timed separately for validate_dates_and_cost (load, date parsing, rule evaluation,
+# ledger filtering, issue formatting, rendering), extract_ledger_codes (index build, keystroke
+# suggestions) and search_treeview (index build, fuzzy search). Rendering needs a display and is
+# reported as skipped without one. Startup is timed in fresh interpreters: the import of the
+# validation modules, and the time until the window is shown and ready (display needed).
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd
+
+from activity_search import ActivitySearchIndex
+from date_parsing import clear_date_cache, parse_date_column
+from generate_export import SHEET_NAME, generate_activities, write_export
+from ledger_index import LedgerCodeIndex
+from workbook_cache import READ_OPTIONS
+from validation_engine import (
+    build_issue_rows, compute_rule_masks, count_rule_masks, type_activities, validate_activities,
+)
+
+CRITERIA = {
+    'start_date': date(2024, 9, 1),
+    'end_date': date(2025, 6, 30),
+    'min_cost': 10.0,
+    'max_cost': 400.0,
+    'ledger_code': '',
+}
+LEDGER_QUERY = "401"
+GUI_SCRIPT = os.path.join(ROOT, 'AmiliaActivityChecker.py')
+# Modules the window loads after its first paint
+ENGINE_MODULES = ('validation_engine', 'multi_sheet', 'results_export', 'validation_service', 'activity_search')
+SEARCH_QUERIES = ["swim beginner", "karate", "pottery adult sat", "zzzz"]
+
+
+# Best and median wall time of a stage over several runs; errors are recorded instead of raised.
+# setup runs untimed before every run.
+def measure(function, repeat, setup=None):
+    times = []
+    result = None
+    try:
+        for _ in range(repeat):
+            if setup is not None:
+                setup()
+            started = time.perf_counter()
+            result = function()
+            times.append(time.perf_counter() - started)
+    except Exception as e:
+        return {'error': f"{type(e).__name__}: {e}"}, None
+    return {'best': min(times), 'median': statistics.median(times), 'runs': len(times)}, result
+
+
+# Creates (or reuses) the synthetic workbook for one size
+def workbook_for(rows, seed, data_dir, malformed):
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"activities_{rows}_{seed}_{malformed}.xlsx")
+    if not os.path.exists(path):
+        write_export(generate_activities(rows, seed=seed, malformed=malformed), path)
+    return path
+
+
+# Renders rows through the virtualized results view, or None when there is no display
+def render_rows_function():
+    try:
+        import tkinter as tk
+        from tkinter import ttk
+        from results_view import VirtualTreeview
+        root = tk.Tk()
+        root.withdraw()
+    except Exception:
+        return None
+
+    tree = ttk.Treeview(root, columns=("Activity", "Issue", "Details"), show="headings", height=15)
+    scrollbar = ttk.Scrollbar(root, orient="vertical")
+    view = VirtualTreeview(tree, scrollbar)
+
+    def render(rows):
+        view.set_rows(rows)
+        root.update_idletasks()
+    return render
+
+
+def bench_size(rows, args, render):
+    path = workbook_for(rows, args.seed, args.data_dir, args.malformed)
+    results = []
+
+    def record(function_name, stage, timing):
+        results.append({'rows': rows, 'function': function_name, 'stage': stage, **timing})
+        if 'best' in timing:
+            shown = f"{timing['best'] * 1000:10.1f} ms"
+        elif 'bytes' in timing:
+            shown = f"{timing['bytes'] / 1024 / 1024:10.1f} MB"
+        else:
+            shown = timing.get('error', timing.get('skipped'))
+        print(f"{rows:>9} {function_name:<24} {stage:<26} {shown}")
+
+    # validate_dates_and_cost
+    timing, df = measure(
+        lambda: pd.read_excel(path, sheet_name=SHEET_NAME, **READ_OPTIONS), 1 if rows >= 100000 else args.repeat
+    )
+    record('validate_dates_and_cost', 'load', timing)
+    if df is None:
+        return results
+
+    # Parsed date strings are cached for the whole process, so the cache is emptied before every
+    # run of the stages that parse dates; otherwise only the first run would parse anything
+    timing, _ = measure(
+        lambda: [parse_date_column(df[column]) for column in ('Start date', 'End date')], args.repeat, clear_date_cache
+    )
+    record('validate_dates_and_cost', 'date_parsing', timing)
+
+    # Memory of the sheet as read_excel returns it and after load_sheet's typing step (which
+    # includes the date parsing above)
+    record('memory', 'raw_sheet', {'bytes': int(df.memory_usage(deep=True).sum())})
+    timing, typed = measure(lambda: type_activities(df), args.repeat, clear_date_cache)
+    record('memory', 'typing', timing)
+    if typed is None:
+        return results
+    record('memory', 'typed_sheet', {'bytes': int(typed.memory_usage(deep=True).sum())})
+
+    # The remaining stages run on the typed sheet, the frame load_sheet gives the checker
+    rule_criteria = {key: value for key, value in CRITERIA.items() if key != 'ledger_code'}
+    timing, masks = measure(lambda: compute_rule_masks(typed, **rule_criteria), args.repeat)
+    record('validate_dates_and_cost', 'rule_evaluation', timing)
+    if masks is not None:
+        timing, _ = measure(lambda: count_rule_masks(masks, len(typed)), args.repeat)
+        record('validate_dates_and_cost', 'summary_counters', timing)
+        timing, _ = measure(lambda: build_issue_rows(typed, masks, **rule_criteria), args.repeat)
+        record('validate_dates_and_cost', 'issue_formatting', timing)
+    timing, _ = measure(lambda: LedgerCodeIndex(typed['Ledger code']).mask(LEDGER_QUERY), args.repeat)
+    record('validate_dates_and_cost', 'ledger_filtering', timing)
+
+    timing, result = measure(lambda: validate_activities(typed, **CRITERIA), args.repeat)
+    record('validate_dates_and_cost', 'total_without_load', timing)
+    output_rows = result.output_rows() if result is not None else []
+
+    if render is None:
+        record('validate_dates_and_cost', 'rendering', {'skipped': "no display"})
+    else:
+        timing, _ = measure(lambda: render(output_rows), args.repeat)
+        record('validate_dates_and_cost', 'rendering', timing)
+
+    # extract_ledger_codes
+    timing, index = measure(lambda: LedgerCodeIndex(typed['Ledger code']), args.repeat)
+    record('extract_ledger_codes', 'index_build', timing)
+    if index is not None:
+        keystrokes = [LEDGER_QUERY[:i] for i in range(len(LEDGER_QUERY) + 1)]
+        timing, _ = measure(lambda: [index.suggestions(query) for query in keystrokes], args.repeat)
+        timing = {key: value / len(keystrokes) if key in ('best', 'median') else value for key, value in timing.items()}
+        record('extract_ledger_codes', 'suggestions_per_key', timing)
+
+    # search_treeview
+    timing, search_index = measure(lambda: ActivitySearchIndex(values[0] for values in output_rows), args.repeat)
+    record('search_treeview', 'index_build', timing)
+    if search_index is not None:
+        for query in SEARCH_QUERIES:
+            timing, _ = measure(lambda: search_index.match_rows(query), args.repeat)
+            record('search_treeview', f"search:{query}", timing)
+
+    return results
+
+
+# Runs a Python snippet in a fresh interpreter and returns what it printed last, parsed as JSON
+def fresh_interpreter(arguments):
+    finished = subprocess.run(
+        [sys.executable] + arguments, cwd=ROOT, capture_output=True, text=True, timeout=300, check=True,
+    )
+    return json.loads(finished.stdout.strip().splitlines()[-1])
+
+
+def bench_startup(args):
+    results = []
+
+    def record(stage, timing):
+        results.append({'rows': 0, 'function': 'startup', 'stage': stage, **timing})
+        shown = f"{timing['best'] * 1000:10.1f} ms" if 'best' in timing else timing.get('error', timing.get('skipped'))
+        print(f"{'-':>9} {'startup':<24} {stage:<26} {shown}")
+
+    def summarize(samples):
+        return {'best': min(samples), 'median': statistics.median(samples), 'runs': len(samples)}
+
+    imports = "import time; started = time.perf_counter(); import " + ", ".join(ENGINE_MODULES) + \
+        "; print(time.perf_counter() - started)"
+    try:
+        record('engine_imports', summarize([fresh_interpreter(['-c', imports]) for _ in range(args.repeat)]))
+    except (subprocess.SubprocessError, ValueError, IndexError) as e:
+        record('engine_imports', {'error': f"{type(e).__name__}: {e}"})
+
+    # The window reports its own startup stages with --measure-startup
+    try:
+        runs = [fresh_interpreter([GUI_SCRIPT, '--measure-startup']) for _ in range(args.repeat)]
+    except (subprocess.SubprocessError, ValueError, IndexError):
+        record('window_shown', {'skipped': "no display"})
+        record('ready', {'skipped': "no display"})
+        return results
+    record('window_shown', summarize([run['window_shown'] for run in runs]))
+    record('ready', summarize([run['ready'] for run in runs]))
+    return results
+
+
+# Prints how each stage changed against an earlier results file
+def compare(results, previous_path):
+    with open(previous_path, encoding='utf-8') as previous_file:
+        previous = {
+            (entry['rows'], entry['function'], entry['stage']): entry
+            for entry in json.load(previous_file)['results']
+        }
+    print(f"\nCompared with {previous_path}:")
+    for entry in results:
+        old = previous.get((entry['rows'], entry['function'], entry['stage']))
+        if old and 'best' in old and 'best' in entry and old['best'] > 0:
+            ratio = entry['best'] / old['best']
+            print(f"{entry['rows']:>9} {entry['function']:<24} {entry['stage']:<20} {ratio:6.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the checker on synthetic Amilia exports.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help="Rows per workbook")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--malformed', type=float, default=0.0, help="Share of rows with a broken cell (0-1)")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per stage (the best one is reported)")
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'amilia_benchmarks'),
+                        help="Where generated workbooks are kept between runs")
+    parser.add_argument('--output', default='benchmark_results.json', help="JSON file for the results")
+    parser.add_argument('--compare', help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    render = render_rows_function()
+    results = bench_startup(args)
+    for rows in args.sizes:
+        results.extend(bench_size(rows, args, render))
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'malformed': args.malformed,
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"\nWrote {len(results)} timings to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
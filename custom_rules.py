@@ -0,0 +1,223 @@
+import json
+import operator
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from date_parsing import parse_date_text
+from ledger_index import format_ledger_code, ledger_code_text
+
+# Rules file picked up by the checker (missing file = no extra rules)
+RULES_FILE = os.environ.get(
+    'AMILIA_RULES_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rules.json')
+)
+
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+# Values a rule can check, computed from the typed frame (name -> (label, function))
+FIELDS = {
+    'start_date': ("Start", lambda df: df['Start date'].dt.normalize()),
+    'end_date': ("End", lambda df: df['End date'].dt.normalize()),
+    # Nullable integers: plain .dt.days turns float ("63.0") when a row has a blank date
+    'duration_days': (
+        "Duration (days)",
+        lambda df: (df['End date'].dt.normalize() - df['Start date'].dt.normalize()).dt.days.astype('Int64'),
+    ),
+    'start_weekday': ("Start day", lambda df: _weekday_names(df['Start date'])),
+    'end_weekday': ("End day", lambda df: _weekday_names(df['End date'])),
+    'cost': ("Cost", lambda df: pd.to_numeric(df['Cost'], errors='coerce')),
+    'activity': ("Activity", lambda df: df['Activity'].astype(object)),
+    'ledger_code': ("Ledger code", lambda df: ledger_code_text(df['Ledger code'])),
+}
+DATE_FIELDS = ('start_date', 'end_date')
+
+COMPARISONS = {
+    '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge, '==': operator.eq, '!=': operator.ne,
+}
+OPERATORS = tuple(COMPARISONS) + ('between', 'in', 'not_in', 'matches')
+
+
+# Raised when the rules file can't be used; the message says which rule and why
+class RuleConfigError(ValueError):
+    pass
+
+
+def _weekday_names(dates):
+    names = np.array(WEEKDAYS + [None], dtype=object)
+    days = dates.dt.dayofweek.fillna(7).astype(int).to_numpy()
+    return pd.Series(names[days], index=dates.index)
+
+
+# One rule of the file, compiled into a function that flags the rows breaking it over whole columns.
+# A row passes when "<field> <op> <value>" holds; rows where the field is blank are not checked.
+# With "by": "ledger_code", "value" maps ledger codes to the value used for their rows instead.
+class CompiledRule:
+    def __init__(self, definition, position):
+        if not isinstance(definition, dict):
+            raise RuleConfigError(f"Rule {position + 1} must be an object")
+        self.name = str(definition.get('name') or f"rule_{position + 1}")
+        where = f"Rule '{self.name}'"
+        self.label = str(definition.get('label') or self.name)
+        self.field = definition.get('field')
+        self.op = definition.get('op')
+        self.by = definition.get('by')
+        if self.field not in FIELDS:
+            raise RuleConfigError(f"{where}: field must be one of {', '.join(FIELDS)}")
+        if self.op not in OPERATORS:
+            raise RuleConfigError(f"{where}: op must be one of {', '.join(OPERATORS)}")
+        if self.by not in (None, 'ledger_code'):
+            raise RuleConfigError(f"{where}: by can only be 'ledger_code'")
+        if 'value' not in definition:
+            raise RuleConfigError(f"{where}: value is required")
+
+        value = definition['value']
+        if self.by is not None:
+            if not isinstance(value, dict):
+                raise RuleConfigError(f"{where}: with by, value must map ledger codes to values")
+            # Codes are compared as text, the way ledger_code_text reads the column
+            self.value = {format_ledger_code(code): self._operand(v, where) for code, v in value.items()}
+        else:
+            self.value = self._operand(value, where)
+        self.expected = f"{self.op} {json.dumps(value) if self.by is None else 'the value for its ledger code'}"
+
+    def _operand(self, value, where):
+        if self.field in DATE_FIELDS:
+            convert = lambda v: _rule_date(v, where)
+        elif self.field == 'ledger_code':
+            convert = format_ledger_code
+        else:
+            convert = lambda v: v
+        if self.op == 'between':
+            if not isinstance(value, list) or len(value) != 2:
+                raise RuleConfigError(f"{where}: between needs [low, high]")
+            return (convert(value[0]), convert(value[1]))
+        if self.op in ('in', 'not_in'):
+            if not isinstance(value, list):
+                raise RuleConfigError(f"{where}: {self.op} needs a list")
+            return [convert(v) for v in value]
+        if self.op == 'matches':
+            try:
+                return re.compile(str(value))
+            except re.error as e:
+                raise RuleConfigError(f"{where}: bad pattern: {e}")
+        return convert(value)
+
+    # Boolean mask of the rows that break the rule
+    def violations(self, fields):
+        values = fields[self.field]
+        checked = values.notna().to_numpy(dtype=bool)
+        if self.by is None:
+            passes = self._passes(values, self.value)
+        else:
+            # Rows are grouped by ledger code so each group is compared with its own value at once
+            passes = np.ones(len(values), dtype=bool)
+            codes = fields['ledger_code']
+            for code, value in self.value.items():
+                rows = (codes == code).to_numpy(dtype=bool)
+                if rows.any():
+                    passes[rows] = self._passes(values[rows], value)
+            checked = checked & codes.isin(list(self.value)).to_numpy(dtype=bool)
+        return checked & ~passes
+
+    def _passes(self, values, value):
+        if self.op in COMPARISONS:
+            result = COMPARISONS[self.op](values, value)
+        elif self.op == 'between':
+            result = (values >= value[0]) & (values <= value[1])
+        elif self.op == 'in':
+            result = values.isin(value)
+        elif self.op == 'not_in':
+            result = ~values.isin(value)
+        else:
+            result = values.astype(str).str.contains(value, regex=True)
+        return pd.Series(result, index=values.index).fillna(False).to_numpy(dtype=bool)
+
+
+def _rule_date(value, where):
+    parsed = parse_date_text(str(value))
+    if parsed is None:
+        raise RuleConfigError(f"{where}: '{value}' is not a date")
+    return pd.Timestamp(parsed)
+
+
+# Derived columns computed at most once per frame, however many rules read them
+class _Fields(dict):
+    def __init__(self, df):
+        super().__init__()
+        self.df = df
+
+    def __missing__(self, name):
+        value = FIELDS[name][1](self.df)
+        self[name] = value
+        return value
+
+
+# Every rule of a rules file. Issues of a rule are named "rule:<name>" so they sort after the
+# built-in checks; the fingerprint changes whenever the file's rules change.
+class RuleSet:
+    def __init__(self, definitions=()):
+        self.rules = [CompiledRule(definition, position) for position, definition in enumerate(definitions)]
+        names = [rule.name for rule in self.rules]
+        if len(set(names)) != len(names):
+            raise RuleConfigError("Rule names must be unique")
+        self.fingerprint = json.dumps(list(definitions), sort_keys=True, default=str)
+
+    def __len__(self):
+        return len(self.rules)
+
+    @property
+    def rule_names(self):
+        return [f"rule:{rule.name}" for rule in self.rules]
+
+    @property
+    def labels(self):
+        return {f"rule:{rule.name}": rule.label for rule in self.rules}
+
+    # All rules evaluated in one pass over the frame, sharing the derived columns
+    def compute_masks(self, df):
+        fields = _Fields(df)
+        masks = {}
+        for rule in self.rules:
+            try:
+                masks[f"rule:{rule.name}"] = rule.violations(fields)
+            except TypeError as e:
+                raise RuleConfigError(f"Rule '{rule.name}': its value can't be compared with {rule.field} ({e})")
+        return masks
+
+    # Issue row formatters, like validation_engine.issue_formatters
+    def issue_formatters(self, df):
+        fields = _Fields(df)
+        activities = df['Activity'].to_numpy(dtype=object)
+        formatters = {}
+        for rule in self.rules:
+            label, _ = FIELDS[rule.field]
+            values = _display_values(fields[rule.field], rule.field)
+            formatters[f"rule:{rule.name}"] = (
+                lambda i, rule=rule, label=label, values=values:
+                (activities[i], rule.label, f"{label}: {values[i]}, expected {rule.expected}")
+            )
+        return formatters
+
+
+def _display_values(values, field):
+    if field in DATE_FIELDS:
+        return values.dt.date.to_numpy(dtype=object)
+    return values.to_numpy(dtype=object)
+
+
+# Loads and compiles the rules file: {"rules": [{"name", "label", "field", "op", "value", "by"}, ...]}.
+# No file means no extra rules.
+def load_rules(path=RULES_FILE):
+    if not path or not os.path.exists(path):
+        return RuleSet()
+    try:
+        with open(path, encoding='utf-8') as rules_file:
+            config = json.load(rules_file)
+    except (OSError, json.JSONDecodeError) as e:
+        raise RuleConfigError(f"Can't read {path}: {e}")
+    definitions = config.get('rules', []) if isinstance(config, dict) else config
+    if not isinstance(definitions, list):
+        raise RuleConfigError(f"{path}: 'rules' must be a list")
+    return RuleSet(definitions)
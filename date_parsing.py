@@ -0,0 +1,145 @@
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+# Text formats tried for date cells and date inputs. The format that reads most of a column's
+# sample is used first; cells it can't read are tried against the others.
+DATE_FORMATS = [
+    '%m/%d/%y', '%m/%d/%Y', '%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%m-%d-%y', '%m-%d-%Y', '%Y/%m/%d',
+    '%b %d, %Y', '%d %b %Y',
+]
+
+# Distinct values of a column looked at to pick its format
+SAMPLE_SIZE = 200
+
+# Excel stores dates as days since 1899-12-30. Only numbers in a plausible range for an activity
+# are read as dates, so a stray 12 or 2024 in a date column is reported instead of becoming 1900.
+EXCEL_EPOCH = pd.Timestamp('1899-12-30')
+EXCEL_SERIAL_RANGE = (18264, 73051)  # 1950-01-01 .. 2099-12-31 (exclusive)
+
+DATE_UNIT = 'datetime64[us]'
+NOT_A_DATE = np.datetime64('NaT', 'us')
+
+# Parsed date strings shared by every column, chunk and run: (first format, text) -> datetime64
+_parsed_texts = {}
+PARSED_TEXT_LIMIT = 200_000
+
+
+# Format that reads the most of a sample of distinct date strings (None if none reads any)
+def detect_format(texts, formats=DATE_FORMATS, sample_size=SAMPLE_SIZE):
+    step = max(1, len(texts) // sample_size)
+    sample = pd.Series(texts[::step][:sample_size], dtype=object)
+    best_format, best_count = None, 0
+    for date_format in formats:
+        count = int(pd.to_datetime(sample, format=date_format, errors='coerce').notna().sum())
+        if count > best_count:
+            best_format, best_count = date_format, count
+    return best_format
+
+
+def _to_date_unit(values):
+    return pd.to_datetime(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype=DATE_UNIT)
+
+
+# Excel serial numbers (days since 1899-12-30, fractions are times of day) as datetimes
+def excel_serials_to_dates(numbers):
+    numbers = np.asarray(numbers, dtype=float)
+    valid = (numbers >= EXCEL_SERIAL_RANGE[0]) & (numbers < EXCEL_SERIAL_RANGE[1])
+    parsed = np.full(len(numbers), NOT_A_DATE)
+    parsed[valid] = (EXCEL_EPOCH + pd.to_timedelta(numbers[valid], unit='D')).to_numpy(dtype=DATE_UNIT)
+    return parsed
+
+
+# Forgets every parsed date string (benchmarks time cold parses with it)
+def clear_date_cache():
+    _parsed_texts.clear()
+
+
+# Parses distinct, stripped date strings: the detected format first over all of them, then the
+# other formats over whatever is left. Every string is parsed once per process.
+def _parse_texts(texts, formats):
+    first_format = detect_format(texts, formats)
+    parsed = np.full(len(texts), NOT_A_DATE)
+    unknown = []
+    for position, text in enumerate(texts):
+        cached = _parsed_texts.get((first_format, text))
+        if cached is None:
+            unknown.append(position)
+        else:
+            parsed[position] = cached
+    if not unknown:
+        return parsed
+
+    remaining = np.array(unknown, dtype=np.int64)
+    order = [first_format] + [f for f in formats if f != first_format] if first_format else list(formats)
+    for date_format in order:
+        if not len(remaining):
+            break
+        attempt = pd.to_datetime(
+            pd.Series(texts[remaining], dtype=object), format=date_format, errors='coerce'
+        ).to_numpy(dtype=DATE_UNIT)
+        read = ~np.isnat(attempt)
+        parsed[remaining[read]] = attempt[read]
+        remaining = remaining[~read]
+
+    if len(_parsed_texts) > PARSED_TEXT_LIMIT:
+        _parsed_texts.clear()
+    for position in unknown:
+        _parsed_texts[(first_format, texts[position])] = parsed[position]
+    return parsed
+
+
+# Normalizes a column of date cells (text in any of the formats, Excel date cells, Excel serial
+# numbers or a mix) to datetimes in one pass over its distinct values. Serials are only read from
+# numeric cells: text that is a number ("2024") is not a date. Returns the dates and a
+# boolean array marking the cells that hold something that is not a date; blank cells are NaT
+# without being marked.
+def parse_date_column(column, formats=DATE_FORMATS):
+    column = pd.Series(column)
+    if pd.api.types.is_datetime64_any_dtype(column):
+        return column, np.zeros(len(column), dtype=bool)
+
+    codes, uniques = pd.factorize(column, use_na_sentinel=True)
+    uniques = np.asarray(uniques, dtype=object)
+    if not len(uniques):
+        return pd.Series(np.full(len(column), NOT_A_DATE), index=column.index, name=column.name), \
+            np.zeros(len(column), dtype=bool)
+    parsed = np.full(len(uniques), NOT_A_DATE)
+    blank = np.zeros(len(uniques), dtype=bool)
+
+    is_date = np.array([isinstance(v, (datetime, date, np.datetime64)) for v in uniques], dtype=bool)
+    is_number = np.array([
+        isinstance(v, (int, float, np.integer, np.floating)) and not isinstance(v, (bool, np.bool_))
+        for v in uniques
+    ], dtype=bool)
+    is_text = np.array([isinstance(v, str) for v in uniques], dtype=bool)
+
+    if is_date.any():
+        parsed[is_date] = _to_date_unit(uniques[is_date])
+    if is_number.any():
+        parsed[is_number] = excel_serials_to_dates(uniques[is_number].astype(float))
+    if is_text.any():
+        text_positions = np.flatnonzero(is_text)
+        texts = np.array([uniques[p].strip() for p in text_positions], dtype=object)
+        blank[text_positions] = texts == ""
+        filled = texts != ""
+        if filled.any():
+            parsed[text_positions[filled]] = _parse_texts(texts[filled], formats)
+
+    dates = parsed[codes]
+    dates[codes == -1] = NOT_A_DATE
+    unreadable = (codes != -1) & np.isnat(dates) & ~blank[codes]
+    return pd.Series(dates, index=column.index, name=column.name), unreadable
+
+
+# Reads one date typed by the user with the same text formats (None if it is not a date). Excel
+# serial numbers are only accepted in workbook cells: typed "12" is a mistake, not 1900-01-11.
+def parse_date_text(text, formats=DATE_FORMATS):
+    text = str(text).strip()
+    for date_format in formats:
+        try:
+            return datetime.strptime(text, date_format).date()
+        except ValueError:
+            continue
+    return None
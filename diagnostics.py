@@ -0,0 +1,186 @@
+import cProfile
+import json
+import logging
+import logging.handlers
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+# Where the run log, profiles and memory snapshots are written
+LOG_DIR = os.environ.get(
+    'AMILIA_LOG_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'amilia_activity_checker', 'logs'),
+)
+LOG_FILE_BYTES = 1024 * 1024
+LOG_FILE_COUNT = 5
+
+run_logger = logging.getLogger('amilia_activity_checker.runs')
+
+
+# Rotating log with one JSON line per validation run, set up the first time a run is logged
+def _setup_run_log():
+    if run_logger.handlers:
+        return
+    os.makedirs(LOG_DIR, exist_ok=True)
+    handler = logging.handlers.RotatingFileHandler(
+        os.path.join(LOG_DIR, 'validation_runs.log'), maxBytes=LOG_FILE_BYTES, backupCount=LOG_FILE_COUNT,
+        encoding='utf-8',
+    )
+    handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+    run_logger.addHandler(handler)
+    run_logger.setLevel(logging.INFO)
+    run_logger.propagate = False
+
+
+# Resident memory of this process in bytes (None where it can't be read)
+def process_memory():
+    try:
+        if sys.platform.startswith('linux'):
+            with open('/proc/self/statm') as statm:
+                return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        if sys.platform == 'win32':
+            import ctypes
+            from ctypes import wintypes
+
+            class ProcessMemoryCounters(ctypes.Structure):
+                _fields_ = [
+                    ('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                    ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                    ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                    ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t),
+                ]
+
+            counters = ProcessMemoryCounters()
+            counters.cb = ctypes.sizeof(counters)
+            process = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+                return counters.WorkingSetSize
+            return None
+        import resource
+        # Peak rather than current on macOS, still useful to spot growth
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except Exception:
+        return None
+
+
+# Stage timings and memory counters for one validation run. Stages with the same name add up,
+# so a stage entered once per chunk reports its total. With profile=True the run is also
+# captured with cProfile and tracemalloc and both are saved next to the log.
+class RunDiagnostics:
+    def __init__(self, label="", profile=False):
+        self.label = label
+        self.profile = profile
+        self.stages = {}        # name -> {'seconds', 'memory_delta', 'calls'}
+        self.started = time.perf_counter()
+        self.memory_at_start = process_memory()
+        self.profile_path = None
+        self.snapshot_path = None
+        self._profiler = None
+        self._tracemalloc_started = False
+        self._lock = threading.Lock()  # sheets can be checked on several threads at once
+
+    @contextmanager
+    def stage(self, name):
+        memory_before = process_memory()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started, _delta(memory_before, process_memory()))
+
+    def add(self, name, seconds, memory_delta=None):
+        with self._lock:
+            entry = self.stages.setdefault(name, {'seconds': 0.0, 'memory_delta': 0, 'calls': 0})
+            entry['seconds'] += seconds
+            entry['memory_delta'] += memory_delta or 0
+            entry['calls'] += 1
+
+    # Profiling covers the thread that calls this (the validation worker)
+    def start_profiling(self):
+        if not self.profile:
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracemalloc_started = True
+        self._profiler = cProfile.Profile()
+        self._profiler.enable()
+
+    # Stops profiling and saves the profile (.prof, open with pstats or snakeviz) and the top allocations
+    def stop_profiling(self):
+        if self._profiler is None:
+            return
+        self._profiler.disable()
+        os.makedirs(LOG_DIR, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        self.profile_path = os.path.join(LOG_DIR, f"run-{stamp}.prof")
+        self._profiler.dump_stats(self.profile_path)
+        self._profiler = None
+
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            self.snapshot_path = os.path.join(LOG_DIR, f"run-{stamp}-memory.txt")
+            with open(self.snapshot_path, 'w', encoding='utf-8') as snapshot_file:
+                snapshot_file.write(f"traced now: {current} bytes, peak: {peak} bytes\n\n")
+                for statistic in snapshot.statistics('lineno')[:50]:
+                    snapshot_file.write(f"{statistic}\n")
+            if self._tracemalloc_started:
+                tracemalloc.stop()
+
+    @property
+    def total_seconds(self):
+        return time.perf_counter() - self.started
+
+    # One line for the status bar
+    def summary(self):
+        parts = [f"{name} {entry['seconds']:.2f}s" for name, entry in self.stages.items()]
+        parts.append(f"total {self.total_seconds:.2f}s")
+        memory_delta = _delta(self.memory_at_start, process_memory())
+        if memory_delta is not None:
+            parts.append(f"memory {memory_delta / 1024 / 1024:+.1f} MB")
+        return " | ".join(parts)
+
+    # Rows for the diagnostics panel: (stage, seconds, memory change in MB, calls)
+    def rows(self):
+        return [
+            (name, f"{entry['seconds']:.3f}", f"{entry['memory_delta'] / 1024 / 1024:+.1f}", entry['calls'])
+            for name, entry in self.stages.items()
+        ]
+
+    # Appends the run to the rotating log
+    def log(self, status="ok"):
+        _setup_run_log()
+        run_logger.info(json.dumps({
+            'label': self.label,
+            'status': status,
+            'total_seconds': round(self.total_seconds, 4),
+            'stages': {
+                name: {'seconds': round(entry['seconds'], 4), 'memory_delta': entry['memory_delta'],
+                       'calls': entry['calls']}
+                for name, entry in self.stages.items()
+            },
+            'memory': process_memory(),
+            'profile': self.profile_path,
+            'memory_snapshot': self.snapshot_path,
+        }))
+
+
+# Stand-in used when a run is not being measured
+class NullDiagnostics:
+    @contextmanager
+    def stage(self, name):
+        yield
+
+    def add(self, name, seconds, memory_delta=None):
+        pass
+
+
+def _delta(before, after):
+    if before is None or after is None:
+        return None
+    return after - before
@@ -0,0 +1,113 @@
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+import pandas as pd
+
+# Most suggestions the autocomplete list is given at once
+MAX_SUGGESTIONS = 200
+
+
+# Ledger codes as text, blanks as None. Numeric codes come back as floats from a column with
+# blank cells, so whole numbers drop their ".0" and read like the code in the sheet ("4010").
+def ledger_code_text(values):
+    values = pd.Series(values)
+    row_codes, distinct = pd.factorize(values)
+    texts = np.array([format_ledger_code(code) for code in distinct] + [None], dtype=object)
+    return pd.Series(texts[row_codes], index=values.index)
+
+
+# One ledger code as text, for codes given outside a sheet (rules file keys and values)
+def format_ledger_code(code):
+    if isinstance(code, (float, np.floating)) and float(code).is_integer():
+        return str(int(code))
+    return str(code)
+
+
+# Index over the ledger codes of a sheet, built once per load. The distinct codes are kept
+# sorted (lowercased) for prefix lookups with bisect, and also joined into one newline
+# separated string so substring lookups are a handful of str.find calls instead of a Python
+# test per code. Every code keeps the positions of the rows that use it, so filtering the
+# sheet by ledger code picks rows through the index rather than scanning strings.
+class LedgerCodeIndex:
+    def __init__(self, ledger_codes):
+        column = pd.Series(ledger_codes).reset_index(drop=True)
+        present = column.notna().to_numpy()
+        text = ledger_code_text(column[present])
+
+        row_codes, distinct = pd.factorize(text, sort=True)
+        self.codes = [str(code) for code in distinct]
+        self.num_of_rows = len(column)
+
+        # Row positions of every code, in row order
+        rows = np.flatnonzero(present)
+        order = np.argsort(row_codes, kind='stable')
+        bounds = np.cumsum(np.bincount(row_codes, minlength=len(self.codes)))[:-1]
+        self._positions = np.split(rows[order], bounds) if len(self.codes) else []
+
+        # Lowercased codes in sorted order, with the id of the code each one belongs to
+        lowered = sorted((code.lower(), code_id) for code_id, code in enumerate(self.codes))
+        self._lowered = [code for code, _ in lowered]
+        self._lowered_ids = [code_id for _, code_id in lowered]
+
+        # Where each lowercased code starts inside the joined string
+        self._haystack = "\n".join(self._lowered)
+        self._starts = []
+        offset = 0
+        for code in self._lowered:
+            self._starts.append(offset)
+            offset += len(code) + 1
+
+    def __len__(self):
+        return len(self.codes)
+
+    # Ids of the codes starting with the query (case-insensitive), in sorted order
+    def prefix_ids(self, query, limit=None):
+        query = query.lower()
+        first = bisect_left(self._lowered, query)
+        last = bisect_right(self._lowered, query + "\U0010ffff", lo=first)
+        if limit is not None:
+            last = min(last, first + limit)
+        return self._lowered_ids[first:last]
+
+    # Ids of the codes containing the query (case-insensitive), in sorted order
+    def substring_ids(self, query, limit=None):
+        query = query.lower()
+        if not query:
+            return self._lowered_ids[:limit]
+        if "\n" in query:
+            return []
+
+        ids = []
+        found = self._haystack.find(query)
+        while found != -1:
+            # The code the match falls in, then carry on after the end of that code
+            slot = bisect_right(self._starts, found) - 1
+            ids.append(self._lowered_ids[slot])
+            if limit is not None and len(ids) >= limit:
+                break
+            next_start = self._starts[slot] + len(self._lowered[slot]) + 1
+            found = self._haystack.find(query, next_start)
+        return ids
+
+    # Autocomplete suggestions: the codes starting with the query first, then the other codes
+    # containing it, each alphabetically. Prefix matches are among the substring matches, so
+    # enough of those are looked up to still fill the list after they are skipped.
+    def suggestions(self, query, limit=MAX_SUGGESTIONS):
+        query = query.strip()
+        prefix = self.prefix_ids(query, limit)
+        skipped = set(prefix)
+        others = [code_id for code_id in self.substring_ids(query, limit + len(prefix)) if code_id not in skipped]
+        return [self.codes[code_id] for code_id in (prefix + others)[:limit]]
+
+    # Sorted positions of the rows whose ledger code contains the query
+    def rows(self, query):
+        ids = self.substring_ids(query)
+        if not ids:
+            return np.zeros(0, dtype=np.int64)
+        return np.sort(np.concatenate([self._positions[code_id] for code_id in ids]))
+
+    # Boolean row mask for the ledger code filter
+    def mask(self, query):
+        selected = np.zeros(self.num_of_rows, dtype=bool)
+        selected[self.rows(query)] = True
+        return selected
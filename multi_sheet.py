@@ -0,0 +1,197 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+
+from diagnostics import NullDiagnostics
+from streaming_reader import should_stream, validate_workbook_streaming
+from validation_engine import (
+    MissingColumnsError, ValidationCancelled, ValidationResult, find_missing_columns, merge_results,
+    validate_activities,
+)
+from workbook_cache import workbook_cache
+
+# Typed into the sheet field to validate every sheet of the workbook(s)
+ALL_SHEETS = "*"
+
+# Workbooks opened and sheets checked at the same time
+MAX_WORKERS = min(8, os.cpu_count() or 1)
+
+
+# Turns the sheet field into a list of sheet names ("Fall, Winter"), or None for every sheet ("*")
+def parse_sheet_names(text):
+    if text.strip() == ALL_SHEETS:
+        return None
+    names = []
+    for name in text.split(","):
+        name = name.strip()
+        if name and name not in names:
+            names.append(name)
+    # An empty field keeps the old "sheet not found" error
+    return names or [text]
+
+
+# Outcome of one sheet of one workbook: a result, or the error that stopped it
+@dataclass
+class SheetResult:
+    path: str
+    sheet_name: str
+    result: object = None
+    error: str = None
+    label: str = ""
+
+
+# How a sheet is named in the results: just the sheet, or workbook and sheet when several files are checked
+def sheet_label(path, sheet_name, several_files=False):
+    return f"{os.path.basename(path)} / {sheet_name}" if several_files else sheet_name
+
+
+# Per-sheet summary shown next to the overall counters
+def sheet_summary_row(sheet):
+    if sheet.error is not None:
+        return ("Error", sheet.label, sheet.error)
+    counters = sheet.result.counters
+    if sheet.result.ledger_code is not None and counters.get('ledger_code_activities', 0) == 0:
+        return ("Sheet Summary", sheet.label, f"No entries found for {sheet.result.ledger_code}.")
+    total = counters['total_activities']
+    details = (
+        f"Invalid Start Dates: {counters['wrong_start_date']} / {total}, "
+        f"Invalid End Dates: {counters['wrong_end_date']} / {total}, "
+        f"Both Out of Bounds: {counters['both_out_of_bounds']}, Invalid Costs: {counters['invalid_cost']}"
+    )
+    unreadable = counters.get('unreadable_start_date', 0) + counters.get('unreadable_end_date', 0)
+    if unreadable:
+        details += f", Unreadable Dates: {unreadable}"
+    for counts in sheet.result.rule_counts.values():
+        details += f", {counts['label']}: {counts['failed']}"
+    return ("Sheet Summary", sheet.label, details)
+
+
+# Issue (and ledger match) rows of one sheet, with the sheet named in the details column
+def labelled_rows(sheet, rows):
+    return [(activity, issue, f"[{sheet.label}] {details}") for activity, issue, details in rows]
+
+
+# Opens one workbook once and returns its requested sheets plus the names it does not have.
+# Workbooks too big to load whole come back as None and are streamed sheet by sheet instead.
+def _open_workbook(path, sheet_names, diagnostics, content_hash=None):
+    available = workbook_cache.sheet_names(path, content_hash=content_hash)
+    wanted = list(available) if sheet_names is None else sheet_names
+    unknown = [name for name in wanted if name not in available]
+    found = [name for name in wanted if name in available]
+    if should_stream(path):
+        return {name: None for name in found}, unknown
+    with diagnostics.stage("load"):
+        return workbook_cache.load_sheets(path, found, content_hash), unknown
+
+
+def _check_sheet(path, sheet_name, df, criteria, cancel_event, diagnostics, rules):
+    if cancel_event is not None and cancel_event.is_set():
+        raise ValidationCancelled()
+    if df is None:
+        return validate_workbook_streaming(
+            path, sheet_name, **criteria, cancel_event=cancel_event, diagnostics=diagnostics, rules=rules,
+        )
+    missing_columns = find_missing_columns(df)
+    if missing_columns:
+        raise MissingColumnsError(missing_columns)
+    return validate_activities(df, **criteria, cancel_event=cancel_event, diagnostics=diagnostics, rules=rules)
+
+
+# Validates the chosen sheets (every sheet when sheet_names is None) of several workbooks. Each
+# workbook is read once for all its sheets, workbooks are opened side by side and sheets are
+# checked on a pool of threads as soon as their workbook is loaded. on_sheet receives every
+# SheetResult as it finishes, with the number of sheets done and known so far. rules (a
+# custom_rules.RuleSet) are checked on every sheet. content_hashes maps paths to their content hash
+# so the parsed sheets are cached by content (see WorkbookCache.file_key). Returns the SheetResults
+# in workbook and sheet order.
+def validate_workbooks(paths, sheet_names, criteria, on_sheet=None, cancel_event=None, diagnostics=None,
+                       max_workers=MAX_WORKERS, rules=None, content_hashes=None):
+    content_hashes = content_hashes or {}
+    diagnostics = diagnostics or NullDiagnostics()
+    label = lambda path, sheet_name: sheet_label(path, sheet_name, len(paths) > 1)
+
+    finished = []
+    known_sheets = 0
+
+    def finish(sheet):
+        finished.append(sheet)
+        if on_sheet is not None:
+            on_sheet(sheet, len(finished), max(known_sheets, len(finished)))
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        pending = {
+            pool.submit(_open_workbook, path, sheet_names, diagnostics, content_hashes.get(path)): (path, None)
+            for path in paths
+        }
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path, sheet_name = pending.pop(future)
+
+                    # A workbook was opened: its sheets are queued for checking
+                    if sheet_name is None:
+                        try:
+                            sheets, unknown = future.result()
+                        except Exception as e:
+                            known_sheets += 1
+                            finish(SheetResult(path, "", error=str(e), label=os.path.basename(path)))
+                            continue
+                        known_sheets += len(sheets) + len(unknown)
+                        for name in unknown:
+                            finish(SheetResult(path, name, error=f"Worksheet named '{name}' not found",
+                                               label=label(path, name)))
+                        for name, df in sheets.items():
+                            check = pool.submit(_check_sheet, path, name, df, criteria, cancel_event, diagnostics, rules)
+                            pending[check] = (path, name)
+                        continue
+
+                    # A sheet was checked
+                    try:
+                        finish(SheetResult(path, sheet_name, result=future.result(), label=label(path, sheet_name)))
+                    except ValidationCancelled:
+                        raise
+                    except Exception as e:
+                        finish(SheetResult(path, sheet_name, error=str(e), label=label(path, sheet_name)))
+        except ValidationCancelled:
+            for future in pending:
+                future.cancel()
+            raise
+
+    # Sheets in the order they were asked for, or their order in the workbook
+    order = {path: position for position, path in enumerate(paths)}
+    sheet_order = {}
+    for path in paths:
+        try:
+            names = sheet_names if sheet_names is not None else workbook_cache.sheet_names(
+                path, content_hash=content_hashes.get(path)
+            )
+        except Exception:
+            names = []
+        sheet_order[path] = {name: position for position, name in enumerate(names)}
+    finished.sort(key=lambda sheet: (order[sheet.path], sheet_order[sheet.path].get(sheet.sheet_name, -1)))
+    return finished
+
+
+# Overall result of every sheet that validated, with each row naming its sheet
+def merge_sheet_results(sheets, ledger_code=None):
+    return merge_results(
+        [
+            ValidationResult(
+                issues=labelled_rows(sheet, sheet.result.issues),
+                ledger_matches=labelled_rows(sheet, sheet.result.ledger_matches),
+                counters=sheet.result.counters,
+                rule_counts=sheet.result.rule_counts,
+            )
+            for sheet in sheets if sheet.result is not None
+        ],
+        ledger_code.strip() if ledger_code else None,
+    )
+
+
+# Everything shown after the issue rows: ledger matches, one summary per sheet, then the overall summaries
+def trailing_sheet_rows(sheets, ledger_code=None):
+    merged = merge_sheet_results(sheets, ledger_code)
+    trailing = merged.trailing_rows()
+    num_of_matches = len(merged.ledger_matches)
+    return trailing[:num_of_matches] + [sheet_summary_row(sheet) for sheet in sheets] + trailing[num_of_matches:]
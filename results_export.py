@@ -0,0 +1,186 @@
+# Writes saved validation runs from the results store to CSV, XLSX or JSON.
+#
+#   python results_export.py issues.xlsx --file export.xlsx --sheet Activities
+#   python results_export.py issues.csv --run 41 --run 42
+#
+# Issues are streamed out of the database a chunk at a time, so runs of any size are exported
+# without building the whole table in memory.
+import argparse
+import csv
+import json
+import os
+import sys
+
+from results_store import ISSUE_CHUNK_ROWS, ResultsStore, results_store
+from validation_engine import ValidationCancelled, ValidationResult
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # XLSX export needs openpyxl
+    Workbook = None
+
+# File extension -> name shown in the save dialog
+EXPORT_FORMATS = {'.xlsx': "Excel Workbook", '.csv': "CSV", '.json': "JSON"}
+
+ISSUE_COLUMNS = ("Sheet", "Activity", "Issue", "Details", "Ledger code")
+SUMMARY_COLUMNS = ("Sheet", "Activity", "Issue", "Details")
+
+# Rows an Excel worksheet can hold (header included); longer runs continue on another worksheet
+MAX_SHEET_ROWS = 1_048_576
+
+
+# Summary rows of a saved run, the same ones the results view shows after the issues
+def run_summary_rows(info):
+    result = ValidationResult(
+        counters=info['counters'],
+        ledger_code=info['criteria'].get('ledger_code') or None,
+        rule_counts=info['rule_counts'],
+    )
+    return result.trailing_rows()
+
+
+def _write_csv(path, runs, issue_chunks):
+    # utf-8-sig so Excel opens accented activity names correctly
+    with open(path, 'w', newline='', encoding='utf-8-sig') as export_file:
+        writer = csv.writer(export_file)
+        writer.writerow(ISSUE_COLUMNS)
+        for run in runs:
+            for rows in issue_chunks(run):
+                writer.writerows((run['label'],) + tuple(row) for row in rows)
+        for run in runs:
+            writer.writerows((run['label'],) + tuple(row) + ("",) for row in run_summary_rows(run))
+
+
+def _write_xlsx(path, runs, issue_chunks):
+    if Workbook is None:
+        raise RuntimeError("XLSX export needs openpyxl (pip install openpyxl)")
+
+    # A write-only workbook streams rows to disk instead of keeping every cell object
+    workbook = Workbook(write_only=True)
+    issues_sheet, sheet_rows, sheet_count = None, MAX_SHEET_ROWS, 0
+    for run in runs:
+        for rows in issue_chunks(run):
+            for row in rows:
+                if sheet_rows == MAX_SHEET_ROWS:
+                    sheet_count += 1
+                    issues_sheet = workbook.create_sheet("Issues" if sheet_count == 1 else f"Issues ({sheet_count})")
+                    issues_sheet.append(ISSUE_COLUMNS)
+                    sheet_rows = 1
+                issues_sheet.append((run['label'],) + tuple(row))
+                sheet_rows += 1
+    if issues_sheet is None:
+        workbook.create_sheet("Issues").append(ISSUE_COLUMNS)
+
+    summary_sheet = workbook.create_sheet("Summary")
+    summary_sheet.append(SUMMARY_COLUMNS)
+    for run in runs:
+        for row in run_summary_rows(run):
+            summary_sheet.append((run['label'],) + tuple(row))
+    workbook.save(path)
+
+
+def _write_json(path, runs, issue_chunks):
+    keys = ('activity', 'issue', 'details', 'ledger_code')
+    with open(path, 'w', encoding='utf-8') as export_file:
+        export_file.write('{"runs": [')
+        for position, run in enumerate(runs):
+            header = {
+                'label': run['label'], 'file': run['file'], 'sheet': run['sheet'], 'started': run['started'],
+                'criteria': run['criteria'], 'counters': run['counters'],
+                'summary': [dict(zip(keys, row)) for row in run_summary_rows(run)],
+            }
+            # The run object is left open so its issues can be appended a chunk at a time
+            export_file.write(("," if position else "") + "\n" + json.dumps(header, default=str)[:-1] + ', "issues": [')
+            first = True
+            for rows in issue_chunks(run):
+                export_file.write(("" if first else ",") + "\n" + ",\n".join(json.dumps(dict(zip(keys, row))) for row in rows))
+                first = False
+            export_file.write("]}")
+        export_file.write("\n]}\n")
+
+
+WRITERS = {'.csv': _write_csv, '.xlsx': _write_xlsx, '.json': _write_json}
+
+
+# Exports saved runs, given as (run id, label) like the GUI's last_runs, to path; the format
+# follows the file extension. on_progress receives the number of issues written and the total
+# after every chunk, and cancel_event stops the export. The file only appears once it is complete.
+# Returns the number of issues written.
+def export_runs(runs, path, store=results_store, chunk_rows=ISSUE_CHUNK_ROWS, on_progress=None, cancel_event=None):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in WRITERS:
+        raise ValueError(f"Can't export to '{os.path.basename(path)}' (use {', '.join(EXPORT_FORMATS)})")
+
+    infos = []
+    for run_id, label in runs:
+        info = store.run_info(run_id)
+        if info is None:
+            raise ValueError(f"Run {run_id} is not in the results store")
+        info['label'] = label or info['sheet']
+        infos.append(info)
+
+    total = sum(info['issue_count'] for info in infos)
+    written = 0
+
+    def issue_chunks(info):
+        nonlocal written
+        for rows in store.iter_issues(info['id'], chunk_rows):
+            if cancel_event is not None and cancel_event.is_set():
+                raise ValidationCancelled()
+            yield rows
+            written += len(rows)
+            if on_progress is not None:
+                on_progress(written, total)
+
+    partial_path = f"{path}.part"
+    try:
+        WRITERS[extension](partial_path, infos, issue_chunks)
+        os.replace(partial_path, path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    return written
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Export saved validation results to CSV, XLSX or JSON.")
+    parser.add_argument('output', help="File to write; the format follows its extension (.csv, .xlsx, .json)")
+    parser.add_argument('--run', type=int, action='append', default=[], help="Id of a saved run (repeatable)")
+    parser.add_argument('--file', help="Export the latest run of this workbook")
+    parser.add_argument('--sheet', action='append', default=[], help="Sheet of --file (repeatable)")
+    parser.add_argument('--db', default=None, help="Results database (default: the checker's)")
+    parser.add_argument('--chunk-rows', type=int, default=ISSUE_CHUNK_ROWS, help="Issues read per chunk")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    store = ResultsStore(args.db) if args.db else results_store
+
+    runs = [(run_id, None) for run_id in args.run]
+    if args.file:
+        if not args.sheet:
+            print("Error: --file needs --sheet", file=sys.stderr)
+            return 2
+        for sheet_name in args.sheet:
+            run_id = store.latest_run(args.file, sheet_name)
+            if run_id is None:
+                print(f"Error: {args.file} [{sheet_name}] has not been validated", file=sys.stderr)
+                return 2
+            runs.append((run_id, sheet_name if len(args.sheet) > 1 else None))
+    if not runs:
+        print("Error: give --run or --file and --sheet", file=sys.stderr)
+        return 2
+
+    try:
+        written = export_runs(runs, args.output, store, chunk_rows=max(1, args.chunk_rows))
+    except (ValueError, RuntimeError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"Exported {written} issues to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,234 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import datetime
+
+import pandas as pd
+
+# Database every validation run is saved to
+RESULTS_DB = os.environ.get(
+    'AMILIA_RESULTS_DB',
+    os.path.join(os.path.expanduser('~'), '.cache', 'amilia_activity_checker', 'results.sqlite3'),
+)
+
+# Runs kept per file and sheet; older ones are deleted when a new run is saved
+KEEP_RUNS = int(os.environ.get('AMILIA_KEEP_RUNS', 20))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    file TEXT NOT NULL,
+    sheet TEXT NOT NULL,
+    started TEXT NOT NULL,
+    criteria TEXT NOT NULL,
+    counters TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS issues (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    activity TEXT,
+    issue TEXT NOT NULL,
+    details TEXT NOT NULL,
+    ledger_code TEXT,
+    issue_key INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_by_sheet ON runs(file, sheet, id);
+CREATE INDEX IF NOT EXISTS issues_by_key ON issues(run_id, issue_key);
+CREATE INDEX IF NOT EXISTS issues_by_position ON issues(run_id, position);
+CREATE INDEX IF NOT EXISTS issues_by_activity ON issues(activity);
+CREATE INDEX IF NOT EXISTS issues_by_issue ON issues(issue);
+CREATE INDEX IF NOT EXISTS issues_by_ledger_code ON issues(ledger_code);
+"""
+
+# Issues read from the database at a time when a run is streamed out
+ISSUE_CHUNK_ROWS = 10_000
+
+# Labels of the three parts of a diff
+DIFF_NEW = "New"
+DIFF_RESOLVED = "Resolved"
+DIFF_UNCHANGED = "Unchanged"
+
+
+def _text(value):
+    return None if value is None or (not isinstance(value, str) and pd.isna(value)) else str(value)
+
+
+# Identifies an issue across runs: the same activity, rule and details. The nth copy of a repeated
+# issue gets its own key, so two identical rows that drop to one count as one resolved issue.
+def issue_keys(rows):
+    seen = {}
+    keys = []
+    for activity, issue, details in rows:
+        text = f"{_text(activity)}\x1f{issue}\x1f{details}"
+        occurrence = seen.get(text, 0)
+        seen[text] = occurrence + 1
+        digest = hashlib.blake2b(f"{text}\x1f{occurrence}".encode(), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, 'big', signed=True))
+    return keys
+
+
+# Keeps the issues of the latest validation runs in SQLite so runs of the same file and sheet can
+# be compared. Each call opens its own connection, so the store can be used from any thread.
+# save_run_later hands the write to a single writer thread, so a front end can show a run's
+# results without waiting for its issues to be written.
+class ResultsStore:
+    def __init__(self, path=RESULTS_DB, keep_runs=KEEP_RUNS):
+        self.path = path
+        self.keep_runs = keep_runs
+        self._ready = False
+        self._writer = None
+        self._writer_lock = threading.Lock()
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute("PRAGMA foreign_keys = ON")
+        if not self._ready:
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.executescript(SCHEMA)
+            self._ready = True
+        return connection
+
+    # Saves a run's issues and counters (rule pass/fail counts included) and returns the new run id.
+    # Runs of the same file and sheet older than the last keep_runs are deleted in the same transaction.
+    def save_run(self, path, sheet_name, criteria, result):
+        rows = result.issues
+        ledger_codes = result.issue_ledger_codes or [None] * len(rows)
+        file, sheet = os.path.abspath(path), str(sheet_name)
+        with closing(self._connect()) as connection, connection:
+            cursor = connection.execute(
+                "INSERT INTO runs (file, sheet, started, criteria, counters) VALUES (?, ?, ?, ?, ?)",
+                (
+                    file, sheet, datetime.now().isoformat(timespec='seconds'),
+                    json.dumps(criteria, default=str),
+                    json.dumps(dict(result.counters, rule_counts=result.rule_counts)),
+                ),
+            )
+            run_id = cursor.lastrowid
+            connection.executemany(
+                "INSERT INTO issues (run_id, position, activity, issue, details, ledger_code, issue_key) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (run_id, position, _text(activity), issue, details, _text(code), key)
+                    for position, ((activity, issue, details), code, key)
+                    in enumerate(zip(rows, ledger_codes, issue_keys(rows)))
+                ),
+            )
+            connection.execute(
+                "DELETE FROM runs WHERE file = ? AND sheet = ? AND id NOT IN "
+                "(SELECT id FROM runs WHERE file = ? AND sheet = ? ORDER BY id DESC LIMIT ?)",
+                (file, sheet, file, sheet, max(1, self.keep_runs)),
+            )
+        return run_id
+
+    # Saves a run on the writer thread; returns a Future of the run id. Runs are written one at a
+    # time in the order they were handed over.
+    def save_run_later(self, path, sheet_name, criteria, result):
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='results-store')
+        return self._writer.submit(self.save_run, path, sheet_name, criteria, result)
+
+    # Id of the run of the same file and sheet that came before run_id (None for the first run)
+    def previous_run(self, run_id):
+        with closing(self._connect()) as connection:
+            row = connection.execute(
+                "SELECT previous.id FROM runs AS current JOIN runs AS previous "
+                "ON previous.file = current.file AND previous.sheet = current.sheet AND previous.id < current.id "
+                "WHERE current.id = ? ORDER BY previous.id DESC LIMIT 1",
+                (run_id,),
+            ).fetchone()
+        return row[0] if row else None
+
+    # Id of the latest run of a file and sheet (None if it was never validated)
+    def latest_run(self, path, sheet_name):
+        with closing(self._connect()) as connection:
+            row = connection.execute(
+                "SELECT MAX(id) FROM runs WHERE file = ? AND sheet = ?", (os.path.abspath(path), str(sheet_name))
+            ).fetchone()
+        return row[0]
+
+    def run_info(self, run_id):
+        with closing(self._connect()) as connection:
+            row = connection.execute(
+                "SELECT file, sheet, started, criteria, counters, "
+                "(SELECT COUNT(*) FROM issues WHERE run_id = runs.id) FROM runs WHERE id = ?", (run_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        counters = json.loads(row[4])
+        return {
+            'id': run_id, 'file': row[0], 'sheet': row[1], 'started': row[2],
+            'criteria': json.loads(row[3]), 'rule_counts': counters.pop('rule_counts', {}), 'counters': counters,
+            'issue_count': row[5],
+        }
+
+    # Issues of a run, optionally narrowed to an activity, an issue type and/or a ledger code
+    def issues(self, run_id, activity=None, issue=None, ledger_code=None):
+        query = "SELECT activity, issue, details FROM issues WHERE run_id = ?"
+        arguments = [run_id]
+        for column, value in (('activity', activity), ('issue', issue), ('ledger_code', ledger_code)):
+            if value is not None:
+                query += f" AND {column} = ?"
+                arguments.append(value)
+        with closing(self._connect()) as connection:
+            return connection.execute(query + " ORDER BY position", arguments).fetchall()
+
+    # Issues of a run (activity, issue, details, ledger code) in the order they were found, read a
+    # chunk at a time so a run of any size can be written out without loading it whole
+    def iter_issues(self, run_id, chunk_rows=ISSUE_CHUNK_ROWS):
+        with closing(self._connect()) as connection:
+            cursor = connection.execute(
+                "SELECT activity, issue, details, ledger_code FROM issues WHERE run_id = ? ORDER BY position",
+                (run_id,),
+            )
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    return
+                yield rows
+
+    # Splits the issues of two runs into new, resolved and unchanged by joining on the issue key
+    # index, so neither run is rescanned row by row in Python
+    def diff(self, run_id, previous_run_id):
+        anti_join = (
+            "SELECT a.activity, a.issue, a.details FROM issues AS a WHERE a.run_id = ? AND NOT EXISTS "
+            "(SELECT 1 FROM issues AS b WHERE b.run_id = ? AND b.issue_key = a.issue_key) ORDER BY a.position"
+        )
+        with closing(self._connect()) as connection:
+            return {
+                DIFF_NEW: connection.execute(anti_join, (run_id, previous_run_id)).fetchall(),
+                DIFF_RESOLVED: connection.execute(anti_join, (previous_run_id, run_id)).fetchall(),
+                DIFF_UNCHANGED: connection.execute(
+                    "SELECT a.activity, a.issue, a.details FROM issues AS a JOIN issues AS b "
+                    "ON b.run_id = ? AND b.issue_key = a.issue_key WHERE a.run_id = ? ORDER BY a.position",
+                    (previous_run_id, run_id),
+                ).fetchall(),
+            }
+
+    # Drops every run of a file (or all runs) together with their issues
+    def forget(self, path=None):
+        with closing(self._connect()) as connection, connection:
+            if path is None:
+                connection.execute("DELETE FROM runs")
+            else:
+                connection.execute("DELETE FROM runs WHERE file = ?", (os.path.abspath(path),))
+
+
+# Rows for the results view: every issue tagged with its part of the diff, then the counts
+def diff_rows(diff, label=None):
+    prefix = f"[{label}] " if label else ""
+    rows = []
+    for status in (DIFF_NEW, DIFF_RESOLVED, DIFF_UNCHANGED):
+        rows.extend((activity, f"{status}: {issue}", f"{prefix}{details}") for activity, issue, details in diff[status])
+    for status in (DIFF_NEW, DIFF_RESOLVED, DIFF_UNCHANGED):
+        rows.append(("Diff", f"{status} Issues", f"{prefix}{len(diff[status])}"))
+    return rows
+
+
+# Store shared by the whole application
+results_store = ResultsStore()
@@ -0,0 +1,186 @@
+from tkinter import ttk
+
+# Rows moved by one click of the mouse wheel
+WHEEL_STEP = 3
+
+
+# Shows a large list of result rows in a Treeview without creating a widget row for each one.
+# The rows live in a plain list (the backing store) and only the window that fits on screen is
+# written into a fixed set of Treeview items, which are reused as the user scrolls. Sorting and
+# filtering work on positions into the backing store, so neither rebuilds any widget rows.
+class VirtualTreeview:
+    def __init__(self, tree, scrollbar):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.columns = tuple(tree['columns'])
+        self.headings = {column: tree.heading(column, 'text') for column in self.columns}
+
+        self._rows = []          # backing store, one tuple of values per row
+        self._view = []          # positions into _rows that pass the filter, in display order
+        self._filter_text = ""
+        self._sort = None        # (column index, reverse)
+        self._highlighted = set()
+        self._offset = 0         # position in _view of the first row on screen
+        self._page_size = max(1, int(tree.cget('height')))
+        self._slots = []         # Treeview items that display the current window
+        self.generation = 0      # changes whenever the backing store does
+
+        # The scrollbar and the wheel move our window instead of the Treeview's own view
+        scrollbar.configure(command=self._on_scrollbar)
+        tree.configure(yscrollcommand=lambda *args: None)
+        tree.bind('<Configure>', self._on_resize)
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            tree.bind(sequence, self._on_wheel)
+        for column in self.columns:
+            tree.heading(column, command=lambda c=column: self.toggle_sort(c))
+
+    def __len__(self):
+        return len(self._rows)
+
+    # Every row in the backing store, in the order it was added
+    @property
+    def rows(self):
+        return self._rows
+
+    # Rows that pass the filter, in display order
+    def visible_rows(self):
+        return [self._rows[position] for position in self._view]
+
+    def clear(self):
+        self.generation += 1
+        self._rows = []
+        self._view = []
+        self._highlighted = set()
+        self._offset = 0
+        self._render()
+
+    def append(self, values):
+        self.extend([values])
+
+    # Adds rows to the backing store; only the on-screen window is redrawn
+    def extend(self, rows):
+        self.generation += 1
+        start = len(self._rows)
+        self._rows.extend(tuple(values) for values in rows)
+        if self._filter_text or self._sort:
+            self._rebuild_view()
+        else:
+            self._view.extend(range(start, len(self._rows)))
+        self._render()
+
+    def set_rows(self, rows):
+        self.generation += 1
+        self._rows = []
+        self._view = []
+        self._highlighted = set()
+        self._offset = 0
+        self.extend(rows)
+
+    # Keeps only the rows where any column contains the text (case-insensitive)
+    def set_filter(self, text):
+        self._filter_text = text.strip().lower()
+        self._offset = 0
+        self._rebuild_view()
+        self._render()
+
+    def sort_by(self, column, reverse=False):
+        self._sort = (self.columns.index(column), reverse) if column is not None else None
+        for name in self.columns:
+            arrow = (" ▼" if reverse else " ▲") if name == column else ""
+            self.tree.heading(name, text=self.headings[name] + arrow)
+        self._rebuild_view()
+        self._render()
+
+    # Heading clicks sort ascending, then descending, then go back to the original order
+    def toggle_sort(self, column):
+        index = self.columns.index(column)
+        if self._sort is None or self._sort[0] != index:
+            self.sort_by(column)
+        elif not self._sort[1]:
+            self.sort_by(column, reverse=True)
+        else:
+            self.sort_by(None)
+
+    # Highlights rows by their position in the backing store
+    def highlight(self, positions):
+        self._highlighted.update(positions)
+        self._render()
+
+    def clear_highlight(self):
+        self._highlighted = set()
+        self._render()
+
+    # Scrolls so the row at this backing store position is on screen
+    def see(self, position):
+        try:
+            index = self._view.index(position)
+        except ValueError:
+            return
+        if not self._offset <= index < self._offset + self._page_size:
+            self.scroll_to(index - self._page_size // 2)
+
+    def scroll_to(self, offset):
+        offset = max(0, min(int(offset), len(self._view) - self._page_size))
+        if offset != self._offset:
+            self._offset = offset
+            self._render()
+
+    def _rebuild_view(self):
+        positions = range(len(self._rows))
+        if self._filter_text:
+            text = self._filter_text
+            positions = [p for p in positions if any(text in str(value).lower() for value in self._rows[p])]
+        if self._sort:
+            index, reverse = self._sort
+            positions = sorted(positions, key=lambda p: str(self._rows[p][index]).lower(), reverse=reverse)
+        self._view = list(positions)
+        self._offset = max(0, min(self._offset, len(self._view) - self._page_size))
+
+    # Writes the visible window into the reusable Treeview items
+    def _render(self):
+        count = max(0, min(self._page_size, len(self._view) - self._offset))
+        while len(self._slots) < count:
+            self._slots.append(self.tree.insert("", "end"))
+        if len(self._slots) > count:
+            self.tree.delete(*self._slots[count:])
+            del self._slots[count:]
+
+        window = self._view[self._offset:self._offset + count]
+        for slot, position in zip(self._slots, window):
+            tags = ('highlight',) if position in self._highlighted else ()
+            self.tree.item(slot, values=self._rows[position], tags=tags)
+
+        total = len(self._view)
+        if total:
+            self.scrollbar.set(self._offset / total, (self._offset + count) / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == 'moveto':
+            self.scroll_to(float(amount) * len(self._view))
+        elif action == 'scroll':
+            step = self._page_size if unit == 'pages' else 1
+            self.scroll_to(self._offset + int(amount) * step)
+
+    def _on_wheel(self, event):
+        if event.num == 4 or getattr(event, 'delta', 0) > 0:
+            self.scroll_to(self._offset - WHEEL_STEP)
+        else:
+            self.scroll_to(self._offset + WHEEL_STEP)
+        return "break"
+
+    # Fits the number of reused items to the height the Treeview was given by the layout
+    def _on_resize(self, event):
+        style = ttk.Style(self.tree)
+        row_height = int(style.lookup('Treeview', 'rowheight') or 20)
+        header_height = row_height
+        if self._slots:
+            bbox = self.tree.bbox(self._slots[0])
+            if bbox:
+                header_height = bbox[1]
+        page_size = max(1, (event.height - header_height) // row_height)
+        if page_size != self._page_size:
+            self._page_size = page_size
+            self._offset = max(0, min(self._offset, len(self._view) - self._page_size))
+            self._render()
@@ -0,0 +1,105 @@
+import os
+
+import openpyxl
+import pandas as pd
+
+from diagnostics import NullDiagnostics
+from validation_engine import (
+    CHUNK_ROWS, REQUIRED_COLUMNS, MissingColumnsError, ValidationCancelled, merge_results, type_activities,
+    validate_activities,
+)
+
+# Workbooks bigger than this are validated chunk by chunk instead of being loaded whole
+STREAMING_FILE_SIZE = 100 * 1024 * 1024
+
+# Formats openpyxl can read row by row
+STREAMING_EXTENSIONS = ('.xlsx', '.xlsm')
+
+
+def can_stream(path):
+    return os.path.splitext(path)[1].lower() in STREAMING_EXTENSIONS
+
+
+# Whether a workbook is big enough that it should be streamed rather than loaded whole
+def should_stream(path):
+    return can_stream(path) and os.path.getsize(path) > STREAMING_FILE_SIZE
+
+
+# Reads a sheet with openpyxl's read-only parser and yields it as DataFrames of chunk_rows rows,
+# holding only the required columns. Only one chunk is in memory at a time. Blank rows at the end
+# of the sheet are dropped like pd.read_excel does.
+def iter_sheet_chunks(path, sheet_name=0, chunk_rows=CHUNK_ROWS, columns=REQUIRED_COLUMNS):
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[sheet_name] if isinstance(sheet_name, int) else workbook[sheet_name]
+        rows = sheet.iter_rows(values_only=True)
+        header = [str(value).strip().lower() if value is not None else "" for value in next(rows, ())]
+
+        # Finds each required column (case-insensitive) so every other column can be skipped
+        missing_columns = [column for column in columns if column.lower() not in header]
+        if missing_columns:
+            raise MissingColumnsError(missing_columns)
+        positions = [header.index(column.lower()) for column in columns]
+
+        chunk = []
+        blank_rows = 0
+        for row in rows:
+            values = tuple(row[p] if p < len(row) else None for p in positions)
+            if all(value is None for value in values):
+                blank_rows += 1
+                continue
+            # Blank rows in the middle of the sheet still count, as they would with read_excel
+            chunk.extend([(None,) * len(columns)] * blank_rows)
+            blank_rows = 0
+            chunk.append(values)
+            if len(chunk) >= chunk_rows:
+                yield pd.DataFrame(chunk[:chunk_rows], columns=columns)
+                chunk = chunk[chunk_rows:]
+        if chunk:
+            yield pd.DataFrame(chunk, columns=columns)
+    finally:
+        workbook.close()
+
+
+# Rough number of data rows in a sheet, read from the sheet's dimensions (None if not recorded)
+def estimate_rows(path, sheet_name=0):
+    workbook = openpyxl.load_workbook(path, read_only=True)
+    try:
+        sheet = workbook.worksheets[sheet_name] if isinstance(sheet_name, int) else workbook[sheet_name]
+        return sheet.max_row - 1 if sheet.max_row else None
+    finally:
+        workbook.close()
+
+
+# Validates a sheet while streaming it: every chunk is checked and thrown away, and only its issues
+# and counters are kept, so peak memory depends on chunk_rows rather than on the file size.
+# on_chunk, cancel_event, diagnostics and rules work like they do for validate_activities.
+def validate_workbook_streaming(path, sheet_name, start_date=None, end_date=None, min_cost=0, max_cost=float('inf'),
+                                ledger_code=None, chunk_rows=CHUNK_ROWS, on_chunk=None, cancel_event=None,
+                                diagnostics=None, rules=None):
+    diagnostics = diagnostics or NullDiagnostics()
+    estimated_rows = estimate_rows(path, sheet_name) if on_chunk is not None else None
+    rows_read = 0
+    results = []
+    chunks = iter_sheet_chunks(path, sheet_name, chunk_rows)
+    while True:
+        with diagnostics.stage("load"):
+            chunk = next(chunks, None)
+        if chunk is None:
+            break
+        if cancel_event is not None and cancel_event.is_set():
+            raise ValidationCancelled()
+
+        # Each chunk gets the same typing as a loaded sheet, so both paths report the same issues
+        with diagnostics.stage("parse"):
+            chunk = type_activities(chunk)
+        result = validate_activities(
+            chunk, start_date, end_date, min_cost, max_cost, ledger_code, chunk_rows=chunk_rows, diagnostics=diagnostics,
+            rules=rules,
+        )
+        results.append(result)
+        rows_read += len(chunk)
+        if on_chunk is not None:
+            on_chunk(rows_read, max(rows_read, estimated_rows or 0), result.issues)
+
+    return merge_results(results, ledger_code.strip() if ledger_code else None)
@@ -0,0 +1,20 @@
+import os
+import sys
+
+import openpyxl
+
+# The checker's modules live at the top of the repository
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+# Writes an Amilia-shaped sheet; a blank ledger code makes pandas read the codes as floats
+def write_workbook(path, rows, sheet_name="Activities"):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = sheet_name
+    sheet.append(['Activity', 'Start date', 'End date', 'Cost', 'Ledger code'])
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+    return path
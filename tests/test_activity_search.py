@@ -0,0 +1,47 @@
+import numpy as np
+from fuzzywuzzy import fuzz
+
+from activity_search import MATCH_THRESHOLD, ActivitySearchIndex
+
+
+def test_blank_activities_are_indexed_as_text():
+    index = ActivitySearchIndex(['Swim', None, 'Yoga', np.nan, 'swim'])
+
+    assert index.names == ['swim', 'nan', 'yoga']
+    assert [positions.tolist() for positions in index.positions] == [[0, 4], [1, 3], [2]]
+    assert index.search('yoga')[0] == (100, 2)
+
+
+def test_empty_result_set():
+    index = ActivitySearchIndex([])
+
+    assert len(index) == 0
+    assert index.search('swim') == []
+
+
+# Names that share no trigram with the query can still score above the threshold
+def test_matches_outside_the_trigram_shortlist_are_found():
+    index = ActivitySearchIndex(['Abxcd Camp', 'Abycd Club', 'Pottery'])
+
+    positions, best, found = index.match_rows('abxcd')
+
+    assert found
+    assert best == 0
+    assert sorted(positions) == [0, 1]
+
+
+# Same highlighted rows as scoring every row with fuzz.partial_ratio
+def test_matches_equal_a_full_scan():
+    rng = np.random.default_rng(3)
+    words = ['swim', 'yoga', 'pottery', 'camp', 'club', 'adult', 'kids', 'tennis', 'abxcd', 'sat', 'sun']
+    activities = [" ".join(rng.choice(words, rng.integers(1, 4))) for _ in range(300)]
+    index = ActivitySearchIndex(activities)
+
+    for query in ['swim', 'yoga kids', 'abycd', 'potery', 'sa', 'xyz', 'tennis club sun']:
+        scores = [fuzz.partial_ratio(query, activity.lower()) for activity in activities]
+        expected = [i for i, score in enumerate(scores) if score >= MATCH_THRESHOLD]
+        positions, best, found = index.match_rows(query)
+
+        assert found == bool(expected)
+        assert sorted(positions) == (expected or [int(np.argmax(scores))])
+        assert scores[best] == max(scores)
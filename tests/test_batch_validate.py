@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+import batch_validate
+from conftest import write_workbook
+from results_store import results_store
+
+
+@pytest.fixture
+def store_path(tmp_path, monkeypatch):
+    # Worker processes are forked, so they write to the same temporary store
+    monkeypatch.setattr(results_store, 'path', str(tmp_path / "results.sqlite3"))
+    monkeypatch.setattr(results_store, '_ready', False)
+    return results_store.path
+
+
+def test_json_export_is_kept_next_to_the_report(tmp_path, store_path):
+    exports = tmp_path / "exports"
+    exports.mkdir()
+    write_workbook(exports / "fall.xlsx", [
+        ("Swim", "09/02/24", "10/02/24", 900, "4010"),
+        ("Yoga", "08/15/24", "10/03/24", 100, "4020"),
+        ("Chess", "09/04/24", "10/04/24", 100, "4010"),
+    ])
+    reports = tmp_path / "reports"
+
+    status = batch_validate.main([
+        str(exports), '--sheet', 'Activities', '--start-date', '09/01/24', '--end-date', '06/30/25',
+        '--min-cost', '50', '--max-cost', '400', '--output-dir', str(reports), '--export', 'json', '--workers', '1',
+    ])
+
+    assert status == 0
+    report_path = reports / "fall.Activities.json"
+    export_path = reports / "fall.Activities.issues.json"
+    report = json.loads(report_path.read_text())
+    export = json.loads(export_path.read_text())
+
+    assert report['status'] == 'ok'
+    assert report['export'] == str(export_path)
+    assert [issue['activity'] for issue in report['issues']] == ["Swim", "Yoga"]
+    assert report['counters']['invalid_cost'] == 1
+
+    [run] = export['runs']
+    assert run['sheet'] == "Activities"
+    assert [(issue['activity'], issue['issue']) for issue in run['issues']] == [
+        ("Swim", "Invalid Cost"), ("Yoga", "Invalid Start Date"),
+    ]
+    assert run['counters'] == report['counters']
+
+    summary = json.loads((reports / "summary.json").read_text())
+    assert summary['files'][0]['report'] == str(report_path)
+    assert summary['files'][0]['export'] == str(export_path)
@@ -0,0 +1,68 @@
+import os
+
+import pandas as pd
+
+from conftest import ROOT, write_workbook
+from custom_rules import RuleSet, load_rules
+from validation_engine import type_activities, validate_activities
+from workbook_cache import WorkbookCache
+
+EXAMPLE_RULES = os.path.join(ROOT, 'rules.example.json')
+
+
+def test_example_rules_compare_numeric_ledger_codes(tmp_path):
+    path = write_workbook(tmp_path / "export.xlsx", [
+        ("Swim A", "09/02/24", "10/02/24", 300, 4010),
+        ("Swim B", "09/02/24", "10/02/24", 100, 4010),
+        ("Yoga A", "09/03/24", "10/03/24", 450, 4020),
+        ("Yoga B", "09/03/24", "10/03/24", 50, 4020),
+        ("Chess", "09/04/24", "10/04/24", 999, None),
+    ])
+    df = WorkbookCache(use_sidecars=False).load_sheet(str(path), "Activities")
+
+    result = validate_activities(df, rules=load_rules(EXAMPLE_RULES))
+
+    assert result.rule_counts['rule:ledger_cost'] == {'label': "Cost Over Ledger Limit", 'passed': 3, 'failed': 2}
+    failed = [row for row in result.issues if row[1] == "Cost Over Ledger Limit"]
+    assert [row[0] for row in failed] == ["Swim A", "Yoga A"]
+    assert result.rule_counts['rule:max_duration']['failed'] == 0
+    assert result.rule_counts['rule:no_weekend_start']['failed'] == 0
+
+
+def test_ledger_code_rules_read_codes_as_written(tmp_path):
+    path = write_workbook(tmp_path / "export.xlsx", [
+        ("Swim", "09/02/24", "10/02/24", 10, 4010),
+        ("Yoga", "09/03/24", "10/03/24", 10, "4020-B"),
+        ("Chess", "09/04/24", "10/04/24", 10, None),
+    ])
+    rules_path = tmp_path / "rules.json"
+    rules_path.write_text('{"rules": [{"name": "codes", "field": "ledger_code", "op": "in", "value": [4010, "4020-B"]}]}')
+    df = WorkbookCache(use_sidecars=False).load_sheet(str(path), "Activities")
+
+    result = validate_activities(df, rules=load_rules(str(rules_path)))
+
+    assert result.rule_counts['rule:codes'] == {'label': "codes", 'passed': 3, 'failed': 0}
+
+
+# A chunk with a blank date must format durations like a chunk without one
+def test_durations_read_the_same_in_every_chunk():
+    df = type_activities(pd.DataFrame({
+        'Activity': ["Swim", "Yoga", "Chess", "Tennis"],
+        'Start date': ["09/02/24", None, "09/02/24", "09/02/24"],
+        'End date': ["11/04/24", "11/04/24", "11/04/24", "09/10/24"],
+        'Cost': [10.0] * 4,
+        'Ledger code': ["4010"] * 4,
+    }))
+    rules = RuleSet([
+        {"name": "short", "label": "Too Long", "field": "duration_days", "op": "<=", "value": 30},
+        {"name": "listed", "label": "Odd Length", "field": "duration_days", "op": "in", "value": [8, 63]},
+    ])
+
+    for chunk_rows in (1, 2, 3, 4):
+        result = validate_activities(df, rules=rules, chunk_rows=chunk_rows)
+
+        assert result.issues == [
+            ("Swim", "Too Long", "Duration (days): 63, expected <= 30"),
+            ("Chess", "Too Long", "Duration (days): 63, expected <= 30"),
+        ]
+        assert result.rule_counts['rule:listed'] == {'label': "Odd Length", 'passed': 4, 'failed': 0}
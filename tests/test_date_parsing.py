@@ -0,0 +1,98 @@
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from date_parsing import DATE_FORMATS, clear_date_cache, parse_date_column, parse_date_text
+
+SEPT_2 = pd.Timestamp(2024, 9, 2)
+
+
+def parse(values):
+    clear_date_cache()
+    dates, unreadable = parse_date_column(pd.Series(values, dtype=object))
+    return list(dates), unreadable.tolist()
+
+
+@pytest.mark.parametrize('date_format', DATE_FORMATS)
+def test_every_format_is_read(date_format):
+    day = datetime(2024, 9, 2, 0, 0, 0)
+    texts = [day.strftime(date_format), (day + pd.Timedelta(days=30)).strftime(date_format)]
+
+    dates, unreadable = parse(texts)
+
+    assert dates == [SEPT_2, SEPT_2 + pd.Timedelta(days=30)]
+    assert unreadable == [False, False]
+
+
+def test_a_column_mixing_formats_and_cell_types():
+    dates, unreadable = parse(["09/02/24", "2024-09-02", "Sep 02, 2024", datetime(2024, 9, 2), date(2024, 9, 2),
+                               45537, 45537.5, " 09/02/2024 "])
+
+    assert dates[:6] == [SEPT_2] * 6
+    assert dates[6] == SEPT_2 + pd.Timedelta(hours=12)
+    assert dates[7] == SEPT_2
+    assert not any(unreadable)
+
+
+def test_day_first_dates_fall_back_to_a_format_that_reads_them():
+    dates, unreadable = parse(["09/02/24", "09/30/24", "02 Sep 2024"])
+
+    assert dates == [SEPT_2, pd.Timestamp(2024, 9, 30), SEPT_2]
+    assert unreadable == [False, False, False]
+
+
+def test_blank_cells_are_not_reported():
+    dates, unreadable = parse(["09/02/24", None, np.nan, "", "   "])
+
+    assert dates[0] == SEPT_2
+    assert all(pd.isna(value) for value in dates[1:])
+    assert unreadable == [False] * 5
+
+
+@pytest.mark.parametrize('cell', ["TBD", "13/45/24", "31/31/24", "2024", "12", "45537", True])
+def test_unreadable_cells_are_reported(cell):
+    dates, unreadable = parse(["09/02/24", cell])
+
+    assert dates[0] == SEPT_2 and pd.isna(dates[1])
+    assert unreadable == [False, True]
+
+
+@pytest.mark.parametrize('number', [0, 12, 2024, 18263, 73051, 2958465, -5])
+def test_serial_numbers_outside_the_plausible_range_are_reported(number):
+    dates, unreadable = parse([number])
+
+    assert pd.isna(dates[0])
+    assert unreadable == [True]
+
+
+def test_serial_number_range_bounds():
+    dates, unreadable = parse([18264, 73050])
+
+    assert dates == [pd.Timestamp(1950, 1, 1), pd.Timestamp(2099, 12, 31)]
+    assert unreadable == [False, False]
+
+
+def test_parsed_strings_are_reused_across_calls():
+    first, _ = parse(["09/02/24", "10/15/24"])
+    again, unreadable = parse_date_column(pd.Series(["10/15/24", "09/02/24"], dtype=object))
+
+    assert list(again) == first[::-1]
+    assert not unreadable.any()
+
+
+def test_typed_dates_are_left_alone():
+    column = pd.Series(pd.to_datetime(["2024-09-02", None]))
+
+    dates, unreadable = parse_date_column(column)
+
+    assert dates.equals(column)
+    assert not unreadable.any()
+
+
+def test_date_text_does_not_read_serial_numbers():
+    assert parse_date_text(" 9/2/2024 ") == date(2024, 9, 2)
+    assert parse_date_text("09/02/24") == date(2024, 9, 2)
+    assert parse_date_text("12") is None
+    assert parse_date_text("45537") is None
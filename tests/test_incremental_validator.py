@@ -0,0 +1,169 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from custom_rules import RuleSet
+from validation_engine import RULE_GROUPS, IncrementalValidator, type_activities, validate_activities
+from watch_folder import match_rows, row_hashes
+
+RULES = [
+    {"name": "max_duration", "label": "Too Long", "field": "duration_days", "op": "<=", "value": 60},
+    {"name": "no_weekend_start", "label": "Weekend Start", "field": "start_weekday", "op": "not_in",
+     "value": ["Sat", "Sun"]},
+    {"name": "ledger_cost", "label": "Cost Over Ledger Limit", "field": "cost", "op": "<=", "by": "ledger_code",
+     "value": {"4010": 250, "4020": 400}},
+    {"name": "named", "field": "activity", "op": "matches", "value": "^Activity"},
+]
+
+
+# A sheet as read from the workbook, with blank and unreadable dates and costs, numeric and text ledger codes
+def make_raw_sheet(rows=600, seed=0):
+    rng = np.random.default_rng(seed)
+    starts = pd.Timestamp(2024, 8, 15) + pd.to_timedelta(rng.integers(0, 300, rows), unit='D')
+    ends = starts + pd.to_timedelta(rng.integers(0, 90, rows), unit='D')
+    df = pd.DataFrame({
+        'Activity': np.array([f"Activity {i % 41}" for i in range(rows)], dtype=object),
+        'Start date': starts.strftime('%m/%d/%y').to_numpy(dtype=object),
+        'End date': ends.strftime('%m/%d/%y').to_numpy(dtype=object),
+        'Cost': np.round(rng.uniform(0, 500, rows), 2).astype(object),
+        'Ledger code': np.array([4010, 4020, "4020-B", 5000], dtype=object)[rng.integers(0, 4, rows)],
+    })
+    broken = {
+        'Start date': [None, "TBD"],
+        'End date': [None, "soon"],
+        'Cost': [None, "N/A"],
+        'Ledger code': [None],
+        'Activity': ["Pottery", None],
+    }
+    for column, values in broken.items():
+        cells = rng.choice(rows, 10, replace=False)
+        df.loc[cells, column] = np.array(values, dtype=object)[np.arange(len(cells)) % len(values)]
+    return df
+
+
+def make_sheet(rows=600, seed=0):
+    return type_activities(make_raw_sheet(rows, seed))
+
+
+# The next version of a raw sheet: rows edited (some dates blanked or made unreadable), removed,
+# and added at random places
+def edit_sheet(raw, rng):
+    raw = raw.copy()
+    edited = rng.choice(len(raw), 40, replace=False)
+    raw.loc[edited[:15], 'Cost'] = np.round(rng.uniform(0, 500, 15), 2)
+    raw.loc[edited[15:25], 'Start date'] = None
+    raw.loc[edited[25:30], 'End date'] = "never"
+    raw.loc[edited[30:], 'Ledger code'] = 4010
+    raw = raw.drop(index=rng.choice(len(raw), 30, replace=False))
+
+    added = make_raw_sheet(50, seed=int(rng.integers(1000)))
+    added.loc[:5, 'End date'] = None
+    places = np.concatenate([np.arange(len(raw)), rng.uniform(0, len(raw), len(added))])
+    combined = pd.concat([raw, added], ignore_index=True)
+    return combined.iloc[np.argsort(places, kind='stable')].reset_index(drop=True)
+
+
+# Criteria the GUI can pass, drawn at random (blank fields included)
+def random_criteria(rng):
+    starts = [None, date(2024, 9, 1), date(2024, 11, 15)]
+    ends = [None, date(2025, 3, 31), date(2025, 6, 30)]
+    costs = [(0, float('inf')), (50.0, 400.0), (100.0, 250.0)]
+    codes = [None, "", "4010", "4020", " 4020-b ", "9999"]
+    min_cost, max_cost = costs[rng.integers(len(costs))]
+    return {
+        'start_date': starts[rng.integers(len(starts))],
+        'end_date': ends[rng.integers(len(ends))],
+        'min_cost': min_cost,
+        'max_cost': max_cost,
+        'ledger_code': codes[rng.integers(len(codes))],
+    }
+
+
+def random_rules(rng):
+    if rng.random() < 0.3:
+        return None
+    chosen = rng.choice(len(RULES), rng.integers(1, len(RULES) + 1), replace=False)
+    return RuleSet([RULES[i] for i in sorted(chosen)])
+
+
+def assert_same_result(result, expected):
+    assert result.counters == expected.counters
+    assert result.issues == expected.issues
+    assert result.ledger_matches == expected.ledger_matches
+    assert result.issue_ledger_codes == expected.issue_ledger_codes
+    assert result.rule_counts == expected.rule_counts
+    assert result.output_rows() == expected.output_rows()
+
+
+# Each run changes some criteria or rules; the cached run must equal a fresh one
+@pytest.mark.parametrize('seed', range(4))
+def test_cached_runs_match_fresh_runs(seed):
+    rng = np.random.default_rng(seed)
+    df = make_sheet(seed=seed)
+    validator = IncrementalValidator()
+
+    criteria, rules = random_criteria(rng), random_rules(rng)
+    for _ in range(12):
+        changed = random_criteria(rng)
+        for name in rng.choice(list(changed), rng.integers(1, 3), replace=False):
+            criteria[name] = changed[name]
+        if rng.random() < 0.4:
+            rules = random_rules(rng)
+
+        result = validator.validate(df, **criteria, chunk_rows=128, rules=rules)
+
+        assert_same_result(result, validate_activities(df, **criteria, chunk_rows=128, rules=rules))
+
+
+def test_repeated_run_reuses_the_cache():
+    df = make_sheet()
+    rules = RuleSet(RULES)
+    validator = IncrementalValidator()
+    criteria = {'start_date': date(2024, 9, 1), 'end_date': date(2025, 3, 31), 'min_cost': 50.0, 'max_cost': 400.0}
+
+    first = validator.validate(df, **criteria, rules=rules)
+    cached_groups = dict(validator._groups)
+    second = validator.validate(df, **criteria, rules=rules)
+
+    assert all(validator._groups[group] is cached_groups[group] for group in cached_groups)
+    assert_same_result(second, first)
+
+
+def test_changed_sheet_resets_the_cache():
+    validator = IncrementalValidator()
+    criteria = {'start_date': date(2024, 9, 1), 'end_date': date(2025, 3, 31)}
+    validator.validate(make_sheet(seed=1), **criteria)
+
+    df = make_sheet(seed=2)
+
+    assert_same_result(validator.validate(df, **criteria), validate_activities(df, **criteria))
+
+
+# New versions of the sheet are rebased onto the cache the way watch mode does it; the run that
+# follows must equal a fresh one, with the same or changed criteria and rules
+@pytest.mark.parametrize('seed', range(4))
+def test_rebased_runs_match_fresh_runs(seed):
+    rng = np.random.default_rng(seed)
+    raw = make_raw_sheet(seed=seed)
+    df = type_activities(raw)
+    criteria, rules = random_criteria(rng), RuleSet(RULES)
+    validator = IncrementalValidator()
+    validator.validate(df, **criteria, chunk_rows=64, rules=rules)
+
+    for version in range(4):
+        raw = edit_sheet(raw, rng)
+        new_df = type_activities(raw)
+        source_positions = match_rows(row_hashes(df), row_hashes(new_df))
+        assert (source_positions < 0).any() and (source_positions >= 0).any()
+        assert new_df['Start date'].isna().any() and new_df['End date'].isna().any()
+
+        validator.rebase(new_df, source_positions, rules)
+        assert set(RULE_GROUPS) <= set(validator._groups)
+        if version >= 2:
+            criteria, rules = random_criteria(rng), random_rules(rng)
+        result = validator.validate(new_df, **criteria, chunk_rows=64, rules=rules)
+
+        assert_same_result(result, validate_activities(new_df, **criteria, chunk_rows=64, rules=rules))
+        df = new_df
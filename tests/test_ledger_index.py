@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ledger_index import LedgerCodeIndex, format_ledger_code, ledger_code_text
+
+
+def make_codes(rows=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    prefixes = np.array(["4010", "4020", "GL-", "gl.", "5000(a)", "40"], dtype=object)
+    codes = pd.Series([f"{prefixes[i % len(prefixes)]}{rng.integers(0, 50)}" for i in range(rows)], dtype=object)
+    codes[rng.choice(rows, 40, replace=False)] = None
+    return codes
+
+
+def test_ledger_code_text_reads_numeric_codes_as_written():
+    values = pd.Series([4010.0, np.nan, 4020.5, "4010-B"], dtype=object)
+
+    text = ledger_code_text(values)
+
+    assert text[[0, 2, 3]].tolist() == ["4010", "4020.5", "4010-B"]
+    assert text.isna().tolist() == [False, True, False, False]
+    assert format_ledger_code(np.float64(5000)) == "5000"
+
+
+@pytest.mark.parametrize('query', ["4010", "gl", "GL.", "(a)", "0", "", "9999", "0(A)1"])
+def test_mask_matches_a_literal_substring_scan(query):
+    codes = make_codes()
+    index = LedgerCodeIndex(codes)
+
+    expected = codes.str.contains(query, case=False, regex=False, na=False).to_numpy()
+
+    assert index.mask(query).tolist() == expected.tolist()
+
+
+def test_rows_of_float_codes_from_a_column_with_blanks():
+    index = LedgerCodeIndex(pd.Series([4010.0, np.nan, 4020.0, 4010.0]))
+
+    assert index.codes == ["4010", "4020"]
+    assert index.rows("4010").tolist() == [0, 3]
+
+
+def test_prefix_lookup():
+    index = LedgerCodeIndex(["GL-2", "gl-1", "4010", "A-GL-3", "GL-2"])
+
+    assert [index.codes[code_id] for code_id in index.prefix_ids("gl")] == ["gl-1", "GL-2"]
+    assert [index.codes[code_id] for code_id in index.prefix_ids("gl", limit=1)] == ["gl-1"]
+    assert index.prefix_ids("x") == []
+
+
+def test_suggestions_put_codes_starting_with_the_input_first():
+    index = LedgerCodeIndex(["14010", "4010-B", "4010-A", "24010", "5000"])
+
+    assert index.suggestions(" 4010 ") == ["4010-A", "4010-B", "14010", "24010"]
+    assert index.suggestions("4010", limit=3) == ["4010-A", "4010-B", "14010"]
+    assert index.suggestions("") == ["14010", "24010", "4010-A", "4010-B", "5000"]
+
+
+def test_suggestions_fill_the_limit_past_prefix_matches():
+    codes = [f"4010-{i:02d}" for i in range(10)] + [f"9-4010-{i:02d}" for i in range(10)]
+    index = LedgerCodeIndex(codes)
+
+    suggestions = index.suggestions("4010", limit=15)
+
+    assert suggestions == codes[:10] + codes[10:15]
@@ -0,0 +1,61 @@
+from results_store import DIFF_NEW, DIFF_RESOLVED, DIFF_UNCHANGED, ResultsStore, diff_rows
+from validation_engine import ValidationResult
+
+CRITERIA = {'start_date': None, 'end_date': None, 'min_cost': 0, 'max_cost': float('inf'), 'ledger_code': ""}
+
+
+def result_with(issues):
+    return ValidationResult(issues=list(issues), counters={'total_activities': len(issues)})
+
+
+def test_diff_splits_new_resolved_and_unchanged(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.sqlite3"))
+    swim = ("Swim", "Invalid Cost", "Cost: 900.0, Expected between 50.0 and 400.0")
+    yoga = ("Yoga", "Invalid Start Date", "Start: 2024-08-15, starts before the expected start date of: 2024-09-01")
+    chess = ("Chess", "Unreadable End Date", "End: 'soon' is not a date")
+    first = store.save_run("export.xlsx", "Activities", CRITERIA, result_with([swim, yoga, swim]))
+    second = store.save_run("export.xlsx", "Activities", CRITERIA, result_with([chess, swim]))
+
+    diff = store.diff(second, store.previous_run(second))
+
+    assert store.previous_run(second) == first
+    assert diff[DIFF_NEW] == [chess]
+    # Two identical issues that drop to one count as one resolved issue
+    assert diff[DIFF_RESOLVED] == [yoga, swim]
+    assert diff[DIFF_UNCHANGED] == [swim]
+    assert diff_rows(diff)[-3:] == [("Diff", "New Issues", "1"), ("Diff", "Resolved Issues", "2"),
+                                    ("Diff", "Unchanged Issues", "1")]
+
+
+def test_runs_of_other_sheets_are_not_compared(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.sqlite3"))
+    store.save_run("export.xlsx", "Fall", CRITERIA, result_with([]))
+    run_id = store.save_run("export.xlsx", "Winter", CRITERIA, result_with([]))
+
+    assert store.previous_run(run_id) is None
+
+
+def test_only_the_latest_runs_are_kept(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.sqlite3"), keep_runs=3)
+    issue = ("Swim", "Invalid Cost", "Cost: 900.0, Expected between 50.0 and 400.0")
+    runs = [store.save_run("export.xlsx", "Activities", CRITERIA, result_with([issue] * 5)) for _ in range(5)]
+    other = store.save_run("other.xlsx", "Activities", CRITERIA, result_with([issue]))
+
+    assert [store.run_info(run_id) is not None for run_id in runs] == [False, False, True, True, True]
+    assert store.run_info(other)['issue_count'] == 1
+    assert store.previous_run(runs[2]) is None
+    # The issues of deleted runs go with them
+    assert store.issues(runs[0]) == []
+    assert len(store.issues(runs[4])) == 5
+
+
+def test_runs_saved_later_are_written_in_order(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.sqlite3"))
+    issue = ("Swim", "Invalid Cost", "Cost: 900.0, Expected between 50.0 and 400.0")
+
+    futures = [store.save_run_later("export.xlsx", "Activities", CRITERIA, result_with([issue])) for _ in range(3)]
+    run_ids = [future.result(timeout=30) for future in futures]
+
+    assert run_ids == sorted(run_ids)
+    assert store.previous_run(run_ids[2]) == run_ids[1]
+    assert store.issues(run_ids[0]) == [issue]
@@ -0,0 +1,265 @@
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from validation_engine import parse_criteria, type_activities, validate_activities
+
+
+# Stands in for the results Treeview: keeps the rows inserted into it
+class RecordingTree:
+    def __init__(self):
+        self.rows = []
+
+    def get_children(self):
+        return list(range(len(self.rows)))
+
+    def delete(self, *items):
+        self.rows = []
+
+    def insert(self, parent, index, values):
+        self.rows.append(values)
+
+
+# The body of validate_dates_and_cost before the vectorized engine, unchanged from the moment the
+# sheet is read (inputs are the text of the criteria fields). Returns the rows it put in the tree.
+def baseline_checker(df, start_date_input="", end_date_input="", min_cost_input="", max_cost_input="",
+                     ledger_code_input=""):
+    tree_output = RecordingTree()
+    df = df.copy()
+    try:
+        try:
+            min_cost = float(min_cost_input) if min_cost_input else 0
+            max_cost = float(max_cost_input) if max_cost_input else float('inf')
+
+            min_cost = round(min_cost, 3)
+            max_cost = round(max_cost, 3)
+        except ValueError:
+            tree_output.delete(*tree_output.get_children())
+            tree_output.insert("", "end", values=("Error", "Invalid Input", "Please enter valid numeric values for minimum and maximum costs."))
+            return tree_output.rows
+
+        # Changes user date inputs to 'date' data type in order to be compared to the sheet dates
+        start_date = datetime.strptime(start_date_input, "%m/%d/%y").date() if start_date_input else None
+        end_date = datetime.strptime(end_date_input, "%m/%d/%y").date() if end_date_input else None
+
+        # Initializes all variables counters
+        num_of_wrong_start_date = 0
+        num_of_correct_start_date = 0
+        num_of_wrong_end_date = 0
+        num_of_correct_end_date = 0
+        num_of_both_out_of_bounds = 0
+        num_of_invalid_cost = 0
+        num_of_valid_cost = 0
+        num_of_ledger_code_activities = 0
+        total_num_of_activities = len(df)
+
+        df['Start date'] = pd.to_datetime(df['Start date'], format='%m/%d/%y')
+        df['End date'] = pd.to_datetime(df['End date'], format='%m/%d/%y')
+
+        tree_output.delete(*tree_output.get_children())
+        # Checks to see if the user entered a ledger code to be searched for
+        if ledger_code_input:
+            ledger_code_input = ledger_code_input.strip()
+            df = df[df['Ledger code'].str.contains(ledger_code_input, na=False, case=False)]
+            num_of_ledger_code_activities = len(df)
+            if df.empty:
+                tree_output.insert("", "end", values=("No Match", "Ledger code", f"No entries found for {ledger_code_input}."))
+                return tree_output.rows
+        else:
+            num_of_ledger_code_activities = 0
+        # Loop to check every row in the excel sheet
+        for i, row in df.iterrows():
+            row_start_date = row['Start date'].date()
+            row_end_date = row['End date'].date()
+            row_cost = row['Cost']
+
+            # Checks start date and end date to see if its within the time frame
+            if start_date and end_date and row_start_date < start_date and row_end_date > end_date:
+                tree_output.insert("", "end", values=(
+                    df.loc[i, 'Activity'],
+                    "Both Dates Out of Bounds",
+                    f"Start: {row_start_date}, End: {row_end_date}"
+                ))
+                num_of_both_out_of_bounds += 1
+            else:
+                if start_date and row_start_date < start_date:
+                    tree_output.insert("", "end", values=(
+                        df.loc[i, 'Activity'],
+                        "Invalid Start Date",
+                        f"Start: {row_start_date}, starts before the expected start date of: {start_date}"
+                    ))
+                    num_of_wrong_start_date += 1
+                else:
+                    num_of_correct_start_date += 1
+
+                if end_date and row_end_date > end_date:
+                    tree_output.insert("", "end", values=(
+                        df.loc[i, 'Activity'],
+                        "Invalid End Date",
+                        f"End: {row_end_date}, ends after the expected end date of: {end_date}"
+                    ))
+                    num_of_wrong_end_date += 1
+                else:
+                    num_of_correct_end_date += 1
+            # checks all costs with in the sheet to make sure it is in range
+            if min_cost and max_cost and (row_cost < min_cost or row_cost > max_cost):
+                tree_output.insert("", "end", values=(
+                    df.loc[i, 'Activity'],
+                    "Invalid Cost",
+                    f"Cost: {row_cost}, Expected between {min_cost} and {max_cost}"
+                ))
+                num_of_invalid_cost += 1
+            else:
+                num_of_valid_cost += 1
+
+        # Itterates through the sheet for the ledger codes
+        if ledger_code_input:
+            for i, row in df.iterrows():
+                tree_output.insert("", "end", values=(
+                    row['Activity'],
+                    "Ledger Code Match",
+                    f"Ledgercode: {row['Ledger code']}"
+                ))
+
+            # Insert ledger code summary
+            tree_output.insert("", "end", values=(
+                "Summary",
+                "Ledger Code Matches",
+                f"{num_of_ledger_code_activities} activities match Ledger Code: {ledger_code_input}"
+            ))
+
+        # Existing summaries for start dates, end dates, and costs (print the tree)
+        tree_output.insert("", "end", values=(
+            "Summary", "Valid Start Dates", f"{max(0, num_of_correct_start_date)} / {total_num_of_activities}"
+        ))
+        tree_output.insert("", "end", values=(
+            "Summary", "Invalid Start Dates", f"{max(0, num_of_wrong_start_date)} / {total_num_of_activities}"
+        ))
+        tree_output.insert("", "end", values=(
+            "Summary", "Valid End Dates", f"{max(0, num_of_correct_end_date)} / {total_num_of_activities}"
+        ))
+        tree_output.insert("", "end", values=(
+            "Summary", "Invalid End Dates", f"{max(0, num_of_wrong_end_date)} / {total_num_of_activities}"
+        ))
+        tree_output.insert("", "end", values=(
+            "Summary", "Valid Costs", f"{max(0, num_of_valid_cost)}"
+        ))
+        tree_output.insert("", "end", values=(
+            "Summary", "Invalid Costs", f"{max(0, num_of_invalid_cost)}"
+        ))
+
+    except Exception as e:
+        tree_output.delete(*tree_output.get_children())
+        tree_output.insert("", "end", values=("Error", "Exception", str(e)))
+    return tree_output.rows
+
+
+# The rows the checker shows now for the same inputs
+def engine_checker(df, *criteria_inputs, chunk_rows=None):
+    options = {'chunk_rows': chunk_rows} if chunk_rows else {}
+    return validate_activities(df, **parse_criteria(*criteria_inputs), **options).output_rows()
+
+
+# An export as read_excel returns it, with the cells the original loop could read: MM/DD/YY text
+# dates, float costs (some blank), ledger codes in mixed case (some blank) and a few blank activities
+def make_export(rows=400, seed=7):
+    rng = np.random.default_rng(seed)
+    season = pd.Timestamp(2024, 8, 15)
+    starts = season + pd.to_timedelta(rng.integers(0, 300, rows), unit='D')
+    ends = starts + pd.to_timedelta(rng.integers(0, 90, rows), unit='D')
+    costs = np.round(rng.uniform(0, 500, rows), 2)
+    costs[rng.choice(rows, 10, replace=False)] = np.nan
+    df = pd.DataFrame({
+        'Activity': np.array([f"Activity {i % 37}" for i in range(rows)], dtype=object),
+        'Start date': starts.strftime('%m/%d/%y').to_numpy(dtype=object),
+        'End date': ends.strftime('%m/%d/%y').to_numpy(dtype=object),
+        'Cost': costs,
+        'Ledger code': np.array(["4010-A", "4010-b", "4020-C", "5000-a"], dtype=object)[rng.integers(0, 4, rows)],
+        'Location': "Pool",
+    })
+    df.loc[rng.choice(rows, 8, replace=False), 'Ledger code'] = None
+    df.loc[rng.choice(rows, 6, replace=False), 'Activity'] = None
+    return df
+
+
+# Criteria as typed in the fields: start date, end date, min cost, max cost, ledger code
+CASES = {
+    'no criteria': ("", "", "", "", ""),
+    'dates': ("09/01/24", "03/31/25", "", "", ""),
+    'cost': ("", "", "50", "400", ""),
+    'all criteria': ("09/01/24", "03/31/25", "50", "400.0004", ""),
+    'ledger code': ("", "", "", "", "4010"),
+    'ledger code, other case and spaces': ("", "", "", "", "  5000-A "),
+    'ledger code with criteria': ("09/01/24", "03/31/25", "50", "400", "4020"),
+    'ledger code without match': ("", "", "", "", "9999"),
+}
+
+
+# Blank activities are None in the raw frame and NaN in the typed (categorical) one
+def _rows(rows):
+    return [tuple(None if isinstance(value, float) and np.isnan(value) else value for value in row) for row in rows]
+
+
+@pytest.mark.parametrize('criteria', list(CASES.values()), ids=list(CASES))
+def test_engine_matches_baseline_checker(criteria):
+    df = make_export()
+
+    assert engine_checker(df, *criteria) == baseline_checker(df, *criteria)
+
+
+@pytest.mark.parametrize('criteria', list(CASES.values()), ids=list(CASES))
+def test_typed_sheet_matches_baseline_checker(criteria):
+    df = make_export()
+
+    assert _rows(engine_checker(type_activities(df), *criteria)) == _rows(baseline_checker(df, *criteria))
+
+
+@pytest.mark.parametrize('chunk_rows', [1, 7, 10_000])
+def test_chunk_size_does_not_change_the_output(chunk_rows):
+    df = make_export()
+    criteria = CASES['ledger code with criteria']
+
+    assert engine_checker(df, *criteria, chunk_rows=chunk_rows) == baseline_checker(df, *criteria)
+
+
+# Cells the original loop could not read stopped it with an exception; they are reported now
+
+def _unreadable_export():
+    return pd.DataFrame({
+        'Activity': ["Swim", "Yoga", "Chess", "Pottery", "Tennis"],
+        'Start date': ["08/15/24", "TBD", None, "09/10/24", "13/45/24"],
+        'End date': ["09/15/24", "10/01/24", "10/01/24", "", "12/31/25"],
+        'Cost': [100.0, "N/A", None, "free", 900.0],
+        'Ledger code': ["4010"] * 5,
+    })
+
+
+def test_baseline_checker_stops_on_unreadable_cells():
+    rows = baseline_checker(_unreadable_export(), "09/01/24", "06/30/25", "50", "400")
+
+    assert [row[:2] for row in rows] == [("Error", "Exception")]
+
+
+@pytest.mark.parametrize('typed', [False, True], ids=['raw', 'typed'])
+def test_unreadable_cells_are_reported(typed):
+    df = _unreadable_export()
+    df = type_activities(df) if typed else df
+
+    result = validate_activities(df, **parse_criteria("09/01/24", "06/30/25", "50", "400"))
+
+    assert result.issues == [
+        ("Swim", "Invalid Start Date", f"Start: 2024-08-15, starts before the expected start date of: {date(2024, 9, 1)}"),
+        ("Yoga", "Invalid Cost", "Cost: 'N/A' is not a number"),
+        ("Yoga", "Unreadable Start Date", "Start: 'TBD' is not a date"),
+        ("Pottery", "Invalid Cost", "Cost: 'free' is not a number"),
+        ("Tennis", "Invalid End Date", "End: 2025-12-31, ends after the expected end date of: 2025-06-30"),
+        ("Tennis", "Invalid Cost", "Cost: 900.0, Expected between 50.0 and 400.0"),
+        ("Tennis", "Unreadable Start Date", "Start: '13/45/24' is not a date"),
+    ]
+    assert result.counters == {
+        'wrong_start_date': 1, 'correct_start_date': 2, 'wrong_end_date': 1, 'correct_end_date': 4,
+        'both_out_of_bounds': 0, 'invalid_cost': 3, 'valid_cost': 2, 'ledger_code_activities': 0,
+        'total_activities': 5, 'unreadable_start_date': 2, 'unreadable_end_date': 0, 'unreadable_cost': 2,
+    }
@@ -0,0 +1,85 @@
+import io
+import json
+import time
+
+import pytest
+
+import workbook_cache as workbook_cache_module
+from conftest import write_workbook
+from validation_service import ValidationService
+from workbook_cache import workbook_cache
+from workbook_sidecar import sidecars_available
+
+ROWS = [
+    ("Swim", "09/02/24", "10/02/24", 900, "4010"),
+    ("Yoga", "08/15/24", "10/03/24", 100, "4020"),
+    ("Chess", "09/04/24", "10/04/24", 100, "4010"),
+]
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(workbook_cache, 'sidecar_dir', str(tmp_path / "sidecars"))
+    workbook_cache.clear()
+    service = ValidationService(workers=1, spool_dir=str(tmp_path / "uploads"))
+    yield service
+    service.shutdown()
+    workbook_cache.clear()
+
+
+# Counts the workbook parses done through the shared cache
+@pytest.fixture
+def excel_reads(monkeypatch):
+    reads = []
+    read_excel = workbook_cache_module.pd.read_excel
+
+    def counting_read_excel(*args, **kwargs):
+        reads.append(args[0])
+        return read_excel(*args, **kwargs)
+
+    monkeypatch.setattr(workbook_cache_module.pd, 'read_excel', counting_read_excel)
+    return reads
+
+
+# Uploads the workbook like the HTTP handler does and waits for its job
+def upload(service, data, **fields):
+    content_hash, path = service.spool_upload(io.BytesIO(data), len(data), "fall.xlsx")
+    job = service.submit(content_hash, path, "Activities", fields)
+    deadline = time.time() + 30
+    while job.status in ("queued", "running"):
+        assert time.time() < deadline
+        time.sleep(0.01)
+    assert job.status == "done", job.error
+    return json.loads(job.payload)
+
+
+def test_reupload_with_new_criteria_reuses_the_parse(tmp_path, service, excel_reads):
+    data = write_workbook(tmp_path / "fall.xlsx", ROWS).read_bytes()
+
+    first = upload(service, data, min_cost="50", max_cost="400")
+    second = upload(service, data, start_date="09/01/24", end_date="06/30/25")
+
+    assert len(excel_reads) == 1
+    assert list((tmp_path / "uploads").iterdir()) == []
+    assert [row[:2] for row in first['sheets'][0]['result']['issues']] == [["Swim", "Invalid Cost"]]
+    assert [row[:2] for row in second['sheets'][0]['result']['issues']] == [["Yoga", "Invalid Start Date"]]
+
+
+@pytest.mark.skipif(not sidecars_available(), reason="pyarrow is not installed")
+def test_reupload_after_restart_reads_the_sidecar(tmp_path, service, excel_reads):
+    data = write_workbook(tmp_path / "fall.xlsx", ROWS).read_bytes()
+
+    upload(service, data, min_cost="50", max_cost="400")
+    workbook_cache.clear()
+    second = upload(service, data, start_date="09/01/24", end_date="06/30/25")
+
+    assert len(excel_reads) == 1
+    assert [row[:2] for row in second['sheets'][0]['result']['issues']] == [["Yoga", "Invalid Start Date"]]
+
+
+def test_changed_upload_is_parsed_again(tmp_path, service, excel_reads):
+    upload(service, write_workbook(tmp_path / "fall.xlsx", ROWS).read_bytes())
+    changed = upload(service, write_workbook(tmp_path / "fall.xlsx", ROWS[:1]).read_bytes())
+
+    assert len(excel_reads) == 2
+    assert changed['sheets'][0]['result']['counters']['total_activities'] == 1
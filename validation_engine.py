@@ -0,0 +1,653 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from date_parsing import parse_date_column, parse_date_text
+from diagnostics import NullDiagnostics
+from ledger_index import LedgerCodeIndex
+
+# Columns every Amilia export has to provide before it can be validated
+REQUIRED_COLUMNS = ['Start date', 'End date', 'Cost', 'Activity', 'Ledger code']
+
+# Issue labels in the order they are reported for a single row
+ISSUE_BOTH_DATES = "Both Dates Out of Bounds"
+ISSUE_START_DATE = "Invalid Start Date"
+ISSUE_END_DATE = "Invalid End Date"
+ISSUE_COST = "Invalid Cost"
+ISSUE_UNREADABLE_START = "Unreadable Start Date"
+ISSUE_UNREADABLE_END = "Unreadable End Date"
+RULE_ORDER = [
+    'both_out_of_bounds', 'invalid_start_date', 'invalid_end_date', 'invalid_cost', 'unreadable_cost',
+    'unreadable_start_date', 'unreadable_end_date',
+]
+
+# Original text of date cells that could not be read, kept next to the parsed dates for the report
+UNREADABLE_COLUMNS = {'Start date': 'Start date (unreadable)', 'End date': 'End date (unreadable)'}
+# Same for cost cells that are not numbers ("N/A", "free", ...)
+UNREADABLE_COST_COLUMN = 'Cost (unreadable)'
+UNREADABLE_TEXT_COLUMNS = list(UNREADABLE_COLUMNS.values()) + [UNREADABLE_COST_COLUMN]
+
+# Rows checked between progress reports and cancellation checks
+CHUNK_ROWS = 20000
+
+# Every counter a validation result carries
+COUNTER_KEYS = [
+    'wrong_start_date', 'correct_start_date', 'wrong_end_date', 'correct_end_date', 'both_out_of_bounds',
+    'invalid_cost', 'valid_cost', 'ledger_code_activities', 'total_activities',
+    'unreadable_start_date', 'unreadable_end_date', 'unreadable_cost',
+]
+
+
+# Holds everything a validation run produces so any front end (Tk, CLI, ...) can display it
+@dataclass
+class ValidationResult:
+    issues: list = field(default_factory=list)
+    ledger_matches: list = field(default_factory=list)
+    counters: dict = field(default_factory=dict)
+    ledger_code: str = None
+    issue_ledger_codes: list = field(default_factory=list)  # ledger code of the row behind each issue
+    rule_counts: dict = field(default_factory=dict)  # rules file rule -> {'label', 'passed', 'failed'}
+
+    # Rows in the same order the checker has always shown them: issues, ledger matches, summaries
+    def output_rows(self):
+        if self.ledger_code is not None and self.counters.get('ledger_code_activities', 0) == 0:
+            return [("No Match", "Ledger code", f"No entries found for {self.ledger_code}.")]
+
+        rows = list(self.issues) + list(self.ledger_matches)
+        if self.ledger_code is not None:
+            rows.append((
+                "Summary",
+                "Ledger Code Matches",
+                f"{self.counters['ledger_code_activities']} activities match Ledger Code: {self.ledger_code}"
+            ))
+        rows.extend(summary_rows(self.counters))
+        rows.extend(rule_summary_rows(self.rule_counts))
+        return rows
+
+    # Everything output_rows shows after the issue rows (for front ends that streamed the issues)
+    def trailing_rows(self):
+        return self.output_rows()[len(self.issues):]
+
+
+# Adds up results of separately validated pieces (chunks of a sheet, or several sheets) into one
+def merge_results(results, ledger_code=None):
+    merged = ValidationResult(ledger_code=ledger_code or None)
+    for result in results:
+        merged.issues.extend(result.issues)
+        merged.ledger_matches.extend(result.ledger_matches)
+        merged.issue_ledger_codes.extend(result.issue_ledger_codes)
+        for name, counts in result.rule_counts.items():
+            total = merged.rule_counts.setdefault(name, {'label': counts['label'], 'passed': 0, 'failed': 0})
+            total['passed'] += counts['passed']
+            total['failed'] += counts['failed']
+        for key, value in result.counters.items():
+            merged.counters[key] = merged.counters.get(key, 0) + value
+
+    # Pieces without a ledger code match only carry the totals
+    for key in COUNTER_KEYS:
+        merged.counters.setdefault(key, 0)
+    return merged
+
+
+# Raised when a sheet lacks some of the required columns
+class MissingColumnsError(ValueError):
+    def __init__(self, missing_columns):
+        super().__init__(f"Required columns: {', '.join(missing_columns)}")
+        self.missing_columns = missing_columns
+
+
+# Raised inside validate_activities when the run was cancelled
+class ValidationCancelled(Exception):
+    pass
+
+
+# Raised when the criteria entered by the user can't be used; row is the message the checker shows
+class CriteriaError(ValueError):
+    def __init__(self, row):
+        super().__init__(row[2])
+        self.row = row
+
+
+# Turns the raw criteria text (GUI fields or command line arguments) into validation arguments
+def parse_criteria(start_date_input="", end_date_input="", min_cost_input="", max_cost_input="", ledger_code_input=""):
+    try:
+        min_cost = float(min_cost_input) if min_cost_input else 0
+        max_cost = float(max_cost_input) if max_cost_input else float('inf')
+
+        min_cost = round(min_cost, 3)
+        max_cost = round(max_cost, 3)
+    except ValueError:
+        raise CriteriaError(("Error", "Invalid Input", "Please enter valid numeric values for minimum and maximum costs."))
+
+    # If one date is given then both have to be (can be the same date if looking for a specific date)
+    if (start_date_input and not end_date_input) or (end_date_input and not start_date_input):
+        raise CriteriaError(("Date Validation", "Error", "Both Start Date and End Date must be filled."))
+
+    # If one cost is given then both have to be (can be the same value)
+    if (min_cost_input and not max_cost_input) or (max_cost_input and not min_cost_input):
+        raise CriteriaError(("Cost Validation", "Error", "Both Minimum Cost and Maximum Cost must be filled."))
+
+    # Changes the dates to 'date' data type in order to be compared to the sheet dates (same formats as the sheet)
+    start_date = _criteria_date(start_date_input, "Start Date")
+    end_date = _criteria_date(end_date_input, "End Date")
+
+    return {
+        'start_date': start_date,
+        'end_date': end_date,
+        'min_cost': min_cost,
+        'max_cost': max_cost,
+        'ledger_code': ledger_code_input,
+    }
+
+
+def _criteria_date(text, name):
+    if not text:
+        return None
+    parsed = parse_date_text(text)
+    if parsed is None:
+        raise CriteriaError(("Date Validation", "Error", f"{name} '{text}' is not a date (expected MM/DD/YY)."))
+    return parsed
+
+
+# Returns the required columns that the sheet does not have (case-insensitive)
+def find_missing_columns(df):
+    present = {str(col).lower() for col in df.columns}
+    return [col for col in REQUIRED_COLUMNS if col.lower() not in present]
+
+
+# Whether a sheet column is one of the required ones, so read_excel(usecols=...) can skip the rest
+def is_required_column(column):
+    return str(column).lower() in {col.lower() for col in REQUIRED_COLUMNS}
+
+
+# Converts both date columns to datetimes and the cost column to numbers so they can be compared
+# as whole columns. Columns that already have their type (typed sheets) are left alone, so no copy
+# of the frame is made for them. Cells that are not dates (or not numbers) become NaT (NaN) and
+# their text is kept in an UNREADABLE_COLUMNS (UNREADABLE_COST_COLUMN) column, so they are
+# reported as issues instead of stopping the run.
+def prepare_activities(df):
+    converted = {}
+    for column, unreadable_column in UNREADABLE_COLUMNS.items():
+        if pd.api.types.is_datetime64_any_dtype(df[column]):
+            continue
+        converted[column], unreadable = parse_date_column(df[column])
+        if unreadable.any():
+            converted[unreadable_column] = _original_text(df[column], unreadable)
+    if not pd.api.types.is_numeric_dtype(df['Cost']):
+        converted['Cost'], unreadable = parse_cost_column(df['Cost'])
+        if unreadable.any():
+            converted[UNREADABLE_COST_COLUMN] = _original_text(df['Cost'], unreadable)
+    return df.assign(**converted) if converted else df
+
+
+# Converts a column of cost cells to numbers. Returns the costs and a boolean array marking the
+# cells that hold something that is not a number; blank cells are NaN without being marked.
+def parse_cost_column(column):
+    costs = pd.to_numeric(column, errors='coerce')
+    failed = costs.isna().to_numpy(dtype=bool) & column.notna().to_numpy(dtype=bool)
+    unreadable = np.zeros(len(column), dtype=bool)
+    if failed.any():
+        unreadable[failed] = column[failed].astype(str).str.strip().to_numpy(dtype=object) != ""
+    return costs, unreadable
+
+
+def _original_text(column, unreadable):
+    original = pd.Series(None, index=column.index, dtype=object)
+    original[unreadable] = column[unreadable].astype(str)
+    return original
+
+
+# Keeps only the required columns with their final types: datetime dates, numeric cost and
+# categorical text (each distinct activity and ledger code is stored once, rows hold small
+# integer codes). Cost stays 64-bit so the values shown in the issues are exactly the sheet's.
+# Unreadable dates and costs are kept as text next to them (see prepare_activities).
+# Raises KeyError if the sheet is missing a column.
+def type_activities(df):
+    df = prepare_activities(df[REQUIRED_COLUMNS])
+    return df.assign(**{
+        'Activity': df['Activity'].astype('category'),
+        'Ledger code': df['Ledger code'].astype('category'),
+    }, **{
+        column: df[column].astype('category') for column in UNREADABLE_TEXT_COLUMNS if column in df
+    })
+
+
+# Date rules: a row out of bounds on both sides is only reported once
+def compute_date_masks(df, start_date=None, end_date=None):
+    start_days = df['Start date'].dt.normalize()
+    end_days = df['End date'].dt.normalize()
+    no_rows = pd.Series(False, index=df.index)
+
+    if start_date and end_date:
+        both = (start_days < pd.Timestamp(start_date)) & (end_days > pd.Timestamp(end_date))
+    else:
+        both = no_rows
+
+    invalid_start = (start_days < pd.Timestamp(start_date)) & ~both if start_date else no_rows
+    invalid_end = (end_days > pd.Timestamp(end_date)) & ~both if end_date else no_rows
+
+    return {
+        'both_out_of_bounds': both.to_numpy(dtype=bool),
+        'invalid_start_date': invalid_start.to_numpy(dtype=bool),
+        'invalid_end_date': invalid_end.to_numpy(dtype=bool),
+    }
+
+
+# Cost rule: an empty (or zero) cost bound turns the check off, same as before
+def compute_cost_masks(df, min_cost=0, max_cost=float('inf')):
+    if min_cost and max_cost:
+        invalid_cost = ((df['Cost'] < min_cost) | (df['Cost'] > max_cost)).fillna(False)
+    else:
+        invalid_cost = pd.Series(False, index=df.index)
+    return {'invalid_cost': invalid_cost.to_numpy(dtype=bool)}
+
+
+# Date and cost cells that could not be read, whatever the criteria
+def compute_unreadable_masks(df):
+    return {
+        'unreadable_cost': _unreadable_mask(df, UNREADABLE_COST_COLUMN),
+        'unreadable_start_date': _unreadable_mask(df, UNREADABLE_COLUMNS['Start date']),
+        'unreadable_end_date': _unreadable_mask(df, UNREADABLE_COLUMNS['End date']),
+    }
+
+
+def _unreadable_mask(df, unreadable_column):
+    if unreadable_column not in df:
+        return np.zeros(len(df), dtype=bool)
+    return df[unreadable_column].notna().to_numpy(dtype=bool)
+
+
+# Builds one boolean mask per rule over the whole frame instead of checking row by row
+def compute_rule_masks(df, start_date=None, end_date=None, min_cost=0, max_cost=float('inf')):
+    return {
+        **compute_date_masks(df, start_date, end_date),
+        **compute_cost_masks(df, min_cost, max_cost),
+        **compute_unreadable_masks(df),
+    }
+
+
+# Groups of rules with the criteria they read, so a group is only re-evaluated when those change
+RULE_GROUPS = {
+    'dates': (('start_date', 'end_date'), compute_date_masks),
+    'cost': (('min_cost', 'max_cost'), compute_cost_masks),
+    'unreadable': ((), compute_unreadable_masks),
+}
+
+
+# Turns the masks into the summary counters shown at the bottom of the output
+def count_rule_masks(masks, num_of_rows):
+    num_of_both_out_of_bounds = int(masks['both_out_of_bounds'].sum())
+    num_of_wrong_start_date = int(masks['invalid_start_date'].sum())
+    num_of_wrong_end_date = int(masks['invalid_end_date'].sum())
+    num_of_unreadable_cost = int(masks['unreadable_cost'].sum())
+    # Costs that are not numbers are invalid whatever the bounds
+    num_of_invalid_cost = int(masks['invalid_cost'].sum()) + num_of_unreadable_cost
+    num_of_unreadable_start_date = int(masks['unreadable_start_date'].sum())
+    num_of_unreadable_end_date = int(masks['unreadable_end_date'].sum())
+
+    return {
+        'wrong_start_date': num_of_wrong_start_date,
+        'correct_start_date':
+            num_of_rows - num_of_both_out_of_bounds - num_of_wrong_start_date - num_of_unreadable_start_date,
+        'wrong_end_date': num_of_wrong_end_date,
+        'correct_end_date': num_of_rows - num_of_both_out_of_bounds - num_of_wrong_end_date - num_of_unreadable_end_date,
+        'both_out_of_bounds': num_of_both_out_of_bounds,
+        'invalid_cost': num_of_invalid_cost,
+        'valid_cost': num_of_rows - num_of_invalid_cost,
+        'unreadable_start_date': num_of_unreadable_start_date,
+        'unreadable_end_date': num_of_unreadable_end_date,
+        'unreadable_cost': num_of_unreadable_cost,
+    }
+
+
+# Functions that format the issue row of each rule for a row position of the frame
+def issue_formatters(df, start_date=None, end_date=None, min_cost=0, max_cost=float('inf')):
+    activities = df['Activity'].to_numpy(dtype=object)
+    start_days = df['Start date'].dt.date.to_numpy(dtype=object)
+    end_days = df['End date'].dt.date.to_numpy(dtype=object)
+    costs = df['Cost'].to_numpy(dtype=object)
+    original = {
+        column: df[unreadable_column].to_numpy(dtype=object) if unreadable_column in df else None
+        for column, unreadable_column in {**UNREADABLE_COLUMNS, 'Cost': UNREADABLE_COST_COLUMN}.items()
+    }
+
+    return {
+        'both_out_of_bounds': lambda i: (activities[i], ISSUE_BOTH_DATES, f"Start: {start_days[i]}, End: {end_days[i]}"),
+        'invalid_start_date': lambda i: (
+            activities[i], ISSUE_START_DATE,
+            f"Start: {start_days[i]}, starts before the expected start date of: {start_date}"
+        ),
+        'invalid_end_date': lambda i: (
+            activities[i], ISSUE_END_DATE,
+            f"End: {end_days[i]}, ends after the expected end date of: {end_date}"
+        ),
+        'invalid_cost': lambda i: (
+            activities[i], ISSUE_COST,
+            f"Cost: {costs[i]}, Expected between {min_cost} and {max_cost}"
+        ),
+        'unreadable_cost': lambda i: (activities[i], ISSUE_COST, f"Cost: '{original['Cost'][i]}' is not a number"),
+        'unreadable_start_date': lambda i: (
+            activities[i], ISSUE_UNREADABLE_START, f"Start: '{original['Start date'][i]}' is not a date"
+        ),
+        'unreadable_end_date': lambda i: (
+            activities[i], ISSUE_UNREADABLE_END, f"End: '{original['End date'][i]}' is not a date"
+        ),
+    }
+
+
+# Puts per-rule issue rows in reporting order: by row first and rule second, so each row's
+# issues stay together like the old loop. rule_rows maps a rule to (row positions, rows).
+# With with_positions the row position of every issue is returned too. order lists the rules,
+# built-in ones first and then those of the rules file.
+def merge_issue_rows(rule_rows, with_positions=False, order=RULE_ORDER):
+    positions = [rule_rows[name][0] for name in order]
+    rows = [rule_rows[name][1] for name in order]
+    rule_ids = np.concatenate([np.full(len(pos), rule_id) for rule_id, pos in enumerate(positions)])
+    offsets = np.concatenate([np.arange(len(pos)) for pos in positions])
+    all_positions = np.concatenate(positions).astype(np.int64)
+
+    reporting_order = np.lexsort((rule_ids, all_positions))
+    merged = [rows[rule_ids[k]][offsets[k]] for k in reporting_order]
+    if with_positions:
+        return merged, all_positions[reporting_order]
+    return merged
+
+
+# Formats the issue rows for the flagged positions only, keeping the row-by-row reporting order
+def build_issue_rows(df, masks, start_date=None, end_date=None, min_cost=0, max_cost=float('inf')):
+    formatters = issue_formatters(df, start_date, end_date, min_cost, max_cost)
+    rule_rows = {}
+    for name in RULE_ORDER:
+        positions = np.flatnonzero(masks[name])
+        rule_rows[name] = (positions, [formatters[name](i) for i in positions])
+    return merge_issue_rows(rule_rows)
+
+
+# Lists every activity that matched the ledger code filter
+def build_ledger_rows(df):
+    return [
+        (activity, "Ledger Code Match", f"Ledgercode: {code}")
+        for activity, code in zip(df['Activity'].tolist(), df['Ledger code'].tolist())
+    ]
+
+
+# Summary rows for start dates, end dates and costs
+def summary_rows(counters):
+    total = counters['total_activities']
+    return [
+        ("Summary", "Valid Start Dates", f"{max(0, counters['correct_start_date'])} / {total}"),
+        ("Summary", "Invalid Start Dates", f"{max(0, counters['wrong_start_date'])} / {total}"),
+        ("Summary", "Valid End Dates", f"{max(0, counters['correct_end_date'])} / {total}"),
+        ("Summary", "Invalid End Dates", f"{max(0, counters['wrong_end_date'])} / {total}"),
+        ("Summary", "Valid Costs", f"{max(0, counters['valid_cost'])}"),
+        ("Summary", "Invalid Costs", f"{max(0, counters['invalid_cost'])}"),
+    ] + [
+        # Only shown for sheets that have date cells which could not be read
+        ("Summary", label, f"{counters.get(key, 0)} / {total}")
+        for key, label in (
+            ('unreadable_start_date', "Unreadable Start Dates"),
+            ('unreadable_end_date', "Unreadable End Dates"),
+        )
+        if counters.get(key, 0)
+    ]
+
+
+# Pass/fail summary of every rule from the rules file
+def rule_summary_rows(rule_counts):
+    return [
+        ("Summary", counts['label'], f"Passed: {counts['passed']}, Failed: {counts['failed']}")
+        for counts in rule_counts.values()
+    ]
+
+
+# Keeps what the last run worked out so the next run only redoes what its criteria changed:
+# the typed (prepared) frame, every rule group's masks and formatted issue rows, and the ledger
+# filter. Re-validating with one changed threshold re-evaluates only the rules reading it, and
+# the summary counters come straight from the cached masks. rebase carries the cache over to a new
+# version of the sheet, so that only its changed rows are checked again.
+class IncrementalValidator:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._source = None      # the frame the cache was built from
+        self._chunk_rows = None
+        self._chunks = []        # prepared frame, one piece per chunk (None until a chunk is needed)
+        self._groups = {}        # group -> (criteria, {rule: mask}, {rule: (positions, rows)})
+        self._ledger_index = None  # ledger codes of the source, built the first time a code is asked for
+        self._ledger = None      # (ledger code, mask, rows)
+
+    # Moves the cache onto df, a new version of the last validated sheet. source_positions gives, for
+    # every row of df, the row of the previous version with the same content, or -1 for rows that
+    # are new or changed. Only those rows are parsed and checked; the issues of the others are
+    # carried over. The next validate with the same criteria then reuses everything.
+    def rebase(self, df, source_positions, rules=None):
+        builtin_groups = [group for group in RULE_GROUPS if group in self._groups]
+        if self._source is None or len(builtin_groups) != len(RULE_GROUPS):
+            self.reset()
+            return
+        source_positions = np.asarray(source_positions, dtype=np.int64)
+        kept = np.flatnonzero(source_positions >= 0)
+        sources = source_positions[kept]
+        changed = np.flatnonzero(source_positions < 0)
+        prepared = prepare_activities(df.iloc[changed])
+
+        criteria = {}
+        for group in builtin_groups:
+            criteria.update(zip(RULE_GROUPS[group][0], self._groups[group][0]))
+        formatters = issue_formatters(prepared, **criteria)
+
+        groups = {}
+        for group, (inputs, masks, rows) in self._groups.items():
+            if group == 'custom':
+                # Rules that changed since the last run are evaluated from scratch by validate
+                if not rules or inputs != (rules.fingerprint,):
+                    continue
+                changed_masks = rules.compute_masks(prepared)
+                group_formatters = rules.issue_formatters(prepared)
+            else:
+                changed_masks = RULE_GROUPS[group][1](prepared, *inputs)
+                group_formatters = formatters
+
+            new_masks, new_rows = {}, {}
+            for name, mask in masks.items():
+                new_mask = np.zeros(len(df), dtype=bool)
+                new_mask[kept] = mask[sources]
+                new_mask[changed] = changed_masks[name]
+                new_masks[name] = new_mask
+
+                old_positions, old_rows = rows[name]
+                carried_positions, carried = _carry_rows(old_positions, kept, sources)
+                offsets = np.flatnonzero(changed_masks[name])
+                positions = np.concatenate([carried_positions, changed[offsets]])
+                row_list = [old_rows[i] for i in carried] + [group_formatters[name](i) for i in offsets]
+                order = np.argsort(positions, kind='stable')
+                new_rows[name] = (positions[order], [row_list[i] for i in order])
+            groups[group] = (inputs, new_masks, new_rows)
+
+        self._source = df
+        self._chunks = []
+        self._groups = groups
+        self._ledger_index = None
+        self._ledger = None
+
+    # Validates a sheet: dates and costs against the user criteria, plus the optional ledger filter.
+    # Rows are checked a chunk at a time with whole-column operations; after each chunk on_chunk
+    # receives (rows checked, total rows, new issue rows) and a set cancel_event stops the run.
+    # diagnostics (a RunDiagnostics) collects the time and memory spent in each stage. rules (a
+    # custom_rules.RuleSet) adds the rules of a rules file, evaluated in the same pass.
+    def validate(self, df, start_date=None, end_date=None, min_cost=0, max_cost=float('inf'), ledger_code=None,
+                 chunk_rows=CHUNK_ROWS, on_chunk=None, cancel_event=None, diagnostics=None, rules=None):
+        diagnostics = diagnostics or NullDiagnostics()
+        if df is not self._source or chunk_rows != self._chunk_rows:
+            self.reset()
+
+        criteria = {'start_date': start_date, 'end_date': end_date, 'min_cost': min_cost, 'max_cost': max_cost}
+        total_num_of_activities = len(df)
+
+        # Rules from the rules file are one more group, re-evaluated whenever the file's rules change
+        groups = dict(RULE_GROUPS)
+        order = list(RULE_ORDER)
+        if rules:
+            groups['custom'] = (('rules',), lambda chunk, _: rules.compute_masks(chunk))
+            order += rules.rule_names
+        group_inputs = {**criteria, 'rules': rules.fingerprint if rules else None}
+
+        # Extra spaces are dropped so the code can be copied and pasted straight from the sheet
+        filter_by_ledger_code = bool(ledger_code)
+        ledger_code = ledger_code.strip() if filter_by_ledger_code else None
+
+        # Groups whose criteria changed since the last run are evaluated again, the rest are reused
+        stale_groups = [
+            group for group, (inputs, _) in groups.items()
+            if group not in self._groups
+            or self._groups[group][0] != tuple(group_inputs[name] for name in inputs)
+        ]
+        new_masks = {group: {} for group in stale_groups}
+        new_rows = {group: {} for group in stale_groups}
+        # A changed ledger code only needs new row positions, which come straight from the index
+        ledger_stale = filter_by_ledger_code and (self._ledger is None or self._ledger[0] != ledger_code)
+        if ledger_stale:
+            with diagnostics.stage("ledger filter"):
+                if self._ledger_index is None:
+                    self._ledger_index = LedgerCodeIndex(df['Ledger code'])
+                ledger_mask = self._ledger_index.mask(ledger_code)
+            ledger_rows = []
+        elif filter_by_ledger_code:
+            ledger_mask = self._ledger[1]
+
+        chunks = list(self._chunks)
+        issues = []
+        issue_ledger_codes = []
+        ledger_codes = df['Ledger code'] if total_num_of_activities else None
+        for chunk_index, chunk_start in enumerate(range(0, total_num_of_activities, chunk_rows)):
+            if cancel_event is not None and cancel_event.is_set():
+                raise ValidationCancelled()
+            chunk_end = min(chunk_start + chunk_rows, total_num_of_activities)
+
+            # A chunk is only parsed when a rule group has to be evaluated on it
+            if chunk_index == len(chunks):
+                chunks.append(None)
+            chunk = chunks[chunk_index]
+            if chunk is None and new_masks:
+                with diagnostics.stage("parse"):
+                    chunk = prepare_activities(df.iloc[chunk_start:chunk_end])
+                chunks[chunk_index] = chunk
+
+            rule_rows = {}
+            for group, (inputs, compute_masks) in groups.items():
+                if group in new_masks:
+                    with diagnostics.stage(f"rule: {group}"):
+                        masks = compute_masks(chunk, *(group_inputs[name] for name in inputs))
+                    with diagnostics.stage("format issues"):
+                        if group == 'custom':
+                            formatters = rules.issue_formatters(chunk)
+                        else:
+                            formatters = issue_formatters(chunk, **criteria)
+                        for name, mask in masks.items():
+                            offsets = np.flatnonzero(mask)
+                            new_masks[group].setdefault(name, []).append(mask)
+                            new_rows[group].setdefault(name, []).append(
+                                (offsets + chunk_start, [formatters[name](i) for i in offsets])
+                            )
+                            rule_rows[name] = (offsets + chunk_start, new_rows[group][name][-1][1])
+                else:
+                    for name, (positions, rows) in self._groups[group][2].items():
+                        first, last = np.searchsorted(positions, [chunk_start, chunk_end])
+                        rule_rows[name] = (positions[first:last], rows[first:last])
+
+            if filter_by_ledger_code:
+                with diagnostics.stage("ledger filter"):
+                    selected = ledger_mask[chunk_start:chunk_end]
+                    if ledger_stale:
+                        ledger_rows.extend(build_ledger_rows(df.iloc[chunk_start:chunk_end][selected]))
+
+                    # Only issues of activities with the ledger code are reported
+                    for name, (positions, rows) in rule_rows.items():
+                        keep = np.flatnonzero(selected[positions - chunk_start])
+                        rule_rows[name] = (positions[keep], [rows[k] for k in keep])
+
+            with diagnostics.stage("format issues"):
+                chunk_issues, chunk_positions = merge_issue_rows(rule_rows, with_positions=True, order=order)
+                issue_ledger_codes.extend(ledger_codes.take(chunk_positions).tolist())
+            issues.extend(chunk_issues)
+            if on_chunk is not None:
+                on_chunk(chunk_end, total_num_of_activities, chunk_issues)
+
+        # The run finished, so its pieces become the cache for the next one
+        self._source = df
+        self._chunk_rows = chunk_rows
+        self._chunks = chunks
+        for group in stale_groups:
+            inputs = groups[group][0]
+            self._groups[group] = (
+                tuple(group_inputs[name] for name in inputs),
+                {name: _concat_bool(parts) for name, parts in new_masks[group].items()},
+                {name: _concat_rows(parts) for name, parts in new_rows[group].items()},
+            )
+        if ledger_stale:
+            self._ledger = (ledger_code, ledger_mask, ledger_rows)
+
+        masks = {name: mask for group in groups for name, mask in self._groups[group][1].items()} \
+            if total_num_of_activities else {name: np.zeros(0, dtype=bool) for name in order}
+
+        if filter_by_ledger_code:
+            selected = self._ledger[1]
+            num_of_ledger_code_activities = int(selected.sum())
+            if num_of_ledger_code_activities == 0:
+                return ValidationResult(
+                    counters={'ledger_code_activities': 0, 'total_activities': total_num_of_activities},
+                    ledger_code=ledger_code,
+                )
+            masks = {name: mask[selected] for name, mask in masks.items()}
+        else:
+            num_of_ledger_code_activities = 0
+
+        num_of_checked_rows = len(masks['invalid_cost'])
+        counters = count_rule_masks(masks, num_of_checked_rows)
+        counters['ledger_code_activities'] = num_of_ledger_code_activities
+        counters['total_activities'] = total_num_of_activities
+        rule_counts = {}
+        for name, label in (rules.labels.items() if rules else ()):
+            num_of_failed = int(masks[name].sum())
+            rule_counts[name] = {'label': label, 'passed': num_of_checked_rows - num_of_failed, 'failed': num_of_failed}
+
+        return ValidationResult(
+            issues=issues,
+            ledger_matches=list(self._ledger[2]) if ledger_code else [],
+            counters=counters,
+            ledger_code=ledger_code or None,
+            issue_ledger_codes=issue_ledger_codes,
+            rule_counts=rule_counts,
+        )
+
+
+# Old issue rows of the rows that kept their content: for each kept row (new position, old
+# position) the indexes of the old rows at its old position, with the new positions they move to
+def _carry_rows(old_positions, kept, sources):
+    first = np.searchsorted(old_positions, sources, side='left')
+    last = np.searchsorted(old_positions, sources, side='right')
+    counts = last - first
+    starts = np.repeat(first, counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(kept, counts), (starts + offsets).tolist()
+
+
+def _concat_bool(parts):
+    return np.concatenate(parts) if parts else np.zeros(0, dtype=bool)
+
+
+def _concat_rows(parts):
+    if not parts:
+        return np.zeros(0, dtype=np.int64), []
+    return np.concatenate([positions for positions, _ in parts]), [row for _, rows in parts for row in rows]
+
+
+# Validates a sheet from scratch (see IncrementalValidator.validate)
+def validate_activities(df, start_date=None, end_date=None, min_cost=0, max_cost=float('inf'), ledger_code=None,
+                        chunk_rows=CHUNK_ROWS, on_chunk=None, cancel_event=None, diagnostics=None, rules=None):
+    return IncrementalValidator().validate(
+        df, start_date, end_date, min_cost, max_cost, ledger_code,
+        chunk_rows=chunk_rows, on_chunk=on_chunk, cancel_event=cancel_event, diagnostics=diagnostics, rules=rules,
+    )
@@ -0,0 +1,505 @@
+# Local HTTP validation service, so analysts checking the same weekly export share one parse and
+# one validation instead of each paying for their own.
+#
+#   python validation_service.py --port 8765 --workers 4
+#
+#   POST /jobs?sheet=Activities&start_date=09/01/24&end_date=06/30/25&min_cost=&max_cost=&ledger_code=
+#        body: the workbook          -> 202 {"job": id, "status": "queued"} (200 with the result if cached)
+#   GET  /jobs/<id>                  -> {"status": "queued" | "running" | "done" | "error", ...}
+#   GET  /stats                      -> queue depth, cache hits and job latency
+#
+# Jobs run on a bounded pool of worker threads; results are cached by the workbook's content hash,
+# the sheets, the criteria and the service's rules file. The Tk app uses ServiceClient below.
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import HTTPError, URLError
+from urllib.parse import parse_qs, quote, urlencode, urlparse
+from urllib.request import Request, urlopen
+
+import pandas as pd
+
+from custom_rules import RuleConfigError, load_rules
+from diagnostics import NullDiagnostics, RunDiagnostics
+from multi_sheet import SheetResult, parse_sheet_names, sheet_label, validate_workbooks
+from validation_engine import CriteriaError, ValidationCancelled, ValidationResult, parse_criteria
+
+SERVICE_URL = os.environ.get('AMILIA_SERVICE_URL', 'http://127.0.0.1:8765')
+
+# Where uploaded workbooks wait for their jobs. They are named by content hash so identical uploads
+# in flight share one file, and removed once no job needs them. Their parsed sheets stay in the
+# workbook cache (and its sidecars) under the same hash, so a re-upload is not parsed again.
+SPOOL_DIR = os.environ.get(
+    'AMILIA_SPOOL_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'amilia_activity_checker', 'uploads')
+)
+WORKBOOK_EXTENSIONS = ('.xlsx', '.xlsm', '.xls')
+
+MAX_WORKERS = min(4, os.cpu_count() or 1)
+MAX_QUEUED = 32  # jobs waiting for a worker before new ones are turned away
+MAX_UPLOAD_BYTES = 256 * 1024 * 1024
+RESULT_CACHE_BYTES = 256 * 1024 * 1024
+JOB_TTL_SECONDS = 3600  # finished jobs can be fetched for this long
+LATENCY_SAMPLES = 500  # recent jobs the latency figures are computed from
+
+CRITERIA_FIELDS = ('start_date', 'end_date', 'min_cost', 'max_cost', 'ledger_code')
+
+logger = logging.getLogger('amilia_activity_checker.service')
+
+
+# Raised when the queue is full; the client should retry later
+class ServiceBusy(RuntimeError):
+    pass
+
+
+# Raised when the connection ends before the whole workbook was sent
+class IncompleteUpload(ValueError):
+    pass
+
+
+@dataclass
+class Job:
+    id: str
+    key: str
+    label: str
+    submitted: float
+    started: float = None
+    finished: float = None
+    status: str = "queued"
+    payload: bytes = None  # JSON response of a finished job
+    error: str = None
+
+
+# Activity cells as JSON values (numbers stay numbers, blanks become null)
+def _cell(value):
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if hasattr(value, 'item'):
+        value = value.item()
+    return value if isinstance(value, (str, int, float)) else str(value)
+
+
+def _rows_to_json(rows):
+    return [[_cell(activity), issue, details] for activity, issue, details in rows]
+
+
+def result_to_json(result):
+    return {
+        'issues': _rows_to_json(result.issues),
+        'ledger_matches': _rows_to_json(result.ledger_matches),
+        'counters': result.counters,
+        'ledger_code': result.ledger_code,
+        'issue_ledger_codes': [_cell(code) for code in result.issue_ledger_codes],
+        'rule_counts': result.rule_counts,
+    }
+
+
+def result_from_json(data):
+    return ValidationResult(
+        issues=[tuple(row) for row in data['issues']],
+        ledger_matches=[tuple(row) for row in data['ledger_matches']],
+        counters=data['counters'],
+        ledger_code=data['ledger_code'],
+        issue_ledger_codes=data['issue_ledger_codes'],
+        rule_counts=data['rule_counts'],
+    )
+
+
+def _latency(samples):
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+    pick = lambda share: ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+    return {
+        'count': len(ordered), 'mean': round(sum(ordered) / len(ordered), 3),
+        'p50': round(pick(0.5), 3), 'p95': round(pick(0.95), 3), 'max': round(ordered[-1], 3),
+    }
+
+
+# Queues validation jobs on a bounded worker pool and caches their results
+class ValidationService:
+    def __init__(self, workers=MAX_WORKERS, max_queued=MAX_QUEUED, spool_dir=SPOOL_DIR,
+                 cache_bytes=RESULT_CACHE_BYTES):
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.spool_dir = spool_dir
+        self.cache_bytes = cache_bytes
+        self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        self._lock = threading.Lock()
+        self._jobs = {}  # job id -> Job
+        self._active = {}  # cache key -> queued or running Job, so identical requests share one job
+        self._cache = OrderedDict()  # cache key -> JSON response
+        self._cache_used = 0
+        self._spooled = {}  # spooled workbook -> uploads and jobs still using it
+        self.queued = 0
+        self.running = 0
+        self.counts = {'done': 0, 'error': 0, 'cache_hits': 0, 'cache_misses': 0, 'rejected': 0}
+        self._queue_waits = deque(maxlen=LATENCY_SAMPLES)
+        self._run_times = deque(maxlen=LATENCY_SAMPLES)
+        self._totals = deque(maxlen=LATENCY_SAMPLES)
+
+    # Streams an upload to the spool folder while hashing it; returns (content hash, path). The
+    # caller holds a reference to the spooled file until submit takes it over (or releases it).
+    # Raises IncompleteUpload if fewer than length bytes arrive.
+    def spool_upload(self, stream, length, filename=""):
+        extension = os.path.splitext(filename)[1].lower()
+        extension = extension if extension in WORKBOOK_EXTENSIONS else '.xlsx'
+        os.makedirs(self.spool_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        with tempfile.NamedTemporaryFile(dir=self.spool_dir, suffix='.part', delete=False) as spool_file:
+            remaining = length
+            try:
+                while remaining > 0:
+                    block = stream.read(min(remaining, 1024 * 1024))
+                    if not block:
+                        break
+                    digest.update(block)
+                    spool_file.write(block)
+                    remaining -= len(block)
+            except BaseException:
+                spool_file.close()
+                os.remove(spool_file.name)
+                raise
+        # A truncated workbook is never validated
+        if remaining:
+            os.remove(spool_file.name)
+            raise IncompleteUpload(f"Upload ended after {length - remaining} of {length} bytes")
+        content_hash = digest.hexdigest()
+        path = os.path.join(self.spool_dir, content_hash + extension)
+
+        # An existing copy is kept untouched so the jobs reading it are not disturbed
+        with self._lock:
+            if path in self._spooled:
+                os.remove(spool_file.name)
+            else:
+                os.replace(spool_file.name, path)
+            self._spooled[path] = self._spooled.get(path, 0) + 1
+        return content_hash, path
+
+    # Drops one reference to a spooled workbook and deletes the file once nothing uses it
+    def release_upload(self, path):
+        with self._lock:
+            self._spooled[path] -= 1
+            if self._spooled[path]:
+                return
+            del self._spooled[path]
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning("Spooled upload not removed: %s", e)
+
+    # Queues a job for an uploaded workbook, or returns a finished one straight from the cache.
+    # fields holds the criteria as text, like the GUI fields; bad criteria raise CriteriaError.
+    # A queued job takes over the upload's reference to the spooled file; otherwise it is released.
+    def submit(self, content_hash, path, sheet_text, fields):
+        queued = False
+        try:
+            criteria = parse_criteria(*(fields.get(name, "") for name in CRITERIA_FIELDS))
+            sheet_names = parse_sheet_names(sheet_text)
+            rules = load_rules()
+            key = hashlib.sha256(json.dumps(
+                [content_hash, sheet_names, criteria, rules.fingerprint], default=str, sort_keys=True
+            ).encode()).hexdigest()
+
+            with self._lock:
+                self._forget_old_jobs()
+                job = Job(uuid.uuid4().hex, key, f"{os.path.basename(path)} [{sheet_text}]", time.time())
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    self.counts['cache_hits'] += 1
+                    job.status, job.payload, job.finished = "done", self._cache[key], job.submitted
+                    self._jobs[job.id] = job
+                    return job
+                if key in self._active:
+                    self.counts['cache_hits'] += 1
+                    return self._active[key]
+                if self.queued >= self.max_queued:
+                    self.counts['rejected'] += 1
+                    raise ServiceBusy(f"{self.queued} jobs are already waiting, try again shortly")
+                self.counts['cache_misses'] += 1
+                self.queued += 1
+                self._jobs[job.id] = job
+                self._active[key] = job
+
+            self._pool.submit(self._run, job, content_hash, path, sheet_names, criteria, rules)
+            queued = True
+            return job
+        finally:
+            if not queued:
+                self.release_upload(path)
+
+    def _run(self, job, content_hash, path, sheet_names, criteria, rules):
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+            job.started = time.time()
+            job.status = "running"
+
+        diagnostics = RunDiagnostics(f"service {job.label}")
+        try:
+            # Parallelism comes from the job pool, so each job checks its sheets one at a time
+            sheets = validate_workbooks([path], sheet_names, criteria, diagnostics=diagnostics, max_workers=1,
+                                        rules=rules, content_hashes={path: content_hash})
+            payload = json.dumps({
+                'status': "done",
+                'sheets': [
+                    {
+                        'sheet': sheet.sheet_name, 'error': sheet.error,
+                        'result': result_to_json(sheet.result) if sheet.result is not None else None,
+                    }
+                    for sheet in sheets
+                ],
+            }, default=str).encode()
+            status = "done"
+        except Exception as e:
+            payload, status = None, "error"
+            job.error = str(e)
+
+        with self._lock:
+            self.running -= 1
+            job.finished = time.time()
+            job.payload = payload
+            job.status = status
+            self.counts[status] += 1
+            self._active.pop(job.key, None)
+            self._queue_waits.append(job.started - job.submitted)
+            self._run_times.append(job.finished - job.started)
+            self._totals.append(job.finished - job.submitted)
+            if payload is not None:
+                self._cache_result(job.key, payload)
+        self.release_upload(path)
+        try:
+            diagnostics.log(status)
+        except OSError as e:
+            logger.warning("Run log not written: %s", e)
+
+    def _cache_result(self, key, payload):
+        if len(payload) > self.cache_bytes:
+            return
+        self._cache[key] = payload
+        self._cache_used += len(payload)
+        while self._cache_used > self.cache_bytes:
+            _, evicted = self._cache.popitem(last=False)
+            self._cache_used -= len(evicted)
+
+    def _forget_old_jobs(self):
+        expired = time.time() - JOB_TTL_SECONDS
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished and job.finished < expired]:
+            del self._jobs[job_id]
+
+    def job(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queue_depth': self.queued,
+                'running': self.running,
+                'max_queued': self.max_queued,
+                'jobs': dict(self.counts),
+                'cache': {'entries': len(self._cache), 'bytes': self._cache_used, 'limit': self.cache_bytes},
+                'latency_seconds': {
+                    'queue_wait': _latency(self._queue_waits),
+                    'run': _latency(self._run_times),
+                    'total': _latency(self._totals),
+                },
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    def _send_json(self, status, body, job=None):
+        data = body if isinstance(body, bytes) else json.dumps(body, default=str).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        if job is not None:
+            self.send_header('X-Job-Id', job.id)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != '/jobs':
+            self._send_json(404, {'status': "error", 'error': "Not found"})
+            return
+        service = self.server.service
+        query = {name: values[0] for name, values in parse_qs(url.query, keep_blank_values=True).items()}
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            self._send_json(400, {'status': "error", 'error': "Content-Length must be a number of bytes"})
+            return
+        if not 0 < length <= MAX_UPLOAD_BYTES:
+            self._send_json(413 if length > 0 else 400, {'status': "error", 'error': "Send the workbook as the body"})
+            return
+        try:
+            content_hash, path = service.spool_upload(self.rfile, length, query.get('filename', ""))
+            job = service.submit(content_hash, path, query.get('sheet', ""), query)
+        except IncompleteUpload as e:
+            self._send_json(400, {'status': "error", 'error': str(e)})
+        except CriteriaError as e:
+            self._send_json(400, {'status': "error", 'error': str(e), 'row': e.row})
+        except RuleConfigError as e:
+            self._send_json(400, {'status': "error", 'error': f"Rules File: {e}"})
+        except ServiceBusy as e:
+            self._send_json(503, {'status': "busy", 'error': str(e)})
+        else:
+            if job.status == "done":
+                self._send_json(200, job.payload, job)
+            else:
+                self._send_json(202, {'job': job.id, 'status': job.status}, job)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        service = self.server.service
+        if url.path == '/stats':
+            self._send_json(200, service.stats())
+        elif url.path.startswith('/jobs/'):
+            job = service.job(url.path[len('/jobs/'):])
+            if job is None:
+                self._send_json(404, {'status': "error", 'error': "Unknown job"})
+            elif job.status == "done":
+                self._send_json(200, job.payload, job)
+            elif job.status == "error":
+                self._send_json(200, {'job': job.id, 'status': "error", 'error': job.error}, job)
+            else:
+                self._send_json(200, {'job': job.id, 'status': job.status, 'queue_depth': service.queued}, job)
+        else:
+            self._send_json(404, {'status': "error", 'error': "Not found"})
+
+    def log_message(self, format, *args):
+        logger.info("%s %s", self.address_string(), format % args)
+
+
+def make_server(host='127.0.0.1', port=8765, service=None):
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    server.daemon_threads = True
+    server.service = service or ValidationService()
+    return server
+
+
+# Talks to a running service; validate_workbooks matches multi_sheet.validate_workbooks so the
+# GUI can use either. Rules come from the service's own rules file.
+class ServiceClient:
+    def __init__(self, url=SERVICE_URL, poll_interval=0.2, timeout=60):
+        self.url = url.rstrip('/')
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+
+    def _request(self, path, data=None, headers=None):
+        request = Request(self.url + path, data=data, headers=headers or {}, method='POST' if data else 'GET')
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except HTTPError as e:
+            try:
+                body = json.loads(e.read())
+            except ValueError:
+                body = {}
+            if 'row' in body:
+                raise CriteriaError(tuple(body['row']))
+            raise RuntimeError(body.get('error') or f"Validation service answered {e.code}")
+        except URLError as e:
+            raise RuntimeError(f"Validation service not reachable at {self.url}: {e.reason}")
+
+    # Uploads one workbook and returns the service's job (or the cached result)
+    def submit(self, path, sheet_names, criteria):
+        fields = {
+            'sheet': ", ".join(sheet_names) if sheet_names is not None else "*",
+            'filename': os.path.basename(path),
+            'start_date': criteria['start_date'].isoformat() if criteria['start_date'] else "",
+            'end_date': criteria['end_date'].isoformat() if criteria['end_date'] else "",
+            'ledger_code': criteria['ledger_code'] or "",
+        }
+        if criteria['min_cost'] != 0 or criteria['max_cost'] != float('inf'):
+            fields['min_cost'] = repr(criteria['min_cost'])
+            fields['max_cost'] = repr(criteria['max_cost'])
+        with open(path, 'rb') as workbook:
+            return self._request(
+                f"/jobs?{urlencode(fields)}", workbook,
+                {'Content-Length': str(os.path.getsize(path)), 'Content-Type': 'application/octet-stream'},
+            )
+
+    def job(self, job_id):
+        return self._request(f"/jobs/{quote(job_id)}")
+
+    def stats(self):
+        return self._request("/stats")
+
+    def validate_workbooks(self, paths, sheet_names, criteria, on_sheet=None, cancel_event=None, diagnostics=None,
+                           max_workers=None, rules=None):
+        diagnostics = diagnostics or NullDiagnostics()
+        several_files = len(paths) > 1
+        finished = []
+
+        # Every workbook is queued first so the service can work on them side by side
+        with diagnostics.stage("upload"):
+            responses = {path: self.submit(path, sheet_names, criteria) for path in paths}
+        for path in paths:
+            response = responses[path]
+            while response['status'] in ("queued", "running"):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise ValidationCancelled()
+                time.sleep(self.poll_interval)
+                response = self.job(response['job'])
+            if response['status'] == "error":
+                sheets = [SheetResult(path, "", error=response['error'], label=os.path.basename(path))]
+            else:
+                sheets = [
+                    SheetResult(
+                        path, sheet['sheet'], error=sheet['error'],
+                        result=result_from_json(sheet['result']) if sheet['result'] is not None else None,
+                        label=sheet_label(path, sheet['sheet'], several_files),
+                    )
+                    for sheet in response['sheets']
+                ]
+            for sheet in sheets:
+                finished.append(sheet)
+                if on_sheet is not None:
+                    on_sheet(sheet, len(finished), max(len(finished), len(paths)))
+        return finished
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Amilia validation service on this machine.")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8765, help="Port to listen on (default: 8765)")
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS, help="Jobs validated at the same time")
+    parser.add_argument('--max-queued', type=int, default=MAX_QUEUED, help="Jobs allowed to wait for a worker")
+    parser.add_argument('--spool-dir', default=SPOOL_DIR, help="Folder for uploaded workbooks")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    service = ValidationService(args.workers, args.max_queued, args.spool_dir)
+    server = make_server(args.host, args.port, service)
+    logger.info("Validation service on http://%s:%s with %s workers", args.host, args.port, service.workers)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
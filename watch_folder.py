@@ -0,0 +1,283 @@
+# Watch mode: validates the workbooks that appear or change in a folder, with the saved criteria.
+#
+#   python watch_folder.py /shared/exports --sheet Activities --start-date 09/01/24 --end-date 06/30/25 --save
+#   python watch_folder.py                     (the folder, sheet and criteria saved last time)
+#
+# The folder is polled; a workbook is only read once its size and modification time have stopped
+# changing, so files still being copied in are left alone. When a workbook changes, its rows are
+# hashed and compared with the previous version, and only the rows that changed are checked again.
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zipfile
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from batch_validate import find_workbooks
+from custom_rules import load_rules
+from multi_sheet import parse_sheet_names
+from results_store import results_store
+from streaming_reader import should_stream, validate_workbook_streaming
+from validation_engine import (
+    REQUIRED_COLUMNS, UNREADABLE_TEXT_COLUMNS, CriteriaError, IncrementalValidator, MissingColumnsError,
+    find_missing_columns, parse_criteria,
+)
+from workbook_cache import workbook_cache
+
+# Where the folder, sheet and criteria of the last watch are saved
+WATCH_SETTINGS = os.environ.get(
+    'AMILIA_WATCH_SETTINGS',
+    os.path.join(os.path.expanduser('~'), '.cache', 'amilia_activity_checker', 'watch_settings.json'),
+)
+SETTING_NAMES = ('folder', 'sheet', 'start_date', 'end_date', 'min_cost', 'max_cost', 'ledger_code')
+
+POLL_SECONDS = 2.0
+SETTLE_SECONDS = 3.0  # how long a file must stay unchanged before it is read
+
+HASHED_COLUMNS = REQUIRED_COLUMNS + UNREADABLE_TEXT_COLUMNS
+
+
+# Saves the watch settings (criteria as the text typed in the GUI fields)
+def save_settings(settings, path=WATCH_SETTINGS):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as settings_file:
+        json.dump({name: settings.get(name, "") for name in SETTING_NAMES}, settings_file, indent=2)
+
+
+def load_settings(path=WATCH_SETTINGS):
+    if not os.path.exists(path):
+        return {name: "" for name in SETTING_NAMES}
+    with open(path, encoding='utf-8') as settings_file:
+        settings = json.load(settings_file)
+    return {name: str(settings.get(name) or "") for name in SETTING_NAMES}
+
+
+# One hash per row of a typed sheet, over every column the checks read. The unreadable date and
+# cost columns only exist on sheets that have such cells, so a missing one hashes as empty.
+def row_hashes(df):
+    columns = {
+        column: df[column] if column in df else pd.Series(pd.Categorical([None] * len(df)), index=df.index)
+        for column in HASHED_COLUMNS
+    }
+    return pd.util.hash_pandas_object(pd.DataFrame(columns), index=False).to_numpy()
+
+
+# For every new row, the position of a previous row with the same content (-1 if there is none)
+def match_rows(previous_hashes, hashes):
+    previous = pd.Series(np.arange(len(previous_hashes)), index=previous_hashes)
+    previous = previous[~previous.index.duplicated()]
+    return previous.reindex(hashes).fillna(-1).to_numpy(dtype=np.int64)
+
+
+# Whether a workbook looks completely written: no Excel lock file next to it and, for the zip
+# based formats, a readable zip directory (a half-copied file has none)
+def looks_complete(path):
+    folder, name = os.path.split(path)
+    if os.path.exists(os.path.join(folder, '~$' + name)):
+        return False
+    if path.lower().endswith(('.xlsx', '.xlsm')):
+        return zipfile.is_zipfile(path)
+    return True
+
+
+# Outcome of validating one sheet of a changed workbook
+@dataclass
+class WatchEvent:
+    path: str
+    sheet_name: str
+    result: object = None
+    error: str = None
+    changed_rows: int = 0
+    total_rows: int = 0
+    seconds: float = 0.0
+    saved_run: object = None  # Future of the id the run gets in the results store
+
+    # Waits for the run to be saved; None if it could not be
+    @property
+    def run_id(self):
+        try:
+            return self.saved_run.result() if self.saved_run is not None else None
+        except (sqlite3.Error, OSError):
+            return None
+
+
+# Remembers every workbook of the folder and validates the ones that are new or changed. Each
+# sheet keeps its row hashes and an IncrementalValidator from the last run, so a later version
+# only has its changed rows checked. on_event receives a WatchEvent per validated sheet.
+class FolderWatcher:
+    def __init__(self, folder, sheet_names, criteria, on_event=None, store=results_store,
+                 settle_seconds=SETTLE_SECONDS):
+        self.folder = folder
+        self.sheet_names = sheet_names
+        self.criteria = criteria
+        self.on_event = on_event
+        self.store = store
+        self.settle_seconds = settle_seconds
+        self._observed = {}  # path -> (signature, time it was first seen with that signature)
+        self._validated = {}  # path -> signature of the version last validated
+        self._snapshots = {}  # (path, sheet) -> (row hashes, IncrementalValidator)
+
+    @staticmethod
+    def signature(path):
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    # Looks at the folder once and validates every workbook that has settled since it changed
+    def poll(self, now=None):
+        now = time.monotonic() if now is None else now
+        events = []
+        paths = find_workbooks([self.folder])
+        for path in paths:
+            try:
+                signature = self.signature(path)
+            except OSError:
+                continue
+            observed = self._observed.get(path)
+            if observed is None or observed[0] != signature:
+                self._observed[path] = (signature, now)
+                continue
+            if self._validated.get(path) == signature or now - observed[1] < self.settle_seconds:
+                continue
+            if not looks_complete(path):
+                continue
+            events.extend(self.validate_workbook(path))
+            self._validated[path] = signature
+
+        # Deleted workbooks are forgotten
+        for path in set(self._observed) - set(paths):
+            self._observed.pop(path, None)
+            self._validated.pop(path, None)
+            for key in [key for key in self._snapshots if key[0] == path]:
+                del self._snapshots[key]
+        return events
+
+    def validate_workbook(self, path):
+        try:
+            rules = load_rules()
+            sheet_names = self.sheet_names or workbook_cache.sheet_names(path)
+        except Exception as e:
+            return [self._emit(WatchEvent(path, "", error=str(e)))]
+        return [self._emit(self._validate_sheet(path, sheet_name, rules)) for sheet_name in sheet_names]
+
+    def _validate_sheet(self, path, sheet_name, rules):
+        started = time.perf_counter()
+        event = WatchEvent(path, sheet_name)
+        try:
+            # Very large workbooks are streamed, so they are checked whole every time
+            if should_stream(path):
+                event.result = validate_workbook_streaming(path, sheet_name, **self.criteria, rules=rules)
+                event.total_rows = event.changed_rows = event.result.counters.get('total_activities', 0)
+            else:
+                df = workbook_cache.load_sheet(path, sheet_name)
+                missing_columns = find_missing_columns(df)
+                if missing_columns:
+                    raise MissingColumnsError(missing_columns)
+                hashes = row_hashes(df)
+                snapshot = self._snapshots.get((path, sheet_name))
+                if snapshot is None:
+                    validator = IncrementalValidator()
+                    event.changed_rows = len(df)
+                else:
+                    previous_hashes, validator = snapshot
+                    source_positions = match_rows(previous_hashes, hashes)
+                    validator.rebase(df, source_positions, rules)
+                    event.changed_rows = int((source_positions < 0).sum())
+                event.result = validator.validate(df, **self.criteria, rules=rules)
+                event.total_rows = len(df)
+                self._snapshots[(path, sheet_name)] = (hashes, validator)
+        except Exception as e:
+            event.error = str(e)
+            self._snapshots.pop((path, sheet_name), None)
+        event.seconds = time.perf_counter() - started
+        # Saved on the store's writer thread, so the next sheet doesn't wait for the issues to be written
+        if event.result is not None:
+            event.saved_run = self.store.save_run_later(path, sheet_name, self.criteria, event.result)
+        return event
+
+    def _emit(self, event):
+        if self.on_event is not None:
+            self.on_event(event)
+        return event
+
+    # Polls until stop_event is set (runs in its own thread in the GUI)
+    def run(self, stop_event, poll_seconds=POLL_SECONDS):
+        while not stop_event.is_set():
+            self.poll()
+            stop_event.wait(poll_seconds)
+
+
+# Builds a watcher from saved (or given) settings; bad criteria raise CriteriaError
+def watcher_from_settings(settings, on_event=None):
+    criteria = parse_criteria(*(settings[name] for name in SETTING_NAMES[2:]))
+    sheet_names = parse_sheet_names(settings['sheet']) if settings['sheet'] else None
+    return FolderWatcher(settings['folder'], sheet_names, criteria, on_event)
+
+
+# One line per validated sheet for the console
+def describe_event(event):
+    name = f"{os.path.basename(event.path)} [{event.sheet_name}]"
+    if event.error is not None:
+        return f"[error] {name}: {event.error}"
+    return (
+        f"[ok] {name}: {len(event.result.issues)} issues, {event.changed_rows} of {event.total_rows} rows checked "
+        f"({event.seconds:.2f}s, run {event.run_id})"
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Validate Amilia exports as they land in a folder.")
+    parser.add_argument('folder', nargs='?', help="Folder to watch (default: the saved one)")
+    parser.add_argument('--sheet', help="Sheet name(s) to validate, comma separated, * for all")
+    parser.add_argument('--start-date', help="Expected start date (MM/DD/YY)")
+    parser.add_argument('--end-date', help="Expected end date (MM/DD/YY)")
+    parser.add_argument('--min-cost', help="Minimum cost")
+    parser.add_argument('--max-cost', help="Maximum cost")
+    parser.add_argument('--ledger-code', help="Only check activities with this ledger code")
+    parser.add_argument('--save', action='store_true', help="Save these settings for the next watch")
+    parser.add_argument('--once', action='store_true', help="Validate what is in the folder now and exit")
+    parser.add_argument('--poll-seconds', type=float, default=POLL_SECONDS, help="Time between two looks")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    settings = load_settings()
+    for name in SETTING_NAMES:
+        value = getattr(args, name)
+        if value is not None:
+            settings[name] = value
+    if not settings['folder'] or not os.path.isdir(settings['folder']):
+        print(f"Error: '{settings['folder']}' is not a folder", file=sys.stderr)
+        return 2
+
+    try:
+        watcher = watcher_from_settings(settings, on_event=lambda event: print(describe_event(event), flush=True))
+    except CriteriaError as e:
+        print(f"{e.row[0]}: {e}", file=sys.stderr)
+        return 2
+    if args.save:
+        save_settings(settings)
+
+    if args.once:
+        watcher.settle_seconds = 0
+        watcher.poll()
+        watcher.poll()
+        return 0
+
+    print(f"Watching {settings['folder']} (Ctrl+C to stop)")
+    stop_event = threading.Event()
+    try:
+        watcher.run(stop_event, args.poll_seconds)
+    except KeyboardInterrupt:
+        stop_event.set()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
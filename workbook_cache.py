@@ -0,0 +1,155 @@
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from validation_engine import is_required_column
+from workbook_sidecar import SIDECAR_DIR, import_sheet, read_sidecar
+
+# Parsed sheets are kept until they use more than this much memory in total
+DEFAULT_MEMORY_LIMIT = 512 * 1024 * 1024
+
+# Only blank cells are missing values: text like "N/A" or "null" is kept as written, so a cost
+# that is not a number is reported instead of silently becoming blank
+READ_OPTIONS = {'keep_default_na': False, 'na_values': ['']}
+
+
+# In-process cache of parsed sheets so re-validating the same file does not re-read Excel.
+# Entries are keyed by (path, mtime, size, sheet), so a file that changes on disk is reloaded
+# automatically; callers that know the workbook's content hash can key on it instead. The least recently used sheets are dropped once the memory limit is reached.
+# Only the required columns are read, and they are typed into a compact frame right away (the
+# untyped sheet is never kept). Sheets are also saved as typed columnar sidecars so a new session
+# can skip the Excel parse. Cached frames are shared between callers and must not be modified in place.
+class WorkbookCache:
+    def __init__(self, memory_limit=DEFAULT_MEMORY_LIMIT, use_sidecars=True, sidecar_dir=SIDECAR_DIR):
+        self.memory_limit = memory_limit
+        self.use_sidecars = use_sidecars
+        self.sidecar_dir = sidecar_dir
+        self._entries = OrderedDict()  # key -> (DataFrame, size in bytes)
+        self._sheet_names = {}  # file key -> list of sheet names
+        self._memory_used = 0
+        self._lock = threading.Lock()
+
+    # Identifies the current version of a file on disk, or its content when the hash is given (the
+    # service writes every upload anew, so the path and mtime of the same workbook never repeat)
+    @staticmethod
+    def file_key(path, content_hash=None):
+        if content_hash is not None:
+            return (content_hash, None, None)
+        stat = os.stat(path)
+        return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+    # Returns the parsed sheet, reading the workbook only if this version of the sheet is not cached
+    def load_sheet(self, path, sheet_name=0, content_hash=None):
+        return next(iter(self.load_sheets(path, [sheet_name], content_hash).values()))
+
+    # Returns {sheet name: parsed sheet} for several sheets (every sheet when sheet_names is None).
+    # Sheets that are neither cached nor in a sidecar are all parsed from a single read of the workbook.
+    def load_sheets(self, path, sheet_names=None, content_hash=None):
+        file_key = self.file_key(path, content_hash)
+
+        # A sheet asked for by position shares its entry with the same sheet asked for by name
+        if sheet_names is None:
+            sheet_names = self.sheet_names(path, file_key)
+        elif any(isinstance(name, int) for name in sheet_names):
+            available = self.sheet_names(path, file_key)
+            sheet_names = [available[name] if isinstance(name, int) else name for name in sheet_names]
+
+        frames = {}
+        unread = []
+        for sheet_name in sheet_names:
+            key = file_key + (sheet_name,)
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    frames[sheet_name] = self._entries[key][0]
+                    continue
+
+            # Next fastest is the typed sidecar from an earlier session, then the workbook itself
+            df = read_sidecar(path, sheet_name, self.sidecar_dir, content_hash) if self.use_sidecars else None
+            if df is None:
+                unread.append(sheet_name)
+            else:
+                self._store(key, df)
+                frames[sheet_name] = df
+
+        if unread:
+            sheets = pd.read_excel(path, sheet_name=unread, usecols=is_required_column, **READ_OPTIONS)
+            for sheet_name in unread:
+                df = import_sheet(path, sheet_name, sheets[sheet_name], self.sidecar_dir, save=self.use_sidecars,
+                                  content_hash=content_hash)
+                self._store(file_key + (sheet_name,), df)
+                frames[sheet_name] = df
+
+        return {sheet_name: frames[sheet_name] for sheet_name in sheet_names}
+
+    # Sheet names of the workbook, remembered for as long as the file is unchanged
+    def sheet_names(self, path, file_key=None, content_hash=None):
+        file_key = file_key or self.file_key(path, content_hash)
+        with self._lock:
+            names = self._sheet_names.get(file_key)
+        if names is None:
+            with pd.ExcelFile(path) as workbook:
+                names = list(workbook.sheet_names)
+            with self._lock:
+                self._sheet_names = {k: v for k, v in self._sheet_names.items() if k[0] != file_key[0]}
+                self._sheet_names[file_key] = names
+        return names
+
+    def _store(self, key, df):
+        size = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            # Older versions of the same file can never be hit again
+            for stale_key in [k for k in self._entries if k[0] == key[0] and k[1:3] != key[1:3]]:
+                self._evict(stale_key)
+
+            if key in self._entries:
+                self._evict(key)
+
+            # A sheet bigger than the whole limit is returned but not kept
+            if size > self.memory_limit:
+                return
+
+            self._entries[key] = (df, size)
+            self._memory_used += size
+            while self._memory_used > self.memory_limit:
+                self._evict(next(iter(self._entries)))
+
+    def _evict(self, key):
+        _, size = self._entries.pop(key)
+        self._memory_used -= size
+
+    # Forgets every cached sheet, or only the ones belonging to one file
+    def clear(self, path=None):
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._sheet_names.clear()
+                self._memory_used = 0
+                return
+            path = os.path.abspath(path)
+            self._sheet_names = {k: v for k, v in self._sheet_names.items() if k[0] != path}
+            for key in [k for k in self._entries if k[0] == path]:
+                self._evict(key)
+
+    @property
+    def memory_used(self):
+        return self._memory_used
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Cache shared by the whole application
+workbook_cache = WorkbookCache()
+
+
+# Loads a sheet through the shared cache
+def load_sheet(path, sheet_name=0, content_hash=None):
+    return workbook_cache.load_sheet(path, sheet_name, content_hash)
+
+
+# Loads several sheets of one workbook through the shared cache
+def load_sheets(path, sheet_names=None, content_hash=None):
+    return workbook_cache.load_sheets(path, sheet_names, content_hash)
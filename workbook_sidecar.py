@@ -0,0 +1,97 @@
+import hashlib
+import os
+
+from validation_engine import type_activities
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # Sidecars are skipped and every load goes back to the workbook
+    pa = None
+    feather = None
+
+# Where sidecars are written unless a directory is given (None writes them next to the workbook)
+SIDECAR_DIR = os.environ.get(
+    'AMILIA_SIDECAR_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'amilia_activity_checker'),
+)
+SIDECAR_VERSION = b'3'  # bumped whenever type_activities changes what it stores
+
+
+def sidecars_available():
+    return feather is not None
+
+
+# Path of the sidecar for one sheet of a workbook. With the workbook's content hash the sidecar
+# belongs to that content instead of the path, so a copy saved somewhere else finds it too.
+def sidecar_path(path, sheet_name, sidecar_dir=SIDECAR_DIR, content_hash=None):
+    path = os.path.abspath(path)
+    if sidecar_dir is None:
+        folder, name = os.path.split(path)
+        return os.path.join(folder, f".{name}.{sheet_name}.feather")
+    digest = hashlib.sha1(f"{content_hash or path}\0{sheet_name}".encode()).hexdigest()
+    return os.path.join(sidecar_dir, f"{digest}.feather")
+
+
+# The source file's mtime and size (or its content hash), stored in the sidecar so edits to the
+# workbook invalidate it
+def _source_stamp(path, content_hash=None):
+    if content_hash is not None:
+        return f"content:{content_hash}".encode()
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns}:{stat.st_size}".encode()
+
+
+# Loads the typed sheet from its sidecar through a memory map, or returns None if there is
+# no sidecar or it was written for another version of the workbook
+def read_sidecar(path, sheet_name, sidecar_dir=SIDECAR_DIR, content_hash=None):
+    if not sidecars_available():
+        return None
+    target = sidecar_path(path, sheet_name, sidecar_dir, content_hash)
+    if not os.path.exists(target):
+        return None
+    try:
+        table = feather.read_table(target, memory_map=True)
+    except (OSError, pa.ArrowInvalid):
+        return None
+    metadata = table.schema.metadata or {}
+    if metadata.get(b'source') != _source_stamp(path, content_hash) or metadata.get(b'version') != SIDECAR_VERSION:
+        return None
+    return table.to_pandas()
+
+
+# Writes the typed sheet as an uncompressed Feather file so later runs can memory-map it
+def write_sidecar(path, sheet_name, df, sidecar_dir=SIDECAR_DIR, content_hash=None):
+    if not sidecars_available():
+        return None
+    target = sidecar_path(path, sheet_name, sidecar_dir, content_hash)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        b'source': _source_stamp(path, content_hash),
+        b'version': SIDECAR_VERSION,
+    })
+
+    # Written under a temporary name first so a reader never maps a half-written file
+    partial = f"{target}.{os.getpid()}.tmp"
+    feather.write_feather(table, partial, compression='uncompressed')
+    os.replace(partial, target)
+    return target
+
+
+# Import step: types the parsed sheet (compact columns, see type_activities) and, with save,
+# saves it as a sidecar. Sheets that cannot be typed (missing columns) are returned unchanged
+# so validation reports the problem.
+def import_sheet(path, sheet_name, df, sidecar_dir=SIDECAR_DIR, save=True, content_hash=None):
+    try:
+        typed = type_activities(df)
+    except (KeyError, ValueError, TypeError):
+        return df
+    if save:
+        try:
+            write_sidecar(path, sheet_name, typed, sidecar_dir, content_hash)
+        except OSError:
+            pass  # A read-only folder only costs the speed-up
+    return typed